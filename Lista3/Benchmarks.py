@@ -0,0 +1,79 @@
+import sys
+import time
+
+import numpy as np
+
+from Operations import block_matmul, rotate_90
+
+
+def _melhor_tempo(func, repeticoes: int) -> float:
+    """Menor tempo (em segundos) entre `repeticoes` execuções de func()."""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def benchmark_block_matmul(
+    tamanhos: tuple = (256, 512, 1024, 2048, 4096, 8192),
+    num_threads: int = 4,
+    dtype: type = np.float64,
+    repeticoes: int = 3,
+) -> None:
+    """
+    Compara block_matmul (uma thread e `num_threads` threads, bloco automático)
+    com o produto direto A @ B para matrizes quadradas de cada tamanho.
+
+    Parâmetros:
+    - tamanhos: dimensões n das matrizes (n, n) testadas.
+    - num_threads: número de threads da variante paralela.
+    - dtype: tipo dos elementos das matrizes.
+    - repeticoes: execuções por medição; é reportado o menor tempo.
+    """
+    rng = np.random.default_rng(0)
+    print(f"--- block_matmul vs A @ B ({np.dtype(dtype).name}) ---")
+    print(f"{'n':>6} {'A @ B (s)':>12} {'bloco 1T (s)':>14} {f'bloco {num_threads}T (s)':>14} {'razão 1T':>10}")
+    for n in tamanhos:
+        A = rng.standard_normal((n, n)).astype(dtype)
+        B = rng.standard_normal((n, n)).astype(dtype)
+        t_ref = _melhor_tempo(lambda: A @ B, repeticoes)
+        t_1 = _melhor_tempo(lambda: block_matmul(A, B), repeticoes)
+        t_n = _melhor_tempo(lambda: block_matmul(A, B, num_threads=num_threads), repeticoes)
+        print(f"{n:>6} {t_ref:>12.4f} {t_1:>14.4f} {t_n:>14.4f} {t_1 / t_ref:>10.2f}")
+
+
+def benchmark_rotate_90(
+    tamanhos: tuple = (256, 1024, 4096),
+    repeticoes: int = 3,
+) -> None:
+    """
+    Compara as duas formas de saída de rotate_90 (view e cópia contígua em
+    blocos) no custo da rotação e no custo de um produto de matrizes feito
+    logo em seguida com o resultado.
+
+    Parâmetros:
+    - tamanhos: dimensões n das matrizes (n, n) testadas.
+    - repeticoes: execuções por medição; é reportado o menor tempo.
+    """
+    rng = np.random.default_rng(0)
+    print("--- rotate_90: view vs contiguous=True ---")
+    print(f"{'n':>6} {'view (s)':>10} {'cópia (s)':>10} {'view@B (s)':>12} {'cópia@B (s)':>12} {'ascontig. (s)':>14}")
+    for n in tamanhos:
+        A = rng.standard_normal((n, n))
+        B = rng.standard_normal((n, n))
+        t_view = _melhor_tempo(lambda: rotate_90(A), repeticoes)
+        t_copy = _melhor_tempo(lambda: rotate_90(A, contiguous=True), repeticoes)
+        t_view_mm = _melhor_tempo(lambda: rotate_90(A) @ B, repeticoes)
+        t_copy_mm = _melhor_tempo(lambda: rotate_90(A, contiguous=True) @ B, repeticoes)
+        # Referência: cópia contígua direta (não bloqueada) da view
+        t_naive = _melhor_tempo(lambda: np.ascontiguousarray(rotate_90(A)), repeticoes)
+        print(f"{n:>6} {t_view:>10.5f} {t_copy:>10.5f} {t_view_mm:>12.4f} {t_copy_mm:>12.4f} {t_naive:>14.5f}")
+
+
+if __name__ == '__main__':
+    # Uso: python Benchmarks.py [n1 n2 ...]
+    tamanhos_cli = tuple(int(arg) for arg in sys.argv[1:]) or (256, 512, 1024, 2048, 4096, 8192)
+    benchmark_block_matmul(tamanhos_cli)
+    benchmark_rotate_90()
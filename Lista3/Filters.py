@@ -1,65 +1,511 @@
+import numbers
+import time
+from typing import Iterator
+
 import numpy as np
 
-def replace_negatives(v: np.ndarray, new_value: float) -> np.ndarray:
+def replace_negatives(
+    v: np.ndarray,
+    new_value: float | np.ndarray,
+    inplace: bool = False,
+    chunk_size: int | None = None,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
     """
     Substitui todas as entradas negativas em um vetor por um novo valor.
-    Não utiliza np.where; faz indexação booleana.
+    Não utiliza np.where; usa uma máscara booleana das entradas negativas.
+
+    Aceita arrays N-D (inclusive np.memmap). Com inplace=True, as entradas são
+    substituídas no próprio v, sem cópia. Com out, o resultado é escrito em um
+    array do chamador (por exemplo, um np.memmap). Com chunk_size, o array é
+    percorrido em blocos de chunk_size linhas (eixo 0), de modo que a máscara
+    temporária ocupa memória limitada. Para arrays mapeados em disco maiores
+    que a RAM, combine chunk_size com inplace=True ou com um out mapeado em
+    disco: sem eles, o resultado é um novo array alocado inteiro na memória.
+    Em arrays mascarados (np.ma.MaskedArray), as entradas mascaradas não são alteradas.
 
     Parâmetros:
-    - v: Vetor de entrada (np.ndarray).
-    - new_value: Valor escalar que substituirá cada elemento negativo.
+    - v: Array de entrada (np.ndarray, np.memmap ou np.ma.MaskedArray).
+    - new_value: Valor escalar (int, float ou escalar NumPy) que substituirá cada
+      elemento negativo, ou np.ndarray com valores por coluna, com formato
+      compatível (broadcast) com v (por exemplo, (v.shape[-1],)).
+    - inplace: Se True, altera v diretamente e o retorna.
+    - chunk_size: Número de linhas (eixo 0) processadas por bloco. Se None, processa tudo de uma vez.
+    - out: Array gravável com o formato de v onde o resultado é escrito (não
+      pode ser usado com inplace=True). Para v mascarado, as entradas mascaradas
+      recebem os valores originais de v.data.
 
     Retorno:
-    - Novo vetor onde todas as entradas negativas de v foram trocadas por new_value.
+    - Array onde todas as entradas negativas de v foram trocadas por new_value
+      (um novo array, out se informado, ou o próprio v se inplace=True).
     """
     if not isinstance(v, np.ndarray):
         raise TypeError("A entrada 'v' deve ser um np.ndarray.")
-    if v.ndim != 1:
-        raise ValueError("A entrada 'v' deve ser um vetor (1-dimensional).")
-    if not isinstance(new_value, (int, float)):
-        raise TypeError("O 'new_value' deve ser um escalar (int ou float).")
+    if v.ndim < 1:
+        raise ValueError("A entrada 'v' deve ter pelo menos 1 dimensão.")
+    if isinstance(new_value, np.ndarray):
+        try:
+            compatible = np.broadcast_shapes(new_value.shape, v.shape) == v.shape
+        except ValueError:
+            compatible = False
+        if not compatible:
+            raise ValueError("O 'new_value' vetorial deve ter formato compatível com 'v' (por exemplo, (v.shape[-1],)).")
+        new_value = np.broadcast_to(new_value, v.shape)
+    elif not isinstance(new_value, (int, float, np.number)):
+        raise TypeError("O 'new_value' deve ser um escalar (int, float ou escalar NumPy) ou um np.ndarray.")
+    if chunk_size is not None and (not isinstance(chunk_size, int) or chunk_size <= 0):
+        raise ValueError("O 'chunk_size' deve ser um inteiro positivo.")
+    if inplace and not v.flags.writeable:
+        raise ValueError("O modo 'inplace' exige um array gravável.")
+    if out is not None:
+        if inplace:
+            raise ValueError("Os parâmetros 'out' e 'inplace' não podem ser usados juntos.")
+        if not isinstance(out, np.ndarray):
+            raise TypeError("O parâmetro 'out' deve ser um np.ndarray.")
+        if out.shape != v.shape:
+            raise ValueError("O parâmetro 'out' deve ter o mesmo formato de 'v'.")
+        if not out.flags.writeable:
+            raise ValueError("O parâmetro 'out' deve ser gravável.")
+
+    masked = isinstance(v, np.ma.MaskedArray)
+    if inplace:
+        result = v
+    elif out is not None:
+        result = out
+    elif masked:
+        # Uma única cópia (dados e máscara); a substituição é feita sobre ela
+        result = v.copy()
+    else:
+        # A cópia é feita bloco a bloco, junto com a substituição
+        result = np.empty(v.shape, dtype=v.dtype)
+
+    # Em arrays mascarados, trabalha sobre os dados e protege as entradas mascaradas
+    protected = np.ma.getmaskarray(v) if masked else None
+    target = result.data if isinstance(result, np.ma.MaskedArray) else result
+    source = target if masked and out is None else (v.data if masked else v)
+    # .data cria uma nova view a cada acesso: compara a memória, não a identidade
+    copy_blocks = not np.may_share_memory(target, source)
+
+    step = len(v) if chunk_size is None else chunk_size
+    for r_0 in range(0, len(v), max(step, 1)):
+        r_1 = r_0 + step
+        block = source[r_0:r_1]
+        if copy_blocks:
+            target[r_0:r_1] = block
+        negative_indices = block < 0
+        if protected is not None:
+            negative_indices &= ~protected[r_0:r_1]
+        value = new_value[r_0:r_1] if isinstance(new_value, np.ndarray) else new_value
+        # Substitui apenas onde a máscara de negativos é verdadeira
+        np.copyto(target[r_0:r_1], value, where=negative_indices, casting="unsafe")
+
+    if isinstance(result, np.memmap):
+        result.flush()
+
+    return result
+
+def _indices_picos(x: np.ndarray, plateaus: bool) -> np.ndarray:
+    """
+    Índices dos máximos locais de um vetor 1-D, por comparação vetorizada
+    com os vizinhos.
+
+    Com plateaus=True, a série é comprimida em trechos de valor constante e um
+    trecho mais alto que os trechos vizinhos é um pico; o índice reportado é o
+    do meio do trecho (à esquerda, se o trecho tiver tamanho par).
+    """
+    if not plateaus:
+        middle = x[1:-1]
+        return np.flatnonzero((middle > x[:-2]) & (middle > x[2:])) + 1
+
+    # Início de cada trecho de valor constante
+    starts = np.concatenate(([0], np.flatnonzero(x[1:] != x[:-1]) + 1))
+    ends = np.concatenate((starts[1:] - 1, [len(x) - 1]))
+    values = x[starts]
+    if len(values) < 3:
+        return np.array([], dtype=int)
+    middle = values[1:-1]
+    is_peak = (middle > values[:-2]) & (middle > values[2:])
+    return (starts[1:-1][is_peak] + ends[1:-1][is_peak]) // 2
+
+
+def _primeiro_maior(x: np.ndarray, start: int, step: int, h: float) -> int:
+    """
+    Primeiro índice a partir de start (andando no sentido step = +1 ou -1) em
+    que x é estritamente maior que h, ou -1 / len(x) se não houver. A busca é
+    feita em janelas de tamanho crescente, para não varrer a série inteira
+    quando o ponto mais alto está próximo.
+    """
+    n = len(x)
+    size = 64
+    pos = start
+    while 0 <= pos < n:
+        if step > 0:
+            window = x[pos : pos + size]
+            hits = np.flatnonzero(window > h)
+            if hits.size:
+                return pos + hits[0]
+            pos += size
+        else:
+            lo = max(0, pos - size + 1)
+            window = x[lo : pos + 1]
+            hits = np.flatnonzero(window > h)
+            if hits.size:
+                return lo + hits[-1]
+            pos = lo - 1
+        size *= 2
+    return n if step > 0 else -1
+
+
+def _proeminencias(x: np.ndarray, peaks: np.ndarray) -> np.ndarray:
+    """
+    Proeminência de cada pico: altura do pico menos a mais alta das duas
+    bases, onde cada base é o mínimo da série entre o pico e o ponto mais
+    próximo, daquele lado, que seja mais alto que o pico (ou a borda da série).
+
+    Não é vetorizada entre picos: há uma iteração Python por pico, e apenas
+    as buscas e mínimos dentro de cada pico usam NumPy. O custo é adequado
+    para picos esparsos (após plateaus/min_distance), não para séries em que
+    quase toda amostra é um pico.
+    """
+    prominences = np.empty(len(peaks))
+    for i, p in enumerate(peaks):
+        h = x[p]
+        left = _primeiro_maior(x, p - 1, -1, h)
+        right = _primeiro_maior(x, p + 1, +1, h)
+        prominences[i] = h - max(x[left + 1 : p + 1].min(), x[p:right].min())
+    return prominences
 
-    # Cria uma cópia do vetor para evitar modificar o original
-    v_copy = v.copy()
 
-    # Usa indexação booleana para encontrar e substituir valores negativos
-    negative_indices = v_copy < 0
-    v_copy[negative_indices] = new_value
+def _filtrar_distancia(x: np.ndarray, peaks: np.ndarray, min_distance: int) -> np.ndarray:
+    """
+    Mantém os picos mais altos, descartando os que estão a menos de
+    min_distance amostras de um pico mais alto já mantido.
+    """
+    keep = np.ones(len(peaks), dtype=bool)
+    # Do pico mais alto para o mais baixo
+    for i in np.argsort(x[peaks], kind="stable")[::-1]:
+        if not keep[i]:
+            continue
+        lo = np.searchsorted(peaks, peaks[i] - min_distance + 1)
+        hi = np.searchsorted(peaks, peaks[i] + min_distance)
+        keep[lo:hi] = False
+        keep[i] = True
+    return peaks[keep]
 
-    return v_copy
 
-def local_peaks(series: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+def local_peaks(
+    series: np.ndarray,
+    plateaus: bool = False,
+    prominence: float | None = None,
+    min_distance: int | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
     """
     Identifica todos os máximos locais em uma série temporal unidimensional.
     Um máximo local x_t é um ponto tal que x_{t-1} < x_t > x_{t+1}, para 2 <= t <= N-1.
 
+    A comparação com os vizinhos é feita de forma vetorizada sobre a série
+    inteira. Também aceita matrizes 2-D (ativos, tempo), processando cada linha.
+
     Parâmetros:
-    - series: Vetor de entrada (np.ndarray) representando a série temporal.
+    - series: Vetor de entrada (np.ndarray) representando a série temporal, ou
+      matriz 2-D (ativos, tempo).
+    - plateaus: Se True, um trecho constante mais alto que seus vizinhos (platô)
+      também é um pico, reportado no índice do meio do trecho.
+    - prominence: Se informado (número real, inclusive escalares NumPy), mantém
+      apenas picos com proeminência >= prominence (altura do pico em relação à
+      mais alta das bases à esquerda e à direita). A proeminência é calculada
+      pico a pico, com um laço Python sobre os picos candidatos.
+    - min_distance: Se informado, mantém apenas o pico mais alto entre picos a
+      menos de min_distance amostras uns dos outros.
 
     Retorno:
     - Tupla contendo:
-        - indices: np.ndarray de inteiros com as posições t onde há máximos locais.
+        - indices: np.ndarray de inteiros com as posições t onde há máximos locais
+          (para entradas 2-D, matriz (k, 2) com pares [ativo, t]).
         - peaks: np.ndarray de floats com os valores x_t correspondentes.
     """
     if not isinstance(series, np.ndarray):
         raise TypeError("A entrada 'series' deve ser um np.ndarray.")
-    if series.ndim != 1:
-        raise ValueError("A entrada 'series' deve ser um vetor (1-dimensional).")
+    if series.ndim not in (1, 2):
+        raise ValueError("A entrada 'series' deve ser um vetor (1-dimensional) ou uma matriz 2-dimensional.")
+    if prominence is not None and (not isinstance(prominence, numbers.Real) or prominence < 0):
+        raise ValueError("O parâmetro 'prominence' deve ser um número não negativo.")
+    if min_distance is not None and (not isinstance(min_distance, numbers.Integral) or min_distance <= 0):
+        raise ValueError("O parâmetro 'min_distance' deve ser um inteiro positivo.")
+
+    if series.ndim == 2:
+        if plateaus or prominence is not None or min_distance is not None:
+            rows = [local_peaks(row, plateaus, prominence, min_distance)[0] for row in series]
+            indices = np.array(
+                [(r, t) for r, row_peaks in enumerate(rows) for t in row_peaks], dtype=int
+            ).reshape(-1, 2)
+        elif series.shape[1] < 3:
+            indices = np.empty((0, 2), dtype=int)
+        else:
+            middle = series[:, 1:-1]
+            indices = np.argwhere((middle > series[:, :-2]) & (middle > series[:, 2:]))
+            indices[:, 1] += 1
+        return indices, series[indices[:, 0], indices[:, 1]].astype(float)
+
     if len(series) < 3:
         # Mínimo de 3 pontos (x_{t-1}, x_t, x_{t+1}) para identificar um pico
         return np.array([]), np.array([])
 
-    n = len(series)
-    peak_indices = []
-    peak_values = []
+    # Em termos de índice Python (0-based), os candidatos vão de t=1 a t=n-2:
+    # x_{t-1} é series[t-1], x_t é series[t], x_{t+1} é series[t+1]
+    peak_indices = _indices_picos(series, plateaus)
+    if min_distance is not None and len(peak_indices):
+        peak_indices = _filtrar_distancia(series, peak_indices, min_distance)
+    if prominence is not None and len(peak_indices):
+        peak_indices = peak_indices[_proeminencias(series, peak_indices) >= prominence]
+
+    return peak_indices.astype(int), series[peak_indices].astype(float)
+
+
+class StreamingPeakDetector:
+    """
+    Detector de máximos locais para séries que chegam amostra a amostra.
+
+    Cada chamada a update(x) recebe a próxima amostra e retorna o pico que
+    acaba de ser confirmado, se houver: um pico em t só é conhecido quando
+    chega a amostra t + 1 (atraso de uma amostra; no caso de platôs, quando
+    o platô termina). Os picos reportados são os mesmos de local_peaks
+    aplicado à série completa (sem os filtros de proeminência e distância,
+    que dependem de amostras futuras).
+
+    Parâmetros do construtor:
+    - plateaus: mesmo significado de local_peaks.
+    """
+
+    __slots__ = ("plateaus", "_t", "_prev", "_rising", "_run_start")
+
+    def __init__(self, plateaus: bool = False) -> None:
+        self.plateaus = plateaus
+        self._t = 0
+        self._prev = 0.0
+        self._rising = False
+        self._run_start = 0
+
+    def update(self, x: float) -> tuple[int, float] | None:
+        """
+        Processa uma nova amostra.
+
+        Parâmetros:
+        - x: valor da amostra de índice t (contado desde a primeira chamada).
+
+        Retorno: tupla (índice, valor) do pico confirmado por esta amostra, ou None.
+        """
+        t = self._t
+        self._t += 1
+        peak = None
+        if t > 0:
+            if x > self._prev:
+                self._rising = True
+                self._run_start = t
+            elif x < self._prev:
+                end = t - 1
+                if self._rising and (self.plateaus or self._run_start == end):
+                    peak = ((self._run_start + end) // 2, float(self._prev))
+                self._rising = False
+                self._run_start = t
+        self._prev = x
+        return peak
+
+    def update_many(self, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Processa várias amostras em sequência.
+
+        Parâmetros:
+        - values: vetor (1-D) de novas amostras.
+
+        Retorno: tupla (indices, peaks) com os picos confirmados por estas amostras.
+        """
+        found = [peak for peak in map(self.update, values) if peak is not None]
+        indices = np.array([p[0] for p in found], dtype=int)
+        return indices, np.array([p[1] for p in found], dtype=float)
+
+
+class Pipeline:
+    """
+    Cadeia preguiçosa de filtros sobre arrays de preços ou retornos.
+
+    Os estágios são apenas registrados pelos métodos encadeáveis e executados
+    por run (ou run_blocks). Todos os estágios elemento a elemento são
+    aplicados em sequência sobre o mesmo bloco de dados, em um buffer que é
+    reaproveitado de um bloco para o outro: o array de entrada é lido uma
+    única vez, em blocos, e o resultado é escrito uma única vez.
+
+    O tempo gasto em cada estágio (e na leitura e escrita dos blocos) é
+    acumulado em timings e pode ser consultado com report().
+
+    Exemplo:
+    - Pipeline().replace_negatives(0.0).clip(upper=150.0).peaks().run(precos)
+    """
+
+    def __init__(self) -> None:
+        self._stages = []
+        self._peaks = False
+        self.timings = {}
+
+    def _add_stage(self, name: str, func) -> "Pipeline":
+        if self._peaks:
+            raise ValueError("Nenhum estágio pode ser adicionado depois de peaks().")
+        count = sum(1 for stage_name, _ in self._stages if stage_name.split("#")[0] == name)
+        self._stages.append((name if count == 0 else f"{name}#{count + 1}", func))
+        return self
+
+    def replace_negatives(self, new_value: float | np.ndarray) -> "Pipeline":
+        """
+        Adiciona a substituição das entradas negativas por new_value
+        (escalar ou valores por coluna, como em replace_negatives).
+        """
+        if not isinstance(new_value, (int, float, np.number, np.ndarray)):
+            raise TypeError("O 'new_value' deve ser um escalar (int, float ou escalar NumPy) ou um np.ndarray.")
+
+        def _stage(buf: np.ndarray, mask: np.ndarray) -> None:
+            np.less(buf, 0, out=mask)
+            np.copyto(buf, new_value, where=mask, casting="unsafe")
+
+        return self._add_stage("replace_negatives", _stage)
+
+    def clip(self, lower: float | None = None, upper: float | None = None) -> "Pipeline":
+        """Adiciona a limitação dos valores ao intervalo [lower, upper]."""
+        if lower is None and upper is None:
+            raise ValueError("Pelo menos um dos limites 'lower' ou 'upper' deve ser informado.")
+        if lower is not None and upper is not None and lower > upper:
+            raise ValueError("O limite 'lower' deve ser menor ou igual a 'upper'.")
+
+        def _stage(buf: np.ndarray, mask: np.ndarray) -> None:
+            np.clip(buf, lower, upper, out=buf)
+
+        return self._add_stage("clip", _stage)
+
+    def peaks(self) -> "Pipeline":
+        """
+        Finaliza a cadeia com a detecção de máximos locais (definição estrita
+        de local_peaks). run passa a retornar (indices, peaks).
+        """
+        if self._peaks:
+            raise ValueError("peaks() já foi adicionado a esta cadeia.")
+        self._peaks = True
+        return self
+
+    def _time(self, name: str, start: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def _apply(self, buf: np.ndarray, mask: np.ndarray) -> None:
+        for name, func in self._stages:
+            start = time.perf_counter()
+            func(buf, mask)
+            self._time(name, start)
+
+    def run(
+        self,
+        data: np.ndarray,
+        chunk_size: int = 1 << 16,
+        out: np.ndarray | None = None,
+    ) -> np.ndarray | tuple[np.ndarray, np.ndarray]:
+        """
+        Executa a cadeia sobre data, em blocos de chunk_size linhas (eixo 0).
+
+        Parâmetros:
+        - data: np.ndarray de entrada (inclusive np.memmap), por exemplo a
+          saída de simular_precos. Não é alterado, a menos que out seja data.
+        - chunk_size: número de linhas (eixo 0) por bloco.
+        - out: array opcional (por exemplo, np.memmap) que recebe o resultado;
+          pode ser o próprio data para processamento in-place.
+
+        Retorno:
+        - Array filtrado (out, se informado) ou, se a cadeia termina em
+          peaks(), a tupla (indices, peaks) de local_peaks sobre os dados filtrados.
+        """
+        if not isinstance(data, np.ndarray):
+            raise TypeError("A entrada 'data' deve ser um np.ndarray.")
+        if data.ndim < 1:
+            raise ValueError("A entrada 'data' deve ter pelo menos 1 dimensão.")
+        if not isinstance(chunk_size, int) or chunk_size <= 0:
+            raise ValueError("O 'chunk_size' deve ser um inteiro positivo.")
+        if self._peaks and data.ndim > 2:
+            raise ValueError("peaks() aceita apenas entradas 1-D ou 2-D (ativos, tempo).")
+        if self._peaks and out is not None:
+            raise ValueError("O parâmetro 'out' não pode ser usado com peaks().")
+
+        dtype = data.dtype if np.issubdtype(data.dtype, np.floating) else np.dtype(float)
+        if not self._peaks:
+            if out is None:
+                out = np.empty(data.shape, dtype=dtype)
+            elif not isinstance(out, np.ndarray) or out.shape != data.shape:
+                raise ValueError("O parâmetro 'out' deve ser um np.ndarray com o formato de 'data'.")
+
+        # Em séries 1-D com peaks(), as duas primeiras posições do buffer guardam
+        # as duas últimas amostras do bloco anterior, para detectar picos na fronteira.
+        carry = 2 if self._peaks and data.ndim == 1 else 0
+        work = np.empty((carry + min(chunk_size, len(data)),) + data.shape[1:], dtype=dtype)
+        mask = np.empty((min(chunk_size, len(data)),) + data.shape[1:], dtype=bool)
+        found_indices = []
+        found_values = []
+
+        for r_0 in range(0, len(data), chunk_size):
+            r_1 = min(r_0 + chunk_size, len(data))
+            buf = work[carry : carry + r_1 - r_0]
+
+            start = time.perf_counter()
+            np.copyto(buf, data[r_0:r_1], casting="unsafe")
+            self._time("leitura", start)
+
+            self._apply(buf, mask[: r_1 - r_0])
+
+            start = time.perf_counter()
+            if not self._peaks:
+                out[r_0:r_1] = buf
+                self._time("escrita", start)
+                continue
+
+            if data.ndim == 2:
+                indices, values = local_peaks(buf)
+                indices[:, 0] += r_0
+            else:
+                # Inclui as amostras carregadas do bloco anterior (se houver)
+                offset = min(r_0, carry)
+                indices, values = local_peaks(work[carry - offset : carry + r_1 - r_0])
+                indices = indices + r_0 - offset
+                work[:carry] = work[carry + r_1 - r_0 - carry : carry + r_1 - r_0]
+            found_indices.append(indices)
+            found_values.append(values)
+            self._time("peaks", start)
+
+        if not self._peaks:
+            if isinstance(out, np.memmap):
+                out.flush()
+            return out
+        if not found_indices:
+            empty = np.empty((0, 2), dtype=int) if data.ndim == 2 else np.array([], dtype=int)
+            return empty, np.array([], dtype=float)
+        return np.concatenate(found_indices).astype(int), np.concatenate(found_values)
+
+    def run_blocks(self, blocks) -> Iterator[np.ndarray]:
+        """
+        Executa os estágios elemento a elemento sobre uma sequência de blocos,
+        como a saída de simular_precos_em_blocos. Cada bloco é filtrado no
+        próprio buffer (sem cópia) e devolvido; a máscara temporária é
+        reaproveitada entre blocos do mesmo formato.
+
+        Parâmetros:
+        - blocks: iterável de np.ndarray graváveis de ponto flutuante.
 
-    # Percorre a série de t=1 a t=n-2 (correspondendo a x_t de índice 1 a n-2)
-    # A condição 2 <= t <= N-1 na descrição refere-se ao índice matemático/posição.
-    # Em termos de índice Python (0-based), isso é de t=1 a t=n-2.
-    # Ou seja, x_{t-1} é series[i-1], x_t é series[i], x_{t+1} é series[i+1]
-    for i in range(1, n - 1):
-        if series[i] > series[i-1] and series[i] > series[i+1]:
-            peak_indices.append(i)
-            peak_values.append(series[i])
+        Retorno: iterador com os blocos filtrados.
+        """
+        if self._peaks:
+            raise ValueError("run_blocks não aceita peaks(); use run sobre o array completo.")
+        mask = np.empty(0, dtype=bool)
+        for block in blocks:
+            if not isinstance(block, np.ndarray):
+                raise TypeError("Cada bloco deve ser um np.ndarray.")
+            if mask.shape != block.shape:
+                mask = np.empty(block.shape, dtype=bool)
+            self._apply(block, mask)
+            yield block
 
-    return np.array(peak_indices, dtype=int), np.array(peak_values, dtype=float)
\ No newline at end of file
+    def report(self) -> dict:
+        """Tempo acumulado, em segundos, de cada estágio (e da leitura/escrita dos blocos)."""
+        return dict(self.timings)
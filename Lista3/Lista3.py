@@ -1,6 +1,11 @@
-from Simulations import simular_precos, calc_retornos_simples, calc_retornos_log, sma, rolling_std  
-from Operations import rotate_90, sum_subdiagonals, block_matmul
-from Filters import replace_negatives, local_peaks  
+from Simulations import simular_precos, calc_retornos_simples, calc_retornos_log, sma, rolling_std
+from Simulations import simular_precos_em_blocos, retornos_log_em_blocos, janela_movel_em_blocos
+from Simulations import RollingMean, RollingStd, compute_return_stats
+from Operations import rotate_90, sum_subdiagonals, sum_all_diagonals, block_matmul, block_matmul_out_of_core
+from Filters import replace_negatives, local_peaks, StreamingPeakDetector, Pipeline
+from Storage import PriceStore
+import os
+import tempfile
 import numpy as np
 
 if __name__ == '__main__':
@@ -13,6 +18,17 @@ if __name__ == '__main__':
     
     print(simulated_prices)
 
+    # Simulação em lote (Monte Carlo): matriz (n_paths, days + 1)
+    simulated_paths = simular_precos(S0_initial, sigma_volatility, num_days, n_paths=1000, seed=42)
+    print(f"Formato das trajetórias simuladas: {simulated_paths.shape}")
+    same_paths = simular_precos(S0_initial, sigma_volatility, num_days, n_paths=1000, seed=42, chunk_size=64)
+    print(f"Resultado independente do chunk_size: {np.array_equal(simulated_paths, same_paths)}")
+
+    # Simulação em blocos: memória limitada a um bloco por vez
+    price_blocks = simular_precos_em_blocos(S0_initial, 0.5, 2520, block_size=256, n_paths=100, seed=42)
+    std_blocks = janela_movel_em_blocos(retornos_log_em_blocos(price_blocks), 20, rolling_std, days_size=1)
+    print(f"Colunas de volatilidade geradas em blocos: {sum(block.shape[-1] for block in std_blocks)}")
+
     # Calcular retornos simples
     simple_returns = calc_retornos_simples(simulated_prices)
     print(f"Retornos simples: {simple_returns}")
@@ -23,6 +39,15 @@ if __name__ == '__main__':
     print(f"Log-retornos: {log_returns}")
     print(f"Número de log-retornos: {len(log_returns)}")
 
+    # Retornos de várias trajetórias (ativos, tempo) em uma chamada, em buffers reaproveitados
+    paths_returns = np.empty((simulated_paths.shape[0], num_days))
+    calc_retornos_log(simulated_paths, axis=1, out=paths_returns)
+    print(f"Log-retornos das trajetórias escritos em 'out': {paths_returns.shape}")
+    inplace_prices = simulated_paths.copy()
+    inplace_returns = calc_retornos_simples(inplace_prices, inplace=True)  # view dos próprios preços
+    print(f"Retornos in-place compartilham a memória dos preços: {np.shares_memory(inplace_returns, inplace_prices)}")
+    print(f"In-place igual ao cálculo com cópia: {np.allclose(inplace_returns, calc_retornos_simples(simulated_paths))}")
+
      # Gerar preços e retornos de exemplo
     print(f"Retornos de exemplo (primeiros 5): {log_returns[:5]}")
     print(f"Número total de retornos: {len(log_returns)}")
@@ -46,6 +71,20 @@ if __name__ == '__main__':
     print(f"\nRolling Std com janela {window_std}, days_size=1 (primeiros 5): {rolling_std_results_1[:5]}")
     print(f"Número de Rolling Stds calculadas: {len(rolling_std_results_1)}")
 
+    # Estatísticas incrementais: uma atualização O(1) por novo retorno
+    live_mean = RollingMean(window_sma)
+    live_std = RollingStd(window_std, days_size=1)
+    for r in log_returns:
+        live_mean.update(r)
+        live_std.update(r)
+    print(f"\nRollingMean igual à última SMA: {np.isclose(live_mean.value, sma_results[-1])}")
+    print(f"RollingStd igual ao último Rolling Std: {np.isclose(live_std.value, rolling_std_results_1[-1])}")
+
+    # Pipeline fundido: retornos, SMA e desvio padrão móvel com uma única validação
+    stats = compute_return_stats(simulated_prices, windows=[window_sma, 20], days_size=1)
+    print(f"\nSMA fundida igual à SMA: {np.allclose(stats['sma'][window_sma], sma_results)}")
+    print(f"Rolling Std fundido igual ao Rolling Std: {np.allclose(stats['rolling_std'][window_std], rolling_std_results_1)}")
+
     # --- Testes da função rotate_90 ---
     print("--- Testes de rotate_90 ---")
     matrix1 = np.array([
@@ -78,6 +117,11 @@ if __name__ == '__main__':
     sum_k1 = sum_subdiagonals(matrix_sum, k1)
     print(f"Soma da subdiagonal k={k1}: {sum_k1} (Esperado: 30.0)")
 
+    # Todas as diagonais de uma vez: posição k + n - 1 contém a soma da diagonal k = i - j
+    all_sums = sum_all_diagonals(matrix_sum)
+    print(f"Somas de todas as diagonais (k=-3..3): {all_sums}")
+    print(f"Subdiagonal k={k1} pelo vetor completo: {all_sums[k1 + matrix_sum.shape[0] - 1]} (Esperado: 30.0)")
+
        # --- Testes da função block_matmul ---
     print("--- Testes de block_matmul ---")
 
@@ -127,3 +171,45 @@ if __name__ == '__main__':
     print(f"\nSérie original: {series3}")
     print(f"Índices dos picos locais: {indices3}")
     print(f"Valores dos picos locais: {peaks3}") # Deve ser arrays vazios
+
+    series4 = np.array([1, 3, 3, 1, 2, 5, 4, 4.5, 1])
+    print(f"\nSérie original: {series4}")
+    print(f"Picos estritos: {local_peaks(series4)[0]}")  # [5, 7]
+    print(f"Picos com platôs: {local_peaks(series4, plateaus=True)[0]}")  # [1, 5, 7]
+    print(f"Picos com proeminência >= 2: {local_peaks(series4, prominence=2.0)[0]}")  # [5]
+    detector = StreamingPeakDetector(plateaus=True)
+    streamed = [peak for peak in map(detector.update, series4) if peak is not None]
+    print(f"Picos detectados em fluxo: {streamed}")
+
+    # Cadeia de filtros: um único percurso em blocos sobre as trajetórias simuladas
+    pipeline = Pipeline().replace_negatives(0.0).clip(lower=90.0, upper=110.0).peaks()
+    pipeline_indices, pipeline_peaks = pipeline.run(simulated_paths, chunk_size=128)
+    print(f"\nPicos após filtros nas trajetórias simuladas: {len(pipeline_peaks)}")
+    print(f"Tempo por estágio (s): {pipeline.report()}")
+
+    # --- Store de preços mapeado em memória ---
+    print("\n--- Testes de PriceStore ---")
+    with tempfile.TemporaryDirectory() as store_dir:
+        PriceStore.de_matriz(store_dir, ["P0", "P1", "P2"], simulated_paths[:3])
+        store = PriceStore(store_dir)  # somente leitura, compartilhável entre processos
+        store_returns = calc_retornos_log(store.matriz)  # matriz (ativos, tempo), sem cópia da entrada
+        print(f"Tickers no store: {store.tickers}, formato dos log-retornos: {store_returns.shape}")
+        print(f"Picos locais de P0: {len(local_peaks(store['P0'])[0])}")
+
+        # Estatísticas do store escritas em buffers mapeados em disco
+        log_memmap = np.lib.format.open_memmap(
+            os.path.join(store_dir, "log.npy"), mode="w+", dtype=np.float64, shape=store_returns.shape
+        )
+        store_stats = compute_return_stats(store.matriz, windows=[20], out_log=log_memmap)
+        print(f"Log-retornos escritos no memmap: {np.allclose(log_memmap, store_returns)}")
+
+        # Produto de matrizes fora da memória: blocos lidos de arquivos .npy
+        A_path = os.path.join(store_dir, "A.npy")
+        B_path = os.path.join(store_dir, "B.npy")
+        np.save(A_path, np.random.default_rng(0).random((300, 200)))
+        np.save(B_path, np.random.default_rng(1).random((200, 250)))
+        C_disk = block_matmul_out_of_core(A_path, B_path, os.path.join(store_dir, "C.npy"), memory_budget=64 * 1024)
+        print(f"block_matmul_out_of_core igual a A @ B: {np.allclose(C_disk, np.load(A_path) @ np.load(B_path))}")
+
+        # Libera os mapeamentos antes da remoção do diretório temporário
+        del store, store_returns, log_memmap, store_stats, C_disk
@@ -1,6 +1,15 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
-def rotate_90(A: np.ndarray) -> np.ndarray:
+# Lado dos blocos usados para materializar rotações que transpõem a matriz:
+# copiar bloco a bloco mantém leitura e escrita dentro da cache.
+_BLOCO_ROTACAO = 64
+
+
+def rotate_90(A: np.ndarray, k: int = 1, contiguous: bool = False) -> np.ndarray:
     """
     Implementa a rotação de 90° no sentido horário para uma matriz quadrada A.
     Não utiliza np.rot90.
@@ -10,68 +19,187 @@ def rotate_90(A: np.ndarray) -> np.ndarray:
     2. Inverter a ordem das colunas de B (cada linha de B deve ser lida de trás para frente)
        para formar A_rot.
 
+    A rotação é aplicada k vezes (k * 90° no sentido horário; k negativo gira
+    no sentido anti-horário) e vale também para matrizes não quadradas e
+    pilhas de matrizes (batch, n, m), girando os dois últimos eixos.
+
+    Por padrão o resultado é uma view de A, sem cópia, mas não contígua, o que
+    torna mais lentas operações posteriores como produtos de matrizes. Com
+    contiguous=True o resultado é materializado em um novo array contíguo,
+    copiado em blocos de _BLOCO_ROTACAO x _BLOCO_ROTACAO quando a rotação
+    transpõe a matriz.
+
     Parâmetros:
-    - A: Matriz quadrada de formato (n, n).
+    - A: Matriz de formato (n, m), ou pilha de matrizes (batch, n, m).
+    - k: Número de rotações de 90° no sentido horário.
+    - contiguous: Se True, retorna uma cópia contígua em vez de uma view.
 
     Retorno:
-    - Matriz rotacionada A_rot de dimensão (n, n).
+    - Matriz rotacionada A_rot de dimensão (m, n) (ou (n, m) se k for par),
+      com os mesmos eixos de lote de A.
     """
     if not isinstance(A, np.ndarray):
         raise TypeError("A entrada 'A' deve ser um np.ndarray.")
-    if A.ndim != 2:
-        raise ValueError("A entrada 'A' deve ser uma matriz 2-dimensional.")
-    if A.shape[0] != A.shape[1]:
-        raise ValueError("A entrada 'A' deve ser uma matriz quadrada (n, n).")
+    if A.ndim not in (2, 3):
+        raise ValueError("A entrada 'A' deve ser uma matriz 2-dimensional ou uma pilha (batch, n, m).")
+    if not isinstance(k, int):
+        raise TypeError("O parâmetro 'k' deve ser um inteiro.")
 
-    # Passo 1: Transpor A para obter B = A^T
-    B = A.T
+    k %= 4
+    if k == 0:
+        A_rot = A[...]
+    elif k == 1:
+        # Passo 1: Transpor A para obter B = A^T (nos dois últimos eixos)
+        B = np.swapaxes(A, -1, -2)
+        # Passo 2: Inverter a ordem das colunas de B
+        # Isso pode ser feito usando fatiamento com passo -1 para as colunas: [..., ::-1]
+        A_rot = B[..., ::-1]
+    elif k == 2:
+        # 180°: inverte linhas e colunas
+        A_rot = A[..., ::-1, ::-1]
+    else:
+        # 270° horário (90° anti-horário): transpõe e inverte a ordem das linhas
+        A_rot = np.swapaxes(A, -1, -2)[..., ::-1, :]
 
-    # Passo 2: Inverter a ordem das colunas de B
-    # Isso pode ser feito usando fatiamento com passo -1 para as colunas: [:, ::-1]
-    A_rot = B[:, ::-1]
+    if not contiguous:
+        return A_rot
+    if k % 2 == 0:
+        # Sem transposição, a cópia já percorre a memória de forma sequencial
+        return np.ascontiguousarray(A_rot)
 
-    return A_rot
+    out = np.empty(A_rot.shape, dtype=A.dtype)
+    rows, cols = A_rot.shape[-2:]
+    for i_0 in range(0, rows, _BLOCO_ROTACAO):
+        for j_0 in range(0, cols, _BLOCO_ROTACAO):
+            out[..., i_0 : i_0 + _BLOCO_ROTACAO, j_0 : j_0 + _BLOCO_ROTACAO] = (
+                A_rot[..., i_0 : i_0 + _BLOCO_ROTACAO, j_0 : j_0 + _BLOCO_ROTACAO]
+            )
+    return out
 
 
-def sum_subdiagonals(A: np.ndarray, k: int) -> float:
+def _validar_quadradas(A: np.ndarray) -> int:
+    """Valida uma matriz quadrada (n, n) ou uma pilha (batch, n, n) e retorna n."""
+    if not isinstance(A, np.ndarray):
+        raise TypeError("A entrada 'A' deve ser um np.ndarray.")
+    if A.ndim not in (2, 3):
+        raise ValueError("A entrada 'A' deve ser uma matriz 2-dimensional ou uma pilha (batch, n, n).")
+    if A.shape[-1] != A.shape[-2]:
+        raise ValueError("A entrada 'A' deve ser uma matriz quadrada (n, n).")
+    return A.shape[-1]
+
+
+def sum_subdiagonals(A: np.ndarray, k: int) -> float | np.ndarray:
     """
     Calcula a soma dos elementos na k-ésima subdiagonal abaixo da diagonal principal.
 
     A soma é definida como: sum_{i=k}^{n-1} A_{i, i-k}.
 
-    Não utiliza np.diag(A, -k); implementa a indexação manual.
+    Não utiliza np.diag(A, -k); implementa a indexação manual por meio de uma
+    view com passo (stride) de uma linha mais uma coluna, a partir de A[k, 0],
+    somada de forma vetorizada.
 
     Parâmetros:
-    - A: Matriz quadrada de dimensão (n, n).
+    - A: Matriz quadrada de dimensão (n, n), ou pilha de matrizes (batch, n, n).
     - k: Inteiro, 1 <= k < n.
 
     Retorno:
-    - Valor escalar (float) com a soma dos elementos da subdiagonal.
+    - Valor escalar (float) com a soma dos elementos da subdiagonal, ou
+      np.ndarray de tamanho batch para uma pilha de matrizes.
     """
-    if not isinstance(A, np.ndarray):
-        raise TypeError("A entrada 'A' deve ser um np.ndarray.")
-    if A.ndim != 2:
-        raise ValueError("A entrada 'A' deve ser uma matriz 2-dimensional.")
-    if A.shape[0] != A.shape[1]:
-        raise ValueError("A entrada 'A' deve ser uma matriz quadrada (n, n).")
-
-    n = A.shape[0]
+    n = _validar_quadradas(A)
     if not isinstance(k, int):
         raise TypeError("O parâmetro 'k' deve ser um inteiro.")
     if not (1 <= k < n):
         raise ValueError(f"O parâmetro 'k' deve satisfazer 1 <= k < n (onde n={n}).")
 
-    subdiagonal_sum = 0.0
     # A fórmula indica sum_{i=k}^{n-1} A_{i, i-k}
     # Onde i representa a linha e i-k representa a coluna.
-    # Para a k-ésima subdiagonal, a coluna é sempre k unidades menor que a linha.
-    # As linhas válidas para a subdiagonal iniciam em k e vão até n-1.
-    for i in range(k, n):
-        subdiagonal_sum += A[i, i - k]
+    # A partir de A[k, 0], o próximo elemento A[k+1, 1] está a uma linha e uma
+    # coluna de distância: a subdiagonal é uma view com passo strides[-2] + strides[-1].
+    start = A[..., k:, :]
+    subdiagonal = np.lib.stride_tricks.as_strided(
+        start,
+        shape=A.shape[:-2] + (n - k,),
+        strides=A.strides[:-2] + (A.strides[-2] + A.strides[-1],),
+        writeable=False,
+    )
+    subdiagonal_sum = subdiagonal.sum(axis=-1, dtype=float)
+
+    return float(subdiagonal_sum) if A.ndim == 2 else subdiagonal_sum
+
+
+# Número máximo de elementos indexados por chamada a np.bincount em
+# sum_all_diagonals; limita a memória do array de índices em pilhas grandes.
+_BINCOUNT_MAX = 1 << 22
+
+
+def sum_all_diagonals(A: np.ndarray) -> np.ndarray:
+    """
+    Calcula, de uma só vez, a soma de todas as diagonais de A (sub e super).
+
+    O elemento A_{i, j} pertence à diagonal k = i - j. Todas as somas são
+    obtidas em uma única passada com np.bincount, usando k + n - 1 como índice.
+    Pilhas de matrizes são processadas em lotes, deslocando o índice de cada
+    matriz em 2n - 1 posições.
+
+    Parâmetros:
+    - A: Matriz quadrada de dimensão (n, n), ou pilha de matrizes (batch, n, n).
+
+    Retorno:
+    - np.ndarray de tamanho 2n - 1 (ou (batch, 2n - 1)) em que a posição
+      k + n - 1 contém a soma da diagonal k: k > 0 são as subdiagonais
+      (k = 1 equivale a sum_subdiagonals(A, 1)), k = 0 a diagonal principal
+      e k < 0 as superdiagonais.
+    """
+    n = _validar_quadradas(A)
+    n_diag = 2 * n - 1
+
+    # Índice da diagonal de cada elemento: i - j + n - 1
+    rows, cols = np.indices((n, n))
+    diag_index = (rows - cols + n - 1).ravel()
+
+    if A.ndim == 2:
+        return np.bincount(diag_index, weights=A.ravel(), minlength=n_diag)
+
+    batch = A.shape[0]
+    sums = np.empty((batch, n_diag))
+    step = max(1, _BINCOUNT_MAX // max(1, n * n))
+    for b_0 in range(0, batch, step):
+        b_1 = min(b_0 + step, batch)
+        offsets = np.arange(b_1 - b_0)[:, None] * n_diag
+        sums[b_0:b_1] = np.bincount(
+            (diag_index + offsets).ravel(), weights=A[b_0:b_1].ravel(), minlength=(b_1 - b_0) * n_diag
+        ).reshape(b_1 - b_0, n_diag)
+    return sums
+
+
+def _cache_bytes() -> int:
+    """
+    Tamanho estimado da cache L2 por núcleo, em bytes. Usa os.sysconf quando a
+    plataforma expõe o valor e, caso contrário, um valor típico de 2 MiB.
+    """
+    try:
+        size = os.sysconf("SC_LEVEL2_CACHE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        size = 0
+    return size if size and size > 0 else 2 * 1024 * 1024
 
-    return float(subdiagonal_sum)
 
-def block_matmul(A: np.ndarray, B: np.ndarray, block_size: int) -> np.ndarray:    
+def _auto_block_size(itemsize: int) -> int:
+    """
+    Escolhe o tamanho de bloco para que três blocos quadrados (de A, de B e o
+    acumulador de C) caibam juntos na cache L2, arredondado para múltiplo de 32.
+    """
+    side = int(math.sqrt(_cache_bytes() / (3 * itemsize)))
+    return max(32, side - side % 32)
+
+
+def block_matmul(
+    A: np.ndarray,
+    B: np.ndarray,
+    block_size: int | None = None,
+    num_threads: int = 1,
+) -> np.ndarray:
     """
     Implementa a multiplicação de duas matrizes A e B, ambas de formato
     compatível para produto, dividindo-as em subblocos de block_size.
@@ -81,10 +209,19 @@ def block_matmul(A: np.ndarray, B: np.ndarray, block_size: int) -> np.ndarray:
     e somar ao bloco de C. Não utilize np.dot ou A @ B diretamente para
     todo o produto, mas apenas para cada subbloco individual.
 
+    Cada produto de blocos é escrito com np.matmul(..., out=) diretamente no
+    bloco de C (primeiro bloco da dimensão interna) ou em um buffer temporário
+    reaproveitado (demais blocos), evitando alocar um array novo por produto.
+    O resultado preserva o tipo das entradas (por exemplo, float32 ou int).
+    Opcionalmente, os painéis de linhas de C são distribuídos entre threads;
+    o np.matmul libera o GIL durante o cálculo.
+
     Parâmetros:
     - A: Matriz A de dimensão (m, p).
     - B: Matriz B de dimensão (p, n).
     - block_size: Inteiro > 0 indicando o tamanho de cada subbloco quadrado.
+      Se None, é escolhido a partir do tamanho da cache L2.
+    - num_threads: Número de threads que processam painéis de linhas em paralelo.
 
     Retorno:
     - Matriz C de dimensão (m, n) resultante do produto em blocos.
@@ -96,31 +233,152 @@ def block_matmul(A: np.ndarray, B: np.ndarray, block_size: int) -> np.ndarray:
     if A.shape[1] != B.shape[0]:
         raise ValueError("As dimensões das matrizes são incompatíveis para multiplicação: "
                          "A.shape[1] deve ser igual a B.shape[0].")
+    dtype = np.result_type(A, B)
+    if block_size is None:
+        block_size = _auto_block_size(dtype.itemsize)
     if not isinstance(block_size, int) or block_size <= 0:
         raise ValueError("O 'block_size' deve ser um inteiro positivo.")
+    if not isinstance(num_threads, int) or num_threads <= 0:
+        raise ValueError("O 'num_threads' deve ser um inteiro positivo.")
 
     m, p = A.shape
-    p, n = B.shape[0], B.shape[1] # p já é A.shape[1]
+    n = B.shape[1]
 
-    # Inicializa a matriz C com zeros
-    C = np.zeros((m, n))
+    # Inicializa a matriz C; cada bloco é totalmente escrito pelo primeiro produto
+    C = np.empty((m, n), dtype=dtype) if p > 0 else np.zeros((m, n), dtype=dtype)
 
-    # Percorre as linhas de A em blocos (i_0)
-    for i_0 in range(0, m, block_size):
+    def _row_panel(i_0: int) -> None:
+        i_1 = min(i_0 + block_size, m)
+        # Buffer temporário reaproveitado para todos os produtos deste painel
+        tmp = np.empty((i_1 - i_0, block_size), dtype=dtype)
         # Percorre as colunas de B em blocos (j_0)
         for j_0 in range(0, n, block_size):
+            j_1 = min(j_0 + block_size, n)
+            C_block = C[i_0:i_1, j_0:j_1]
+            tmp_block = tmp[:, : j_1 - j_0]
             # Percorre a dimensão interna (p) em blocos (k_0)
             for k_0 in range(0, p, block_size):
-                # Define os limites do bloco para A, B e C
-                # Bloco de A: A[i_0 : i_0 + block_size, k_0 : k_0 + block_size]
-                # Bloco de B: B[k_0 : k_0 + block_size, j_0 : j_0 + block_size]
+                k_1 = min(k_0 + block_size, p)
+                A_block = A[i_0:i_1, k_0:k_1]
+                B_block = B[k_0:k_1, j_0:j_1]
+                if k_0 == 0:
+                    np.matmul(A_block, B_block, out=C_block)
+                else:
+                    np.matmul(A_block, B_block, out=tmp_block)
+                    C_block += tmp_block
+
+    # Percorre as linhas de A em blocos (i_0), em série ou em paralelo
+    row_starts = range(0, m, block_size)
+    if num_threads == 1:
+        for i_0 in row_starts:
+            _row_panel(i_0)
+    else:
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            # list() propaga eventuais exceções das threads
+            list(executor.map(_row_panel, row_starts))
+
+    return C
+
+
+def _abrir_matriz(M: np.ndarray | str, nome: str) -> np.ndarray:
+    """Abre um caminho .npy como np.memmap somente leitura, ou valida um np.ndarray."""
+    if isinstance(M, (str, os.PathLike)):
+        M = np.load(M, mmap_mode="r")
+    if not isinstance(M, np.ndarray):
+        raise TypeError(f"A entrada '{nome}' deve ser um np.ndarray, np.memmap ou caminho para um arquivo .npy.")
+    if M.ndim != 2:
+        raise ValueError(f"A entrada '{nome}' deve ser uma matriz 2-dimensional.")
+    return M
+
+
+def block_matmul_out_of_core(
+    A: np.ndarray | str,
+    B: np.ndarray | str,
+    out: np.ndarray | str,
+    memory_budget: int = 256 * 1024 * 1024,
+) -> np.ndarray:
+    """
+    Multiplicação em blocos para matrizes maiores que a memória RAM.
+
+    A e B podem ser np.memmap (ou caminhos para arquivos .npy, abertos como
+    memmap somente leitura). Os blocos de A e B são lidos do disco para
+    buffers fixos em memória, o produto de cada bloco é acumulado em um
+    bloco de C também em memória e, ao final da dimensão interna, o bloco
+    é escrito na saída mapeada em disco. A saída é descarregada (flush) a
+    cada painel de linhas concluído.
 
-                # Fatiamento para obter os sub-blocos
-                A_block = A[i_0 : min(i_0 + block_size, m), k_0 : min(k_0 + block_size, p)]
-                B_block = B[k_0 : min(k_0 + block_size, p), j_0 : min(j_0 + block_size, n)]
+    O tamanho dos blocos é derivado de memory_budget: os quatro buffers em
+    memória (bloco de A, bloco de B, acumulador de C e produto temporário)
+    ocupam no máximo memory_budget bytes.
 
-                # Multiplica os sub-blocos e acumula em C.
-                # Aqui é permitido usar np.dot ou @ para a multiplicação dos sub-blocos.
-                C[i_0 : min(i_0 + block_size, m), j_0 : min(j_0 + block_size, n)] += A_block @ B_block
+    Parâmetros:
+    - A: Matriz A de dimensão (m, p), em memória, np.memmap ou caminho .npy.
+    - B: Matriz B de dimensão (p, n), em memória, np.memmap ou caminho .npy.
+    - out: Matriz de saída (m, n) gravável (por exemplo, np.memmap) com dtype
+      np.result_type(A, B), ou caminho de um arquivo .npy a ser criado.
+    - memory_budget: Memória máxima, em bytes, usada pelos buffers de blocos.
+
+    Retorno:
+    - Matriz C de dimensão (m, n), a mesma referenciada por out.
+    """
+    A = _abrir_matriz(A, "A")
+    B = _abrir_matriz(B, "B")
+    if A.shape[1] != B.shape[0]:
+        raise ValueError("As dimensões das matrizes são incompatíveis para multiplicação: "
+                         "A.shape[1] deve ser igual a B.shape[0].")
+    if not isinstance(memory_budget, int) or memory_budget <= 0:
+        raise ValueError("O 'memory_budget' deve ser um inteiro positivo (bytes).")
+
+    m, p = A.shape
+    n = B.shape[1]
+    dtype = np.result_type(A, B)
+
+    if isinstance(out, (str, os.PathLike)):
+        C = np.lib.format.open_memmap(out, mode="w+", dtype=dtype, shape=(m, n))
+    elif isinstance(out, np.ndarray):
+        if out.shape != (m, n):
+            raise ValueError("O parâmetro 'out' deve ter formato (A.shape[0], B.shape[1]).")
+        if out.dtype != dtype:
+            # Um 'out' de tipo menor truncaria silenciosamente cada bloco escrito
+            raise ValueError(f"O parâmetro 'out' deve ter dtype {dtype} (np.result_type(A, B)), não {out.dtype}.")
+        if not out.flags.writeable:
+            raise ValueError("O parâmetro 'out' deve ser gravável.")
+        C = out
+    else:
+        raise TypeError("O parâmetro 'out' deve ser um np.ndarray, np.memmap ou caminho para um arquivo .npy.")
+
+    block_size = int(math.sqrt(memory_budget / (4 * dtype.itemsize)))
+    if block_size <= 0:
+        raise ValueError("O 'memory_budget' é pequeno demais para um bloco de 1 elemento.")
+
+    # Buffers fixos em memória, reaproveitados para todos os blocos. Cada
+    # dimensão é limitada pela da matriz correspondente: produtos pequenos não
+    # alocam blocos do tamanho permitido pelo memory_budget.
+    b_m, b_p, b_n = min(block_size, m), min(block_size, p), min(block_size, n)
+    A_buf = np.empty((b_m, b_p), dtype=dtype)
+    B_buf = np.empty((b_p, b_n), dtype=dtype)
+    acc = np.empty((b_m, b_n), dtype=dtype)
+    tmp = np.empty((b_m, b_n), dtype=dtype)
+
+    for i_0 in range(0, m, block_size):
+        i_1 = min(i_0 + block_size, m)
+        for j_0 in range(0, n, block_size):
+            j_1 = min(j_0 + block_size, n)
+            acc_block = acc[: i_1 - i_0, : j_1 - j_0]
+            acc_block.fill(0)
+            tmp_block = tmp[: i_1 - i_0, : j_1 - j_0]
+            for k_0 in range(0, p, block_size):
+                k_1 = min(k_0 + block_size, p)
+                # Lê os blocos do disco para os buffers em memória
+                A_block = A_buf[: i_1 - i_0, : k_1 - k_0]
+                B_block = B_buf[: k_1 - k_0, : j_1 - j_0]
+                np.copyto(A_block, A[i_0:i_1, k_0:k_1])
+                np.copyto(B_block, B[k_0:k_1, j_0:j_1])
+                np.matmul(A_block, B_block, out=tmp_block)
+                acc_block += tmp_block
+            C[i_0:i_1, j_0:j_1] = acc_block
+        # Descarrega o painel de linhas concluído
+        if isinstance(C, np.memmap):
+            C.flush()
 
-    return C
\ No newline at end of file
+    return C
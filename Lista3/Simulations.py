@@ -1,19 +1,119 @@
+import math
+import numbers
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, Iterator
+
 import numpy as np
 
 
-def simular_precos(S0: float, sigma: float, days: int) -> np.ndarray:
+def simular_precos(
+    S0: float,
+    sigma: float,
+    days: int,
+    n_paths: int | None = None,
+    seed: int | np.random.Generator | None = None,
+    dtype: type = np.float64,
+    chunk_size: int | None = None,
+) -> np.ndarray:
     """
     Simula uma série temporal de preços de ações de forma simplificada com ruído Gaussiano.
 
     A função retorna um np.ndarray de tamanho days + 1, onde o primeiro
     elemento é S0 e, a cada passo, soma-se um ruído normal de desvio padrão sigma.
 
+    Se n_paths for informado, a simulação é feita em lote (Monte Carlo):
+    todos os choques de um bloco de trajetórias são sorteados em uma única
+    chamada a um np.random.Generator e acumulados com uma única soma cumulativa.
+    Os blocos de trajetórias (linhas) são sorteados em sequência do mesmo
+    gerador, de modo que o resultado é idêntico para qualquer chunk_size.
+
+    Parâmetros:
+    - S0: preço inicial positivo.
+    - sigma: desvio padrão do ruído (volatilidade).
+    - days: número de dias a simular.
+    - n_paths: número de trajetórias a simular. Se None (padrão), simula uma
+      única trajetória usando o gerador global np.random (comportamento original).
+    - seed: semente (ou np.random.Generator) usada no modo em lote.
+    - dtype: tipo do array de saída no modo em lote (np.float64 ou np.float32).
+      Os choques são sempre acumulados em float64; dtype afeta apenas o armazenamento.
+    - chunk_size: número de trajetórias sorteadas por bloco no modo em lote.
+      Limita a memória temporária; por padrão, todas as trajetórias de uma vez.
+
+    Retorno: np.ndarray com preços simulados, de formato (days + 1,) ou,
+    no modo em lote, (n_paths, days + 1).
+    """
+    if S0 <= 0:
+        raise ValueError("S0 (preço inicial) deve ser um valor positivo.")
+    if sigma < 0:
+        raise ValueError("sigma (desvio padrão do ruído) não pode ser negativo.")
+    if days < 0:
+        raise ValueError("days (número de dias a simular) não pode ser negativo.")
+
+    if n_paths is None:
+        # Trajetória única: sorteia todos os ruídos de uma vez do gerador global.
+        # A soma cumulativa é sequencial, logo equivale ao laço prices[i] = prices[i-1] + epsilon_t.
+        prices = np.empty(days + 1)
+        prices[0] = S0
+        prices[1:] = np.random.normal(0, sigma, days)
+        return np.cumsum(prices, out=prices)
+
+    if not isinstance(n_paths, numbers.Integral) or n_paths <= 0:
+        raise ValueError("n_paths (número de trajetórias) deve ser um inteiro positivo.")
+    if chunk_size is None:
+        chunk_size = n_paths
+    if not isinstance(chunk_size, numbers.Integral) or chunk_size <= 0:
+        raise ValueError("chunk_size deve ser um inteiro positivo.")
+    if np.dtype(dtype) not in (np.dtype(np.float32), np.dtype(np.float64)):
+        raise ValueError("dtype deve ser np.float32 ou np.float64.")
+
+    rng = np.random.default_rng(seed)
+    paths = np.empty((n_paths, days + 1), dtype=dtype)
+    paths[:, 0] = S0
+
+    for start in range(0, n_paths, chunk_size):
+        stop = min(start + chunk_size, n_paths)
+        # Um único sorteio por bloco: (linhas do bloco, days) choques.
+        block = np.empty((stop - start, days + 1))
+        block[:, 0] = S0
+        block[:, 1:] = rng.normal(0, sigma, size=(stop - start, days))
+        paths[start:stop] = np.cumsum(block, axis=1, out=block)
+
+    return paths
+
+def simular_precos_em_blocos(
+    S0: float,
+    sigma: float,
+    days: int,
+    block_size: int,
+    n_paths: int = 1,
+    seed: int | np.random.SeedSequence | None = None,
+    dtype: type = np.float64,
+) -> Iterator[np.ndarray]:
+    """
+    Gera trajetórias de preços em blocos de colunas (dias), para simulações
+    que não cabem inteiras na memória.
+
+    Cada bloco tem formato (n_paths, block_size) (o último pode ser menor) e a
+    concatenação dos blocos ao longo do eixo 1 forma a matriz (n_paths, days + 1)
+    cuja primeira coluna é S0. O último preço de cada bloco é carregado como
+    ponto de partida do bloco seguinte.
+
+    O bloco i usa seu próprio gerador, derivado do i-ésimo filho de
+    np.random.SeedSequence(seed). Assim, a mesma semente (inteira ou a mesma
+    SeedSequence, que não é alterada) e o mesmo block_size reproduzem
+    exatamente a mesma sequência de blocos.
+
     Parâmetros:
     - S0: preço inicial positivo.
     - sigma: desvio padrão do ruído (volatilidade).
     - days: número de dias a simular.
+    - block_size: número de colunas (dias) por bloco.
+    - n_paths: número de trajetórias simuladas em paralelo.
+    - seed: semente (ou np.random.SeedSequence) da qual os fluxos por bloco são derivados.
+    - dtype: tipo dos blocos gerados (np.float64 ou np.float32).
 
-    Retorno: np.ndarray com preços simulados.
+    Retorno: iterador de np.ndarray de formato (n_paths, <= block_size).
     """
     if S0 <= 0:
         raise ValueError("S0 (preço inicial) deve ser um valor positivo.")
@@ -21,157 +121,739 @@ def simular_precos(S0: float, sigma: float, days: int) -> np.ndarray:
         raise ValueError("sigma (desvio padrão do ruído) não pode ser negativo.")
     if days < 0:
         raise ValueError("days (número de dias a simular) não pode ser negativo.")
+    if not isinstance(block_size, numbers.Integral) or block_size <= 0:
+        raise ValueError("block_size deve ser um inteiro positivo.")
+    if not isinstance(n_paths, numbers.Integral) or n_paths <= 0:
+        raise ValueError("n_paths (número de trajetórias) deve ser um inteiro positivo.")
+
+    seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    last = np.full(n_paths, S0, dtype=float)
+
+    for i, c0 in enumerate(range(0, days + 1, block_size)):
+        c1 = min(c0 + block_size, days + 1)
+        # Filho i de seed_seq, construído diretamente (como faria seed_seq.spawn)
+        # para não alterar o estado da SeedSequence recebida do chamador.
+        child = np.random.SeedSequence(
+            seed_seq.entropy, spawn_key=seed_seq.spawn_key + (i,), pool_size=seed_seq.pool_size
+        )
+        rng = np.random.default_rng(child)
+        # A coluna 0 do buffer é o último preço do bloco anterior (ou S0).
+        # No primeiro bloco, a própria coluna S0 faz parte da saída.
+        n_shocks = c1 - max(c0, 1)
+        block = np.empty((n_paths, n_shocks + 1))
+        block[:, 0] = last
+        block[:, 1:] = rng.normal(0, sigma, size=(n_paths, n_shocks))
+        np.cumsum(block, axis=1, out=block)
+        last = block[:, -1].copy()
+        yield (block if c0 == 0 else block[:, 1:]).astype(dtype, copy=False)
+
+
+def retornos_log_em_blocos(blocos: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+    """
+    Calcula log-retornos bloco a bloco sobre uma sequência de blocos de preços
+    (por exemplo, a saída de simular_precos_em_blocos).
 
-    prices = np.zeros(days + 1)
-    prices[0] = S0
+    O último preço de cada bloco é guardado para calcular o primeiro retorno
+    do bloco seguinte, de modo que a concatenação da saída é igual aos
+    log-retornos da série completa.
 
-    for i in range(1, days + 1):
-        # Gerar ruído Gaussiano com média 0 e desvio padrão sigma
-        epsilon_t = np.random.normal(0, sigma)
-        prices[i] = prices[i-1] + epsilon_t
+    Parâmetros:
+    - blocos: iterável de np.ndarray de preços, 1-D ou 2-D, com o tempo no último eixo.
 
-    return prices
+    Retorno: iterador de np.ndarray com os log-retornos de cada bloco.
+    """
+    last = None
+    for bloco in blocos:
+        if not isinstance(bloco, np.ndarray):
+            raise TypeError("Cada bloco deve ser um np.ndarray.")
+        if np.any(bloco <= 0):
+            raise ValueError("Todos os preços devem ser positivos para calcular log-retornos.")
+        if bloco.shape[-1] == 0:
+            continue
+        if last is None:
+            returns_log = np.log(bloco[..., 1:] / bloco[..., :-1])
+        else:
+            returns_log = np.empty(bloco.shape)
+            returns_log[..., 0] = np.log(bloco[..., 0] / last)
+            np.log(bloco[..., 1:] / bloco[..., :-1], out=returns_log[..., 1:])
+        last = bloco[..., -1].copy()
+        yield returns_log
+
+
+def janela_movel_em_blocos(
+    blocos: Iterable[np.ndarray],
+    window: int,
+    func: Callable[..., np.ndarray],
+    **kwargs,
+) -> Iterator[np.ndarray]:
+    """
+    Aplica uma estatística de janela móvel (sma ou rolling_std) bloco a bloco.
+
+    As últimas window - 1 observações de cada bloco são carregadas para o
+    bloco seguinte, de modo que a concatenação da saída é igual a aplicar
+    func à série completa. A memória usada fica limitada a um bloco mais
+    window - 1 colunas.
+
+    Parâmetros:
+    - blocos: iterável de np.ndarray, 1-D ou 2-D, com o tempo no último eixo.
+    - window: tamanho da janela.
+    - func: função de janela móvel com assinatura func(returns, window, **kwargs).
+    - kwargs: argumentos adicionais repassados a func (por exemplo, days_size).
 
-def calc_retornos_simples(prices: np.ndarray) -> np.ndarray:
+    Retorno: iterador de np.ndarray com os valores da estatística em cada bloco.
+    """
+    if not isinstance(window, int) or window <= 0:
+        raise ValueError("A 'window' deve ser um inteiro positivo.")
+
+    tail = None
+    for bloco in blocos:
+        dados = bloco if tail is None else np.concatenate((tail, bloco), axis=-1)
+        if dados.shape[-1] >= window:
+            yield func(dados, window, **kwargs)
+        # Guarda apenas o necessário para completar a primeira janela do próximo bloco
+        tail = dados[..., dados.shape[-1] - min(window - 1, dados.shape[-1]):].copy()
+
+# Tamanho dos blocos (ao longo do tempo) usados no cálculo in-place das
+# razões de preços; limita a cópia temporária que o NumPy faz quando a
+# entrada e a saída de uma operação se sobrepõem.
+_BLOCO_INPLACE = 1 << 16
+
+
+def _saida_no_ultimo_eixo(out: np.ndarray, shape: tuple, axis: int, nome: str) -> np.ndarray:
+    """
+    Valida um buffer de saída fornecido pelo chamador (inclusive np.memmap) e
+    o retorna como view com o eixo do tempo por último.
+
+    shape é o formato esperado já com o tempo no último eixo.
+    """
+    if not isinstance(out, np.ndarray):
+        raise TypeError(f"O parâmetro '{nome}' deve ser um np.ndarray.")
+    if not np.issubdtype(out.dtype, np.floating):
+        raise TypeError(f"O parâmetro '{nome}' deve ser um array de ponto flutuante.")
+    out_last = np.moveaxis(out, axis, -1) if out.ndim == len(shape) else out
+    if out_last.shape != shape:
+        raise ValueError(f"O parâmetro '{nome}' não tem o formato esperado ao longo de 'axis'.")
+    if not out.flags.writeable:
+        raise ValueError(f"O parâmetro '{nome}' deve ser gravável.")
+    return out_last
+
+
+def _razao_precos(
+    prices: np.ndarray,
+    axis: int,
+    out: np.ndarray | None,
+    inplace: bool,
+) -> np.ndarray:
+    """
+    Calcula P_t / P_{t-1} ao longo de axis, escrevendo em out, no próprio
+    array de preços (inplace) ou em um novo array.
+
+    Não valida os preços; uso interno de calc_retornos_simples e calc_retornos_log.
+    """
+    x = np.moveaxis(prices, axis, -1)
+    n = x.shape[-1]
+
+    if inplace:
+        if out is not None:
+            raise ValueError("Os parâmetros 'out' e 'inplace' não podem ser usados juntos.")
+        if not np.issubdtype(prices.dtype, np.floating):
+            raise TypeError("O modo 'inplace' exige um array de preços de ponto flutuante.")
+        if not prices.flags.writeable:
+            raise ValueError("O modo 'inplace' exige um array de preços gravável.")
+        # Percorre o tempo de trás para frente: cada bloco sobrescreve
+        # P_{a+1..b} com as razões, e P_a ainda não foi alterado quando o
+        # bloco anterior precisar dele.
+        for b in range(n - 1, 0, -_BLOCO_INPLACE):
+            a = max(0, b - _BLOCO_INPLACE)
+            np.divide(x[..., a + 1 : b + 1], x[..., a:b], out=x[..., a + 1 : b + 1])
+        return np.moveaxis(x[..., 1:], -1, axis)
+
+    if out is None:
+        # Preços float32 produzem retornos float32; os demais tipos (inteiros de
+        # qualquer tamanho, float16, float64) produzem pelo menos float64.
+        if prices.dtype == np.float32:
+            dtype = prices.dtype
+        else:
+            dtype = np.result_type(prices.dtype, np.float64)
+        return np.moveaxis(np.divide(x[..., 1:], x[..., :-1], dtype=dtype), -1, axis)
+
+    out_last = _saida_no_ultimo_eixo(out, x.shape[:-1] + (n - 1,), axis, "out")
+    np.divide(x[..., 1:], x[..., :-1], out=out_last)
+    return out
+
+
+def _validar_precos(prices: np.ndarray, axis: int, nome_retorno: str) -> None:
+    if not isinstance(prices, np.ndarray):
+        raise TypeError("A entrada 'prices' deve ser um np.ndarray.")
+    if prices.ndim not in (1, 2):
+        raise ValueError("A entrada 'prices' deve ser um vetor (1-dimensional) ou uma matriz 2-dimensional.")
+    if prices.shape[axis] < 2:
+        raise ValueError(f"São necessários pelo menos 2 preços para calcular {nome_retorno}.")
+    if np.any(prices <= 0):
+        raise ValueError(f"Todos os preços devem ser positivos para calcular {nome_retorno}.")
+
+
+def calc_retornos_simples(
+    prices: np.ndarray,
+    axis: int = -1,
+    out: np.ndarray | None = None,
+    inplace: bool = False,
+) -> np.ndarray:
     """
     Calcula os retornos simples diários dado um vetor de preços.
 
     Os retornos simples são calculados como (P_t - P_{t-1}) / P_{t-1}.
 
     Parâmetros:
-    - prices: Um np.ndarray contendo os preços (P_0, P_1, ..., P_n).
+    - prices: Um np.ndarray contendo os preços (P_0, P_1, ..., P_n), ou uma
+      matriz 2-D (por exemplo, (ativos, tempo)).
+    - axis: Eixo do tempo, para entradas 2-D. Padrão: último eixo.
+    - out: Buffer opcional (inclusive np.memmap) onde os retornos são escritos,
+      com um elemento a menos que prices ao longo de axis.
+    - inplace: Se True, os retornos são escritos sobre os próprios preços
+      (posições 1..n ao longo de axis) e o retorno é uma view de prices.
 
     Retorno:
     - np.ndarray de dimensão n com os retornos simples.
     """
-    if not isinstance(prices, np.ndarray):
-        raise TypeError("A entrada 'prices' deve ser um np.ndarray.")
-    if prices.ndim != 1:
-        raise ValueError("A entrada 'prices' deve ser um vetor (1-dimensional).")
-    if len(prices) < 2:
-        raise ValueError("São necessários pelo menos 2 preços para calcular retornos.")
-    if np.any(prices <= 0):
-        raise ValueError("Todos os preços devem ser positivos para calcular retornos simples.")
+    _validar_precos(prices, axis, "retornos simples")
 
     # Retornos simples: (P_t - P_{t-1}) / P_{t-1}
-    # equivalentemente P_t / P_{t-1} - 1
-    # Usamos fatiamento para vetorizar o cálculo.
-    returns = (prices[1:] / prices[:-1]) - 1
+    # equivalentemente P_t / P_{t-1} - 1, calculado sobre o buffer da razão.
+    returns = _razao_precos(prices, axis, out, inplace)
+    np.subtract(returns, 1, out=returns)
     return returns
 
-def calc_retornos_log(prices: np.ndarray) -> np.ndarray:
+def calc_retornos_log(
+    prices: np.ndarray,
+    axis: int = -1,
+    out: np.ndarray | None = None,
+    inplace: bool = False,
+) -> np.ndarray:
     """
     Calcula os log-retornos diários dado um vetor de preços.
 
     Os log-retornos são calculados como ln(P_t / P_{t-1}).
 
     Parâmetros:
-    - prices: Um np.ndarray contendo os preços (P_0, P_1, ..., P_n).
+    - prices: Um np.ndarray contendo os preços (P_0, P_1, ..., P_n), ou uma
+      matriz 2-D (por exemplo, (ativos, tempo)).
+    - axis: Eixo do tempo, para entradas 2-D. Padrão: último eixo.
+    - out: Buffer opcional (inclusive np.memmap) onde os log-retornos são escritos,
+      com um elemento a menos que prices ao longo de axis.
+    - inplace: Se True, os log-retornos são escritos sobre os próprios preços
+      (posições 1..n ao longo de axis) e o retorno é uma view de prices.
 
     Retorno:
     - np.ndarray de dimensão n com os log-retornos.
     """
-    if not isinstance(prices, np.ndarray):
-        raise TypeError("A entrada 'prices' deve ser um np.ndarray.")
-    if prices.ndim != 1:
-        raise ValueError("A entrada 'prices' deve ser um vetor (1-dimensional).")
-    if len(prices) < 2:
-        raise ValueError("São necessários pelo menos 2 preços para calcular log-retornos.")
-    if np.any(prices <= 0):
-        raise ValueError("Todos os preços devem ser positivos para calcular log-retornos.")
+    _validar_precos(prices, axis, "log-retornos")
 
-    # Log-retornos: ln(P_t / P_{t-1})
-    # Usamos fatiamento para vetorizar o cálculo.
-    returns_log = np.log(prices[1:] / prices[:-1])
+    # Log-retornos: ln(P_t / P_{t-1}), calculado sobre o buffer da razão.
+    returns_log = _razao_precos(prices, axis, out, inplace)
+    np.log(returns_log, out=returns_log)
     return returns_log
-    try:
-        calc_retornos_simples([1, 2, 3]) # Lista em vez de numpy array
-    except TypeError as e:
-        print(f"Erro esperado para entrada não np.ndarray: {e}")
 
-    try:
-        calc_retornos_log(np.array([[10, 20], [30, 40]])) # Array 2D
-    except ValueError as e:
-        print(f"Erro esperado para array não 1-dimensional: {e}")
 
+# Número máximo de janelas calculadas a partir de uma mesma soma cumulativa.
+# A cada segmento a soma é reiniciada (reancorada) em zero, o que limita o
+# erro de arredondamento acumulado em séries muito longas.
+_ANCORA_SOMA = 1 << 16
 
-def sma(returns: np.ndarray, window: int) -> np.ndarray:
+
+def _soma_movel(x: np.ndarray, window: int, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Soma das janelas móveis de tamanho window ao longo do último eixo de x,
+    em O(n) via somas de prefixos reancoradas a cada _ANCORA_SOMA janelas.
+    Retorna sempre float64.
+
+    Não valida as entradas; uso interno de sma e rolling_std.
+    """
+    n = x.shape[-1]
+    n_out = n - window + 1
+    if out is None:
+        out = np.empty(x.shape[:-1] + (n_out,))
+
+    seg = min(_ANCORA_SOMA, n_out)
+    # Buffer reaproveitado entre segmentos: prefixo com zero à esquerda
+    prefix = np.zeros(x.shape[:-1] + (seg + window,))
+    for a in range(0, n_out, seg):
+        b = min(a + seg, n_out)
+        length = b - a + window - 1
+        # Desloca o segmento pelo seu primeiro valor: as somas parciais ficam
+        # pequenas mesmo em séries de nível alto (preços), preservando a precisão
+        ref = x[..., a : a + 1]
+        buf = prefix[..., 1 : length + 1]
+        np.subtract(x[..., a : a + length], ref, out=buf)
+        np.cumsum(buf, axis=-1, out=buf)
+        np.subtract(prefix[..., window : length + 1], prefix[..., : length + 1 - window], out=out[..., a:b])
+        out[..., a:b] += window * ref
+
+    return out
+
+
+def sma(returns: np.ndarray, window: int, axis: int = -1) -> np.ndarray:
     """
     Calcula a Média Móvel Simples (SMA) para um vetor de retornos.
 
     Para cada índice t a partir de t = window, a SMA é calculada como:
     SMA_t = (1 / window) * sum(r_i) para i de t-window+1 até t.
 
+    Todas as janelas são calculadas em uma única passada (O(n)) a partir de
+    somas cumulativas, reancoradas periodicamente para evitar perda de precisão
+    em séries longas.
+
     Parâmetros:
-    - returns: Um np.ndarray contendo o vetor de retornos [r_1, ..., r_n].
+    - returns: Um np.ndarray contendo o vetor de retornos [r_1, ..., r_n], ou uma
+      matriz 2-D (por exemplo, (ativos, tempo)).
     - window: O tamanho da janela da média móvel.
+    - axis: Eixo do tempo, para entradas 2-D. Padrão: último eixo.
 
     Retorno:
-    - np.ndarray de tamanho n - window + 1 com as médias móveis simples.
+    - np.ndarray de tamanho n - window + 1 ao longo de axis com as médias móveis simples.
     """
     if not isinstance(returns, np.ndarray):
         raise TypeError("A entrada 'returns' deve ser um np.ndarray.")
-    if returns.ndim != 1:
-        raise ValueError("A entrada 'returns' deve ser um vetor (1-dimensional).")
+    if returns.ndim not in (1, 2):
+        raise ValueError("A entrada 'returns' deve ser um vetor (1-dimensional) ou uma matriz 2-dimensional.")
     if not isinstance(window, int) or window <= 0:
         raise ValueError("A 'window' deve ser um inteiro positivo.")
-    if len(returns) < window:
+    if returns.shape[axis] < window:
         raise ValueError("O tamanho do vetor de retornos deve ser maior ou igual à 'window'.")
 
-    n = len(returns)
-    sma_values = np.zeros(n - window + 1)
+    x = np.moveaxis(returns, axis, -1)
+    sma_values = _soma_movel(x, window)
+    sma_values /= window
 
-    for i in range(window - 1, n):
-        sma_values[i - (window - 1)] = np.mean(returns[i - window + 1 : i + 1])
-        # Alternativamente, para um cálculo mais eficiente em numpy para grandes arrays:
-        # sma_values = np.convolve(returns, np.ones(window)/window, mode='valid')
-        # No entanto, a descrição da função SMA_t indica a soma até t, o que o loop faz.
-        # np.convolve com 'valid' também faz isso, retornando um array de n - window + 1 elementos.
-        # Poderíamos usar:
-        # return np.convolve(returns, np.ones(window) / window, 'valid')
-        # mas o loop explícito segue a fórmula mais de perto.
+    return np.moveaxis(sma_values, -1, axis)
+
+# Segmentos menores para as somas de quadrados, que crescem mais rápido que as
+# somas simples quando a série tem nível alto ou tendência (preços).
+_ANCORA_QUADRADOS = 1 << 12
+# Limite relativo abaixo do qual a soma dos quadrados dos desvios de uma janela
+# é considerada dominada por cancelamento numérico (média grande em relação ao
+# desvio padrão). Essas janelas são recalculadas em duas passadas.
+_TOL_CANCELAMENTO = 1e-10
+
+
+def _m2_movel(x: np.ndarray, window: int, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Soma dos quadrados dos desvios em relação à média (M2) de cada janela móvel
+    ao longo do último eixo de x, em O(n) via somas móveis de x e x^2.
 
-    return sma_values
+    Em cada segmento de _ANCORA_QUADRADOS janelas os dados são deslocados pelo
+    primeiro valor do segmento antes de elevar ao quadrado. Janelas em que
+    M2 ainda perde precisão por cancelamento (séries de nível alto e pouca
+    variação, como preços) são recalculadas em duas passadas.
 
-def rolling_std(returns: np.ndarray, window: int, days_size: int = 0) -> np.ndarray:
+    Não valida as entradas; uso interno de rolling_std. Retorna sempre float64.
+    """
+    n = x.shape[-1]
+    n_out = n - window + 1
+    if out is None:
+        out = np.empty(x.shape[:-1] + (n_out,))
+
+    seg = min(_ANCORA_QUADRADOS, n_out)
+    # Buffers reaproveitados entre segmentos: prefixos com zero à esquerda
+    prefix1 = np.zeros(x.shape[:-1] + (seg + window,))
+    prefix2 = np.zeros(x.shape[:-1] + (seg + window,))
+    s1 = np.empty(x.shape[:-1] + (seg,))
+    s2 = np.empty(x.shape[:-1] + (seg,))
+    for a in range(0, n_out, seg):
+        b = min(a + seg, n_out)
+        length = b - a + window - 1
+        y = prefix1[..., 1 : length + 1]
+        y2 = prefix2[..., 1 : length + 1]
+        np.subtract(x[..., a : a + length], x[..., a : a + 1], out=y)
+        np.multiply(y, y, out=y2)
+        np.cumsum(y, axis=-1, out=y)
+        np.cumsum(y2, axis=-1, out=y2)
+
+        w1 = s1[..., : b - a]
+        w2 = s2[..., : b - a]
+        np.subtract(prefix1[..., window : length + 1], prefix1[..., : length + 1 - window], out=w1)
+        np.subtract(prefix2[..., window : length + 1], prefix2[..., : length + 1 - window], out=w2)
+
+        # M2 = S2 - S1^2 / window
+        m2 = out[..., a:b]
+        np.multiply(w1, w1, out=m2)
+        m2 /= -window
+        m2 += w2
+
+        # Fallback estável: recalcula em duas passadas as janelas em que M2 é
+        # pequeno demais frente às somas de prefixo de onde foi obtido
+        unstable = np.nonzero(m2 < prefix2[..., window : length + 1] * _TOL_CANCELAMENTO)
+        if unstable[0].size:
+            windows = np.lib.stride_tricks.sliding_window_view(x[..., a : a + length], window, axis=-1)
+            m2[unstable] = np.var(windows[unstable], axis=-1) * window
+
+    np.maximum(out, 0.0, out=out)
+    return out
+
+
+def rolling_std(returns: np.ndarray, window: int, days_size: int = 0, axis: int = -1) -> np.ndarray:
     """
     Calcula o desvio padrão móvel para um vetor de retornos.
 
     Para cada t >= window, calcula o desvio padrão da janela.
     A normalização é 1 / (window - days_size).
 
+    Todas as janelas são calculadas em uma única passada (O(n)) a partir de
+    somas móveis de x e x^2 sobre dados deslocados, com recálculo em duas
+    passadas das janelas sujeitas a cancelamento numérico (médias grandes).
+
     Parâmetros:
-    - returns: Um np.ndarray contendo o vetor de retornos [r_1, ..., r_n].
+    - returns: Um np.ndarray contendo o vetor de retornos [r_1, ..., r_n], ou uma
+      matriz 2-D (por exemplo, (ativos, tempo)).
     - window: O tamanho da janela para o cálculo do desvio padrão.
     - days_size: Parâmetro opcional para ajustar a normalização.
                  Por padrão é 0, resultando na normalização padrão (ddof=0).
                  Se days_size=1, a normalização é (N-1), que é o comportamento padrão de np.std(ddof=1).
+    - axis: Eixo do tempo, para entradas 2-D. Padrão: último eixo.
 
     Retorno:
-    - np.ndarray de tamanho n - window + 1 com os desvios padrão móveis.
+    - np.ndarray de tamanho n - window + 1 ao longo de axis com os desvios padrão móveis.
     """
     if not isinstance(returns, np.ndarray):
         raise TypeError("A entrada 'returns' deve ser um np.ndarray.")
-    if returns.ndim != 1:
-        raise ValueError("A entrada 'returns' deve ser um vetor (1-dimensional).")
+    if returns.ndim not in (1, 2):
+        raise ValueError("A entrada 'returns' deve ser um vetor (1-dimensional) ou uma matriz 2-dimensional.")
     if not isinstance(window, int) or window <= 0:
         raise ValueError("A 'window' deve ser um inteiro positivo.")
     if not isinstance(days_size, int) or days_size < 0 or days_size >= window:
         raise ValueError("O 'days_size' deve ser um inteiro não negativo e menor que a 'window'.")
-    if len(returns) < window:
+    if returns.shape[axis] < window:
         raise ValueError("O tamanho do vetor de retornos deve ser maior ou igual à 'window'.")
 
-    n = len(returns)
-    rolling_std_values = np.zeros(n - window + 1)
+    # O parâmetro days_size faz o papel de ddof (delta degrees of freedom) em numpy.std:
+    # a soma dos quadrados dos desvios é normalizada por (window - days_size).
+    x = np.moveaxis(returns, axis, -1)
+    rolling_std_values = _m2_movel(x, window)
+    rolling_std_values /= window - days_size
+    np.sqrt(rolling_std_values, out=rolling_std_values)
+
+    return np.moveaxis(rolling_std_values, -1, axis)
+
+
+def compute_return_stats(
+    prices: np.ndarray,
+    windows: Iterable[int],
+    days_size: int = 0,
+    base: str = "log",
+    axis: int = -1,
+    out_simples: np.ndarray | None = None,
+    out_log: np.ndarray | None = None,
+    out_sma: dict | None = None,
+    out_std: dict | None = None,
+) -> dict:
+    """
+    Calcula, em uma única chamada, retornos simples, log-retornos, SMA e
+    desvio padrão móvel para várias janelas.
 
-    # O parâmetro ddof (delta degrees of freedom) em numpy.std controla a normalização.
-    # ddof = 0 (padrão) normaliza por N (window).
-    # ddof = 1 normaliza por N-1.
-    # A fórmula indica normalização por (window - days_size).
-    # Então, ddof = days_size.
-    ddof_param = days_size
+    Equivale a chamar calc_retornos_simples, calc_retornos_log, sma e
+    rolling_std em sequência, mas valida a entrada uma única vez, calcula a
+    razão P_t / P_{t-1} uma única vez (diretamente no buffer dos log-retornos)
+    e escreve cada estatística diretamente em um buffer de saída, sem arrays
+    temporários do tamanho da série. Os buffers podem ser fornecidos pelo
+    chamador (inclusive np.memmap) e reaproveitados entre chamadas; os que não
+    forem fornecidos são alocados.
+
+    Parâmetros:
+    - prices: np.ndarray de preços, 1-D ou 2-D (por exemplo, (ativos, tempo)).
+    - windows: tamanhos de janela para SMA e desvio padrão móvel.
+    - days_size: ajuste da normalização do desvio padrão (ddof), como em rolling_std.
+    - base: retornos sobre os quais SMA e desvio padrão são calculados: "log" ou "simples".
+    - axis: eixo do tempo, para entradas 2-D. Padrão: último eixo.
+    - out_simples: buffer opcional para os retornos simples, com um elemento a
+      menos que prices ao longo de axis.
+    - out_log: buffer opcional para os log-retornos, com o mesmo formato de out_simples.
+    - out_sma: dicionário opcional {janela: buffer} para as médias móveis, com
+      n - janela + 1 elementos ao longo de axis (n = número de retornos).
+    - out_std: dicionário opcional {janela: buffer} para os desvios padrão
+      móveis, com o mesmo formato dos buffers de out_sma.
 
-    for i in range(window - 1, n):
-        rolling_std_values[i - (window - 1)] = np.std(returns[i - window + 1 : i + 1], ddof=ddof_param)
+    Retorno:
+    - Dicionário com as chaves:
+        - "simples": retornos simples;
+        - "log": log-retornos;
+        - "sma": dicionário {janela: médias móveis};
+        - "rolling_std": dicionário {janela: desvios padrão móveis}.
+      Quando um buffer é fornecido, o próprio buffer é retornado na chave correspondente.
+    """
+    _validar_precos(prices, axis, "retornos")
+    if base not in ("log", "simples"):
+        raise ValueError("O parâmetro 'base' deve ser 'log' ou 'simples'.")
+    windows = list(windows)
+    n_returns = prices.shape[axis] - 1
+    for window in windows:
+        if not isinstance(window, int) or window <= 0:
+            raise ValueError("Cada 'window' deve ser um inteiro positivo.")
+        if window > n_returns:
+            raise ValueError("O tamanho do vetor de retornos deve ser maior ou igual à 'window'.")
+    min_window = min(windows, default=n_returns)
+    if not isinstance(days_size, int) or days_size < 0 or days_size >= min_window:
+        raise ValueError("O 'days_size' deve ser um inteiro não negativo e menor que a 'window'.")
+    out_sma = {} if out_sma is None else out_sma
+    out_std = {} if out_std is None else out_std
+
+    # A razão P_t / P_{t-1} é calculada uma única vez, no buffer dos log-retornos;
+    # os retornos simples são derivados dela antes de aplicar o logaritmo.
+    log_returns = _razao_precos(prices, axis, out_log, False)
+    ratio = np.moveaxis(log_returns, axis, -1)
+    out_shape = ratio.shape[:-1]
+    if out_simples is None:
+        simple_returns = np.empty_like(log_returns)
+        simple_last = np.moveaxis(simple_returns, axis, -1)
+    else:
+        simple_returns = out_simples
+        simple_last = _saida_no_ultimo_eixo(out_simples, ratio.shape, axis, "out_simples")
+    np.subtract(ratio, 1.0, out=simple_last)
+    np.log(ratio, out=ratio)
+
+    source = ratio if base == "log" else simple_last
+    sma_values = {}
+    std_values = {}
+    for window in windows:
+        shape = out_shape + (n_returns - window + 1,)
+
+        if window in out_sma:
+            sma_values[window] = out_sma[window]
+            sma_out = _saida_no_ultimo_eixo(out_sma[window], shape, axis, f"out_sma[{window}]")
+        else:
+            sma_out = np.empty(shape)
+            sma_values[window] = np.moveaxis(sma_out, -1, axis)
+        _soma_movel(source, window, out=sma_out)
+        sma_out /= window
+
+        if window in out_std:
+            std_values[window] = out_std[window]
+            std_out = _saida_no_ultimo_eixo(out_std[window], shape, axis, f"out_std[{window}]")
+        else:
+            std_out = np.empty(shape)
+            std_values[window] = np.moveaxis(std_out, -1, axis)
+        _m2_movel(source, window, out=std_out)
+        std_out /= window - days_size
+        np.sqrt(std_out, out=std_out)
+
+    return {
+        "simples": simple_returns,
+        "log": log_returns,
+        "sma": sma_values,
+        "rolling_std": std_values,
+    }
+
+
+class _RollingWindow(ABC):
+    """
+    Base das estatísticas móveis incrementais: mantém as últimas window
+    observações em um buffer circular (ring buffer) de tamanho fixo.
+
+    As atualizações são protegidas por um threading.Lock, de modo que um mesmo
+    objeto pode ser alimentado por várias threads (por exemplo, threads de feed
+    de preços). As estatísticas são recalculadas exatamente a partir do buffer
+    a cada volta completa do anel, o que evita o acúmulo de erro de
+    arredondamento em fluxos longos sem perder o custo O(1) amortizado.
+    """
+
+    __slots__ = ("window", "_buffer", "_pos", "_count", "_lock")
+
+    def __init__(self, window: int) -> None:
+        if not isinstance(window, int) or window <= 0:
+            raise ValueError("A 'window' deve ser um inteiro positivo.")
+        self.window = window
+        self._buffer = [0.0] * window
+        self._pos = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def _ordered(self) -> list:
+        """Conteúdo válido do buffer, da observação mais antiga à mais recente."""
+        if self._count < self.window:
+            return self._buffer[: self._count]
+        return self._buffer[self._pos :] + self._buffer[: self._pos]
+
+    def _reset_from(self, values: np.ndarray) -> None:
+        """Reescreve o buffer com as últimas window observações de values."""
+        last = values[-self.window :].tolist()
+        self._count = len(last)
+        self._buffer = last + [0.0] * (self.window - self._count)
+        self._pos = self._count % self.window
+        self._recompute()
+
+    @abstractmethod
+    def _recompute(self) -> None:
+        """Recalcula exatamente o estado da estatística a partir do buffer."""
+
+    def _history(self, values: np.ndarray) -> tuple[np.ndarray, int]:
+        """Concatena as últimas window - 1 observações do buffer com values."""
+        if not isinstance(values, np.ndarray):
+            raise TypeError("A entrada 'values' deve ser um np.ndarray.")
+        if values.ndim != 1:
+            raise ValueError("A entrada 'values' deve ser um vetor (1-dimensional).")
+        previous = self._ordered()[-(self.window - 1) :] if self.window > 1 else []
+        return np.concatenate((np.asarray(previous, dtype=float), values.astype(float, copy=False))), len(previous)
+
+    def _batch_output(self, batch: np.ndarray, h: int, n_new: int) -> np.ndarray:
+        """Alinha a saída de sma/rolling_std sobre o histórico com os novos valores."""
+        result = np.full(n_new, np.nan)
+        # A janela que termina no novo valor i começa no índice h + i - window + 1 do histórico
+        first = max(0, self.window - 1 - h)
+        if first < n_new:
+            result[first:] = batch[h + first - self.window + 1 :]
+        return result
+
+
+class RollingMean(_RollingWindow):
+    """
+    Média móvel simples incremental, equivalente a sma para um fluxo de dados.
+
+    Exemplo:
+    - rm = RollingMean(20); rm.update(0.01) retorna a média das últimas 20
+      observações (np.nan enquanto a janela não estiver completa).
+    """
+
+    __slots__ = ("_sum",)
+
+    def __init__(self, window: int) -> None:
+        super().__init__(window)
+        self._sum = 0.0
+
+    def _recompute(self) -> None:
+        self._sum = math.fsum(self._ordered())
+
+    @property
+    def value(self) -> float:
+        """Média atual da janela, ou np.nan se a janela ainda não estiver completa."""
+        if self._count < self.window:
+            return np.nan
+        return self._sum / self.window
+
+    def update(self, x: float) -> float:
+        """
+        Adiciona uma observação em O(1).
+
+        Parâmetros:
+        - x: nova observação.
+
+        Retorno: média da janela após a atualização (np.nan se incompleta).
+        """
+        x = float(x)
+        with self._lock:
+            old = self._buffer[self._pos]
+            self._buffer[self._pos] = x
+            self._pos = (self._pos + 1) % self.window
+            if self._count < self.window:
+                self._count += 1
+                self._sum += x
+            else:
+                self._sum += x - old
+            if self._pos == 0:
+                self._recompute()
+            return self.value
+
+    def update_many(self, values: np.ndarray) -> np.ndarray:
+        """
+        Adiciona várias observações de uma vez, de forma vetorizada.
+
+        Parâmetros:
+        - values: vetor (1-D) de novas observações.
+
+        Retorno: np.ndarray com a média da janela após cada nova observação
+        (np.nan enquanto a janela não estiver completa).
+        """
+        with self._lock:
+            history, h = self._history(values)
+            if len(history) >= self.window:
+                result = self._batch_output(sma(history, self.window), h, len(values))
+            else:
+                result = np.full(len(values), np.nan)
+            self._reset_from(history)
+            return result
+
+
+class RollingStd(_RollingWindow):
+    """
+    Desvio padrão móvel incremental, equivalente a rolling_std para um fluxo de dados.
+
+    Usa a recorrência de Welford para janelas deslizantes: cada observação que
+    entra substitui a mais antiga, atualizando média e soma dos quadrados dos
+    desvios (M2) em O(1).
+
+    Parâmetros do construtor:
+    - window: tamanho da janela.
+    - days_size: ajuste da normalização, com o mesmo significado de rolling_std (ddof).
+    """
 
-    return rolling_std_values
\ No newline at end of file
+    __slots__ = ("days_size", "_mean", "_m2")
+
+    def __init__(self, window: int, days_size: int = 0) -> None:
+        super().__init__(window)
+        if not isinstance(days_size, int) or days_size < 0 or days_size >= window:
+            raise ValueError("O 'days_size' deve ser um inteiro não negativo e menor que a 'window'.")
+        self.days_size = days_size
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def _recompute(self) -> None:
+        values = self._ordered()
+        if not values:
+            self._mean, self._m2 = 0.0, 0.0
+            return
+        self._mean = math.fsum(values) / len(values)
+        self._m2 = math.fsum((v - self._mean) ** 2 for v in values)
+
+    @property
+    def value(self) -> float:
+        """Desvio padrão atual da janela, ou np.nan se a janela ainda não estiver completa."""
+        if self._count < self.window:
+            return np.nan
+        return math.sqrt(max(self._m2, 0.0) / (self.window - self.days_size))
+
+    def update(self, x: float) -> float:
+        """
+        Adiciona uma observação em O(1).
+
+        Parâmetros:
+        - x: nova observação.
+
+        Retorno: desvio padrão da janela após a atualização (np.nan se incompleta).
+        """
+        x = float(x)
+        with self._lock:
+            old = self._buffer[self._pos]
+            self._buffer[self._pos] = x
+            self._pos = (self._pos + 1) % self.window
+            if self._count < self.window:
+                # Welford clássico enquanto a janela enche
+                self._count += 1
+                delta = x - self._mean
+                self._mean += delta / self._count
+                self._m2 += delta * (x - self._mean)
+            else:
+                # Welford para janela deslizante: x entra, old sai
+                old_mean = self._mean
+                self._mean += (x - old) / self.window
+                self._m2 += (x - old) * (x - self._mean + old - old_mean)
+            if self._pos == 0:
+                self._recompute()
+            return self.value
+
+    def update_many(self, values: np.ndarray) -> np.ndarray:
+        """
+        Adiciona várias observações de uma vez, de forma vetorizada.
+
+        Parâmetros:
+        - values: vetor (1-D) de novas observações.
+
+        Retorno: np.ndarray com o desvio padrão da janela após cada nova
+        observação (np.nan enquanto a janela não estiver completa).
+        """
+        with self._lock:
+            history, h = self._history(values)
+            if len(history) >= self.window:
+                batch = rolling_std(history, self.window, self.days_size)
+                result = self._batch_output(batch, h, len(values))
+            else:
+                result = np.full(len(values), np.nan)
+            self._reset_from(history)
+            return result
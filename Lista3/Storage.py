@@ -0,0 +1,123 @@
+import json
+import os
+
+import numpy as np
+
+# Nomes dos arquivos que compõem um PriceStore dentro do seu diretório
+_ARQUIVO_PRECOS = "precos.npy"
+_ARQUIVO_TICKERS = "tickers.json"
+
+
+class PriceStore:
+    """
+    Armazenamento colunar de preços em disco, acessado por mapeamento de memória.
+
+    Os preços ficam em um único arquivo .npy com uma matriz (ativos, tempo) em
+    ordem C, acompanhado de um índice de tickers em JSON. Cada linha da matriz
+    é contígua no arquivo, de modo que store["AAPL"] é uma view (np.memmap)
+    sem cópia, que pode ser passada diretamente a calc_retornos_log, sma,
+    rolling_std ou local_peaks. A matriz inteira (store.matriz) pode ser
+    passada às funções que aceitam entradas 2-D.
+
+    Vários processos que abrem o mesmo diretório compartilham o cache de
+    páginas do sistema operacional em vez de manter cópias próprias dos dados.
+    Ao ser serializado (pickle) para outro processo, o store transmite apenas
+    o caminho e o modo, e o processo de destino refaz o mapeamento.
+
+    Parâmetros do construtor:
+    - path: diretório do store, criado previamente por PriceStore.criar ou PriceStore.de_matriz.
+    - mode: "r" (somente leitura, padrão) ou "r+" (leitura e escrita).
+    """
+
+    def __init__(self, path: str, mode: str = "r") -> None:
+        if mode not in ("r", "r+"):
+            raise ValueError("O parâmetro 'mode' deve ser 'r' ou 'r+'.")
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"Diretório do store não encontrado: {path}")
+
+        self.path = path
+        self.mode = mode
+        self.matriz = np.load(os.path.join(path, _ARQUIVO_PRECOS), mmap_mode=mode)
+        with open(os.path.join(path, _ARQUIVO_TICKERS), encoding="utf-8") as f:
+            self.tickers = json.load(f)
+        if self.matriz.ndim != 2 or self.matriz.shape[0] != len(self.tickers):
+            raise ValueError("O arquivo de preços deve ser uma matriz (ativos, tempo) com uma linha por ticker.")
+        self._indice = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+    @classmethod
+    def criar(cls, path: str, tickers: list, n_tempo: int, dtype: type = np.float64) -> "PriceStore":
+        """
+        Cria um store vazio (preenchido com zeros) e o abre no modo "r+".
+
+        Parâmetros:
+        - path: diretório do store (criado se não existir).
+        - tickers: lista de nomes de ativos, um por linha da matriz.
+        - n_tempo: número de observações (colunas) por ativo.
+        - dtype: tipo dos preços armazenados.
+
+        Retorno: PriceStore aberto para leitura e escrita.
+        """
+        if not isinstance(tickers, list) or not all(isinstance(t, str) for t in tickers):
+            raise TypeError("tickers deve ser uma lista de strings (nomes de ações).")
+        if not tickers:
+            raise ValueError("A lista de tickers não pode estar vazia.")
+        if len(set(tickers)) != len(tickers):
+            raise ValueError("A lista de tickers não pode conter nomes repetidos.")
+        if not isinstance(n_tempo, int) or n_tempo <= 0:
+            raise ValueError("n_tempo deve ser um inteiro positivo.")
+
+        os.makedirs(path, exist_ok=True)
+        matriz = np.lib.format.open_memmap(
+            os.path.join(path, _ARQUIVO_PRECOS), mode="w+", dtype=dtype, shape=(len(tickers), n_tempo)
+        )
+        matriz.flush()
+        del matriz
+        with open(os.path.join(path, _ARQUIVO_TICKERS), "w", encoding="utf-8") as f:
+            json.dump(tickers, f)
+        return cls(path, mode="r+")
+
+    @classmethod
+    def de_matriz(cls, path: str, tickers: list, precos: np.ndarray) -> "PriceStore":
+        """
+        Cria um store a partir de uma matriz (ativos, tempo) já em memória ou
+        de outro np.memmap, copiando uma linha por vez.
+
+        Parâmetros:
+        - path: diretório do store (criado se não existir).
+        - tickers: lista de nomes de ativos, um por linha de precos.
+        - precos: np.ndarray 2-D de formato (len(tickers), tempo).
+
+        Retorno: PriceStore aberto para leitura e escrita.
+        """
+        if not isinstance(precos, np.ndarray):
+            raise TypeError("A entrada 'precos' deve ser um np.ndarray.")
+        if precos.ndim != 2 or precos.shape[0] != len(tickers):
+            raise ValueError("A entrada 'precos' deve ser uma matriz (ativos, tempo) com uma linha por ticker.")
+
+        store = cls.criar(path, tickers, precos.shape[1], dtype=precos.dtype)
+        for i in range(precos.shape[0]):
+            store.matriz[i] = precos[i]
+        store.flush()
+        return store
+
+    def __getitem__(self, ticker: str) -> np.ndarray:
+        """Série de preços de um ativo, como view do arquivo mapeado (sem cópia)."""
+        try:
+            return self.matriz[self._indice[ticker]]
+        except KeyError:
+            raise KeyError(f"Ticker não encontrado no store: {ticker}") from None
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._indice
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def __reduce__(self):
+        # Serializa apenas a localização: o processo de destino remapeia o arquivo
+        return (type(self), (self.path, self.mode))
+
+    def flush(self) -> None:
+        """Grava em disco as alterações pendentes (modo "r+")."""
+        if self.mode == "r+":
+            self.matriz.flush()
@@ -1,56 +1,128 @@
+import atexit
+import contextlib
 import threading
 import time
 import random
-from typing import Dict, List, Any, Tuple, Optional
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, Any, Tuple, Optional, Union
 import numpy as np
 
-# O dicionário para armazenar os resultados das médias móveis de cada ação.
-# Ele será inicializado dentro da função principal 'calcular_medias_moveis'
-# e as threads irão preenchê-lo.
-# Como cada thread escreve em uma chave única, um lock explícito para a escrita
-# no dicionário não é estritamente necessário para garantir correção em Python,
-# pois as operações de atribuição de dicionário para uma única chave são atômicas.
-# No entanto, em cenários mais complexos ou para clareza em concorrência, um lock
-# ou outro mecanismo de sincronização seria considerado.
-# Para este problema, a simplicidade de atribuição direta é suficiente.
-_results_container: Dict[str, np.ndarray] = {}
+def _medias_moveis_matriz(precos: np.ndarray, janela: int) -> np.ndarray:
+    """
+    Calcula a média móvel simples (SMA) de cada linha de uma matriz de preços
+    (ativos, tempo) com uma única soma acumulada vetorizada.
+
+    A soma de cada janela é obtida pela diferença de duas posições da soma
+    acumulada. Os preços são deslocados pelo primeiro preço de cada linha antes
+    da soma, o que mantém a soma acumulada pequena e reduz o erro de cancelamento.
+
+    :param precos: Matriz NumPy (ativos, tempo) com pelo menos `janela` colunas.
+    :type precos: np.ndarray
+    :param janela: O tamanho da janela para o cálculo da média móvel.
+    :type janela: int
+    :return: Matriz (ativos, tempo - janela + 1) com as médias móveis.
+    :rtype: np.ndarray
+    """
+    base = precos[:, :1].astype(float)
+    acumulada = np.zeros((precos.shape[0], precos.shape[1] + 1), dtype=float)
+    np.cumsum(precos - base, axis=1, out=acumulada[:, 1:])
+    medias = acumulada[:, janela:] - acumulada[:, :-janela]
+    medias /= janela
+    medias += base
+    return medias
+
+
+# Intervalo, em janelas, de reancoragem das somas móveis de _m2_movel_segmento
+_ANCORA_QUADRADOS = 1 << 12
 
-def _calculate_single_ma_task(stock_name: str, prices_array: np.ndarray, janela: int) -> None:
+# Limite relativo abaixo do qual a soma dos quadrados dos desvios de uma janela
+# é considerada afetada por cancelamento e recalculada em duas passadas
+_TOL_CANCELAMENTO = 1e-10
+
+
+def _m2_movel_segmento(x: np.ndarray, janela: int, out: np.ndarray) -> np.ndarray:
     """
-    Função alvo para cada thread: calcula a média móvel simples (SMA) para uma
-    única série de preços e armazena o resultado no container global.
+    Calcula a soma dos quadrados dos desvios em relação à média (M2) de cada
+    janela móvel de uma série 1-dimensional, em O(n) via somas móveis de x e x^2.
+
+    A cada _ANCORA_QUADRADOS janelas os dados são deslocados pelo primeiro valor
+    do trecho antes de elevar ao quadrado, o que mantém as somas acumuladas
+    pequenas. Janelas em que M2 ainda perde precisão por cancelamento (séries de
+    nível alto e pouca variação) são recalculadas em duas passadas.
 
-    Utiliza `np.convolve` para uma implementação eficiente da média móvel.
+    :param x: Série com len(out) + janela - 1 elementos.
+    :type x: np.ndarray
+    :param janela: O tamanho da janela.
+    :type janela: int
+    :param out: Array float64 de saída onde os valores de M2 são escritos.
+    :type out: np.ndarray
+    :return: O próprio `out`.
+    :rtype: np.ndarray
+    """
+    n_out = len(out)
+    seg = min(_ANCORA_QUADRADOS, n_out)
+    # Buffers reaproveitados entre trechos: somas acumuladas com zero à esquerda
+    acumulada1 = np.zeros(seg + janela)
+    acumulada2 = np.zeros(seg + janela)
+    somas1 = np.empty(seg)
+    somas2 = np.empty(seg)
+    for a in range(0, n_out, seg):
+        b = min(a + seg, n_out)
+        tamanho = b - a + janela - 1
+        y = acumulada1[1 : tamanho + 1]
+        y2 = acumulada2[1 : tamanho + 1]
+        np.subtract(x[a : a + tamanho], x[a], out=y)
+        np.multiply(y, y, out=y2)
+        np.cumsum(y, out=y)
+        np.cumsum(y2, out=y2)
+        s1 = somas1[: b - a]
+        s2 = somas2[: b - a]
+        np.subtract(acumulada1[janela : tamanho + 1], acumulada1[: tamanho + 1 - janela], out=s1)
+        np.subtract(acumulada2[janela : tamanho + 1], acumulada2[: tamanho + 1 - janela], out=s2)
+        m2 = out[a:b]
+        np.multiply(s1, s1, out=m2)
+        m2 /= -janela
+        m2 += s2
+        # Janelas com cancelamento relevante: recalculadas em duas passadas
+        instaveis = np.nonzero(m2 < acumulada2[janela : tamanho + 1] * _TOL_CANCELAMENTO)[0]
+        if instaveis.size:
+            janelas = np.lib.stride_tricks.sliding_window_view(x[a : a + tamanho], janela)
+            m2[instaveis] = np.var(janelas[instaveis], axis=-1) * janela
+    np.maximum(out, 0.0, out=out)
+    return out
+
+
+def _calculate_single_ma_task(prices_array: np.ndarray, janela: int) -> np.ndarray:
+    """
+    Função alvo do pool de workers: calcula a média móvel simples (SMA) para uma
+    única série de preços cujo comprimento não é compartilhado por outras séries.
 
-    :param stock_name: O nome da ação (chave para o resultado).
-    :type stock_name: str
     :param prices_array: O array NumPy de preços para a ação.
     :type prices_array: np.ndarray
     :param janela: O tamanho da janela para o cálculo da média móvel.
     :type janela: int
+    :return: Array com as médias móveis da série.
+    :rtype: np.ndarray
     """
-    if len(prices_array) < janela:
-        print(f"Aviso: Preços de '{stock_name}' ({len(prices_array)} pontos) são menores que a janela ({janela}). Definindo média móvel como vazia.")
-        _results_container[stock_name] = np.array([])
-        return
-
-    # A média móvel simples é equivalente a uma convolução com um kernel de 1/janela
-    # e np.ones(janela)
-    # 'valid' mode significa que apenas os pontos onde a janela se sobrepõe completamente
-    # aos dados de entrada são calculados, resultando em um array de tamanho N - janela + 1.
-    moving_averages = np.convolve(prices_array, np.ones(janela)/janela, mode='valid')
-    
-    _results_container[stock_name] = moving_averages
-    print(f"Thread para '{stock_name}' completou o cálculo da média móvel. Tamanho do resultado: {len(moving_averages)}")
+    return _medias_moveis_matriz(prices_array[np.newaxis, :], janela)[0]
 
 
-def calcular_medias_moveis(acoes: Dict[str, np.ndarray], janela: int) -> Dict[str, np.ndarray]:
+def calcular_medias_moveis(
+    acoes: Dict[str, np.ndarray],
+    janela: int,
+    max_workers: int = 4,
+    executor: Optional[Executor] = None
+) -> Dict[str, np.ndarray]:
     """
-    Calcula as médias móveis de preços de múltiplas ações em paralelo.
+    Calcula as médias móveis de preços de múltiplas ações em lote.
 
-    Para cada ação no dicionário `acoes`, uma thread separada é criada para
-    calcular sua média móvel de `janela` dias. Os resultados são coletados
-    em um dicionário e retornados.
+    As séries com o mesmo comprimento são agrupadas em uma matriz (ativos, tempo)
+    e as médias móveis de todo o grupo são calculadas de uma só vez, com uma soma
+    acumulada vetorizada. As séries de comprimento único (irregulares) são
+    distribuídas em um pool limitado de workers, em vez de uma thread por ação.
+    Os resultados são coletados em um dicionário local e retornados, sem estado
+    global compartilhado, de modo que chamadas concorrentes são seguras.
 
     :param acoes: Dicionário onde as chaves são nomes de ações (str) e os valores
                   são arrays NumPy de preços (np.ndarray).
@@ -58,11 +130,16 @@ def calcular_medias_moveis(acoes: Dict[str, np.ndarray], janela: int) -> Dict[st
     :type acoes: Dict[str, np.ndarray]
     :param janela: Tamanho da janela para a média móvel. Deve ser um inteiro positivo.
     :type janela: int
+    :param max_workers: Número de workers do pool persistente usado para as séries irregulares.
+                        Deve ser um inteiro positivo.
+    :type max_workers: int
+    :param executor: Executor a ser usado no lugar do pool persistente do módulo.
+    :type executor: Optional[concurrent.futures.Executor]
     :raises TypeError: Se `acoes` não for um dicionário, ou `janela` não for um inteiro.
-    :raises ValueError: Se `acoes` estiver vazio, `janela` não for positivo,
-                        ou qualquer array de preços não for 1-dimensional ou contiver
-                        dados insuficientes para a janela.
-    :return: Um dicionário com as médias móveis calculadas para cada ação.
+    :raises ValueError: Se `acoes` estiver vazio, `janela` ou `max_workers` não forem positivos,
+                        ou qualquer array de preços não for 1-dimensional ou contiver valores negativos.
+    :return: Um dicionário com as médias móveis calculadas para cada ação, na ordem de `acoes`.
+             Ações com menos preços que `janela` recebem um array vazio.
     :rtype: Dict[str, np.ndarray]
 
     :Example:
@@ -77,8 +154,6 @@ def calcular_medias_moveis(acoes: Dict[str, np.ndarray], janela: int) -> Dict[st
     >>> # for stock, ma_array in mas.items():
     >>> #    print(f"{stock}: {ma_array}")
     """
-    global _results_container # Referencia a variável global para que as threads possam atualizá-la
-
     # --- Validações de Parâmetros ---
     if not isinstance(acoes, dict):
         raise TypeError("O parâmetro 'acoes' deve ser um dicionário.")
@@ -96,27 +171,95 @@ def calcular_medias_moveis(acoes: Dict[str, np.ndarray], janela: int) -> Dict[st
             
     if not isinstance(janela, int) or janela <= 0:
         raise ValueError("O parâmetro 'janela' deve ser um inteiro positivo.")
+    if not isinstance(max_workers, int) or max_workers <= 0:
+        raise ValueError("O parâmetro 'max_workers' deve ser um inteiro positivo.")
 
-    # Limpa o container de resultados de execuções anteriores
-    _results_container = {} 
+    print(f"\nIniciando cálculo em lote de médias móveis para {len(acoes)} ações...")
 
-    threads: List[threading.Thread] = []
+    # Resultados locais a esta chamada: nenhuma estrutura global é compartilhada
+    resultados: Dict[str, np.ndarray] = {}
 
-    # Cria e inicia uma thread para cada ação
+    # Agrupa as ações pelo comprimento da série de preços
+    grupos: Dict[int, List[str]] = {}
     for stock_name, prices_array in acoes.items():
-        thread = threading.Thread(target=_calculate_single_ma_task, args=(stock_name, prices_array, janela))
-        threads.append(thread)
-        thread.start()
+        if len(prices_array) < janela:
+            print(f"Aviso: Preços de '{stock_name}' ({len(prices_array)} pontos) são menores que a janela ({janela}). Definindo média móvel como vazia.")
+            resultados[stock_name] = np.array([])
+        else:
+            grupos.setdefault(len(prices_array), []).append(stock_name)
+
+    # Séries de mesmo comprimento: uma matriz e uma soma acumulada por grupo
+    irregulares: List[str] = []
+    for nomes in grupos.values():
+        if len(nomes) == 1:
+            irregulares.append(nomes[0])
+            continue
+        medias = _medias_moveis_matriz(np.stack([acoes[nome] for nome in nomes]), janela)
+        for nome, linha in zip(nomes, medias):
+            resultados[nome] = linha
+
+    # Séries de comprimento único: pool limitado de workers
+    if irregulares:
+        reserva = _executor_reservado("threads", max_workers) if executor is None else contextlib.nullcontext(executor)
+        with reserva as pool:
+            futures = {nome: pool.submit(_calculate_single_ma_task, acoes[nome], janela) for nome in irregulares}
+        for nome, future in futures.items():
+            resultados[nome] = future.result()
 
-    print(f"\nIniciando cálculo paralelo de médias móveis para {len(acoes)} ações...")
+    print("\nCálculo de médias móveis concluído para todas as ações.")
 
-    # Espera que todas as threads terminem sua execução
-    for thread in threads:
-        thread.join()
+    # Mantém a ordem das ações de entrada
+    return {stock_name: resultados[stock_name] for stock_name in acoes}
 
-    print("\nCálculo de médias móveis concluído para todas as ações.")
 
-    return _results_container
+# Número de saídas por bloco do kernel de volatilidade (limita a memória
+# temporária). Os blocos são alinhados a múltiplos deste valor na série completa.
+_SAIDAS_POR_BLOCO = 1 << 16
+
+# Os segmentos distribuídos entre threads/processos começam em múltiplos do
+# intervalo de reancoragem de _m2_movel_segmento: cada janela é então calculada com a
+# mesma âncora em qualquer divisão, e os resultados são idênticos bit a bit.
+_GRADE_SEGMENTOS = _ANCORA_QUADRADOS
+
+# Backends disponíveis para calcular_volatilidade
+_BACKENDS_VOLATILIDADE = ("threads", "processes", "serial-vectorized")
+
+
+def _volatility_kernel(segmento: np.ndarray, janela: int, out: np.ndarray, inicio: int = 0) -> None:
+    """
+    Kernel vetorizado comum a todos os backends: calcula o desvio padrão
+    amostral (ddof=1) de cada janela de `segmento` e escreve em `out`.
+
+    Usa as somas móveis de x e x^2 de `_m2_movel_segmento`, em O(n) em vez de
+    O(n * janela). Essas somas são reancoradas a cada _GRADE_SEGMENTOS janelas
+    a partir do início do trecho processado; como os segmentos começam em
+    múltiplos de _GRADE_SEGMENTOS e os blocos são alinhados a múltiplos de
+    _SAIDAS_POR_BLOCO na série completa (`inicio` é a posição de out[0] na
+    saída completa), o valor obtido para uma janela não depende de como o
+    array de retornos foi dividido entre threads ou processos.
+
+    :param segmento: Trecho dos retornos com len(out) + janela - 1 elementos.
+    :type segmento: np.ndarray
+    :param janela: O tamanho da janela para o cálculo da volatilidade.
+    :type janela: int
+    :param out: Array de saída onde as volatilidades são escritas.
+    :type out: np.ndarray
+    :param inicio: Índice, na saída da série completa, da primeira janela de `segmento`.
+    :type inicio: int
+    """
+    if janela == 1:
+        out.fill(np.nan)  # Desvio padrão amostral indefinido, como np.std(ddof=1)
+        return
+    start = 0
+    while start < len(out):
+        # Fim do bloco: próximo múltiplo de _SAIDAS_POR_BLOCO na saída completa
+        end = min(len(out), (inicio + start) // _SAIDAS_POR_BLOCO * _SAIDAS_POR_BLOCO + _SAIDAS_POR_BLOCO - inicio)
+        bloco = out[start:end]
+        _m2_movel_segmento(segmento[start : end + janela - 1], janela, out=bloco)
+        bloco /= janela - 1
+        np.sqrt(bloco, out=bloco)
+        start = end
+
 
 def _calculate_volatility_segment(
     retornos: np.ndarray,
@@ -131,7 +274,8 @@ def _calculate_volatility_segment(
     segmento específico do array de saída `result_array`.
 
     Cada thread é responsável por calcular a volatilidade para um intervalo
-    disjunto de índices na matriz de resultado final.
+    disjunto de índices na matriz de resultado final. O trecho de retornos
+    lido pela thread se sobrepõe em `janela - 1` elementos ao da thread seguinte.
 
     :param retornos: O array NumPy completo de retornos diários.
     :type retornos: np.ndarray
@@ -148,29 +292,344 @@ def _calculate_volatility_segment(
     :param thread_id: Um ID para identificar a thread nos logs.
     :type thread_id: int
     """
-    # print(f"Thread {thread_id}: Processando índices de {start_output_idx} a {end_output_idx-1} do resultado.")
-    for i in range(start_output_idx, end_output_idx):
-        # O slice de dados para o cálculo do desvio padrão
-        # Para o resultado no índice 'i', a janela de dados vai de 'i' até 'i + janela - 1'
-        data_window = retornos[i : i + janela]
-        
-        # Calcula o desvio padrão da janela. ddof=1 para desvio padrão amostral.
-        volatility = np.std(data_window, ddof=1) 
-        
-        result_array[i] = volatility
-        # Pequeno atraso para simular o trabalho real e observar a concorrência
-        # time.sleep(random.uniform(0.001, 0.005)) 
-    # print(f"Thread {thread_id}: Concluída.")
+    # Para o resultado no índice 'i', a janela de dados vai de 'i' até 'i + janela - 1'
+    segmento = retornos[start_output_idx : end_output_idx + janela - 1]
+    _volatility_kernel(segmento, janela, result_array[start_output_idx:end_output_idx], start_output_idx)
+
+
+def _calculate_volatility_segments_process(
+    input_name: str,
+    output_name: str,
+    input_size: int,
+    output_size: int,
+    segmentos: List[Tuple[int, int, int, int, int]],
+    janela: int
+) -> None:
+    """
+    Função alvo para cada processo: equivalente a `_calculate_volatility_segment`,
+    mas lendo os retornos e escrevendo os resultados em blocos de
+    `multiprocessing.shared_memory`, sem copiar os dados para o processo.
+
+    Os blocos podem conter várias séries concatenadas (submissão em lote), e uma
+    mesma tarefa pode calcular segmentos de várias séries.
+
+    :param input_name: Nome do bloco de memória compartilhada com os retornos (float64).
+    :type input_name: str
+    :param output_name: Nome do bloco de memória compartilhada com as saídas (float64).
+    :type output_name: str
+    :param input_size: Número total de elementos no bloco de entrada.
+    :type input_size: int
+    :param output_size: Número total de elementos no bloco de saída.
+    :type output_size: int
+    :param segmentos: Lista de tuplas (posição da série na entrada, número de retornos da série,
+                      posição da série na saída, índice inicial, índice final exclusivo),
+                      com os índices relativos à saída da série.
+    :type segmentos: List[Tuple[int, int, int, int, int]]
+    :param janela: O tamanho da janela para o cálculo da volatilidade.
+    :type janela: int
+    """
+    shm_in = shared_memory.SharedMemory(name=input_name)
+    shm_out = shared_memory.SharedMemory(name=output_name)
+    try:
+        entrada = np.ndarray((input_size,), dtype=np.float64, buffer=shm_in.buf)
+        saida = np.ndarray((output_size,), dtype=np.float64, buffer=shm_out.buf)
+        for input_offset, num_retornos, output_offset, start, end in segmentos:
+            retornos = entrada[input_offset : input_offset + num_retornos]
+            result_array = saida[output_offset : output_offset + num_retornos - janela + 1]
+            _calculate_volatility_segment(retornos, janela, start, end, result_array, 0)
+        del entrada, saida, retornos, result_array
+    finally:
+        shm_in.close()
+        shm_out.close()
+
+
+# Executores persistentes compartilhados pelas funções do módulo: no máximo um
+# por backend ("threads" ou "processes"), guardado junto com seu número de
+# workers. São criados sob demanda e reutilizados, evitando criar e destruir
+# threads/processos a cada chamada.
+_executores: Dict[str, Tuple[Executor, int]] = {}
+_executores_lock = threading.Lock()
+
+# Reservas ativas de cada executor: chamadas do módulo que ainda estão
+# submetendo tarefas a ele. Um executor substituído só é encerrado quando
+# não há mais reservas.
+_reservas: Dict[Executor, int] = {}
+
+
+def _obter_executor(backend: str, max_workers: int) -> Executor:
+    """Corpo de `obter_executor`; deve ser chamado com `_executores_lock` adquirido."""
+    atual = _executores.get(backend)
+    if atual is not None and atual[1] >= max_workers:
+        return atual[0]
+    if backend == "threads":
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="AdvancedConcurrency")
+    else:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+    _executores[backend] = (executor, max_workers)
+    if atual is not None and not _reservas.get(atual[0]):
+        atual[0].shutdown(wait=False)  # As tarefas já submetidas ainda são concluídas
+    return executor
+
+
+def obter_executor(backend: str = "threads", max_workers: int = 4) -> Executor:
+    """
+    Retorna o executor persistente do módulo para o `backend`, com pelo menos
+    `max_workers` workers, criando-o na primeira chamada.
+
+    Há um único executor por backend. Um pedido com mais workers que o executor
+    atual o substitui por um maior; um pedido com menos workers reutiliza o
+    atual (o paralelismo efetivo é limitado pelo número de tarefas submetidas).
+    O executor substituído é encerrado com `shutdown(wait=False)`: as tarefas já
+    submetidas terminam normalmente, mas novas submissões a ele falham. Por isso
+    o executor retornado não deve ser guardado entre chamadas; as funções do
+    módulo o reservam enquanto submetem tarefas, adiando seu encerramento.
+    O executor atual é encerrado ao final do programa (ou por `encerrar_executores`).
+
+    :param backend: "threads" (ThreadPoolExecutor) ou "processes" (ProcessPoolExecutor).
+    :type backend: str
+    :param max_workers: Número mínimo de workers do executor. Deve ser um inteiro positivo.
+    :type max_workers: int
+    :raises ValueError: Se `backend` não for "threads" ou "processes", ou `max_workers` não for positivo.
+    :return: O executor compartilhado.
+    :rtype: concurrent.futures.Executor
+    """
+    if backend not in ("threads", "processes"):
+        raise ValueError("O parâmetro 'backend' deve ser 'threads' ou 'processes'.")
+    if not isinstance(max_workers, int) or max_workers <= 0:
+        raise ValueError("O parâmetro 'max_workers' deve ser um inteiro positivo.")
+
+    with _executores_lock:
+        return _obter_executor(backend, max_workers)
 
 
-def calcular_volatilidade(retornos: np.ndarray, janela: int, num_threads: int) -> np.ndarray:
+@contextlib.contextmanager
+def _executor_reservado(backend: str, max_workers: int) -> Iterator[Executor]:
+    """
+    Obtém o executor compartilhado como `obter_executor` e o reserva durante o
+    bloco `with`, de modo que uma substituição concorrente não o encerre antes
+    que todas as tarefas do bloco tenham sido submetidas.
+    """
+    with _executores_lock:
+        executor = _obter_executor(backend, max_workers)
+        _reservas[executor] = _reservas.get(executor, 0) + 1
+    try:
+        yield executor
+    finally:
+        with _executores_lock:
+            _reservas[executor] -= 1
+            if _reservas[executor] == 0:
+                del _reservas[executor]
+                atual = _executores.get(backend)
+                if atual is None or atual[0] is not executor:
+                    executor.shutdown(wait=False)  # Substituído durante a reserva
+
+
+def encerrar_executores() -> None:
+    """
+    Encerra todos os executores persistentes criados por `obter_executor`,
+    aguardando as tarefas pendentes. Chamadas seguintes criam executores novos.
+    """
+    with _executores_lock:
+        executores = [executor for executor, _ in _executores.values()]
+        _executores.clear()
+    for executor in executores:
+        executor.shutdown(wait=True)
+
+
+atexit.register(encerrar_executores)
+
+
+def _validar_retornos(retornos: np.ndarray, nome: str = "retornos") -> None:
+    """Valida um array de retornos de entrada de calcular_volatilidade."""
+    if not isinstance(retornos, np.ndarray):
+        raise TypeError(f"O parâmetro '{nome}' deve ser um np.ndarray.")
+    if retornos.ndim != 1:
+        raise ValueError(f"O array '{nome}' deve ser 1-dimensional.")
+
+
+def _segmentos_saida(num_output_elements: int, num_partes: int) -> List[Tuple[int, int]]:
+    """
+    Divide os índices [0, num_output_elements) em até `num_partes` intervalos
+    contíguos, com inícios em múltiplos de _GRADE_SEGMENTOS.
+    """
+    if num_output_elements <= 0:
+        return []
+    chunk_size = (num_output_elements + num_partes - 1) // num_partes
+    chunk_size = (chunk_size + _GRADE_SEGMENTOS - 1) // _GRADE_SEGMENTOS * _GRADE_SEGMENTOS
+    return [
+        (start, min(start + chunk_size, num_output_elements))
+        for start in range(0, num_output_elements, chunk_size)
+    ]
+
+
+def _tarefas_volatilidade(tamanhos_saida: List[int], num_partes: int) -> List[List[Tuple[int, int, int]]]:
+    """
+    Agrupa os segmentos de todas as séries em tarefas de tamanho semelhante.
+
+    O alvo de cada tarefa é cerca de 1/num_partes do total de saídas: séries
+    maiores que o alvo são divididas em segmentos (no máximo `num_partes`), e
+    segmentos consecutivos são agrupados até atingirem o alvo, de modo que um
+    lote com muitas séries curtas gera poucas tarefas grandes em vez de uma
+    tarefa por série. Retorna listas de (índice da série, início, fim).
+    """
+    total = sum(tamanhos_saida)
+    alvo = max(1, (total + num_partes - 1) // num_partes)
+    tarefas: List[List[Tuple[int, int, int]]] = []
+    atual: List[Tuple[int, int, int]] = []
+    acumulado = 0
+    for indice, num_output_elements in enumerate(tamanhos_saida):
+        partes = min(num_partes, (num_output_elements + alvo - 1) // alvo)
+        for start, end in _segmentos_saida(num_output_elements, partes):
+            atual.append((indice, start, end))
+            acumulado += end - start
+            if acumulado >= alvo:
+                tarefas.append(atual)
+                atual, acumulado = [], 0
+    if atual:
+        tarefas.append(atual)
+    return tarefas
+
+
+def _calculate_volatility_task(
+    tarefa: List[Tuple[int, int, int]],
+    series: List[np.ndarray],
+    resultados: List[np.ndarray],
+    janela: int
+) -> None:
+    """Função alvo de cada thread do executor: calcula os segmentos de uma tarefa."""
+    for indice, start, end in tarefa:
+        _calculate_volatility_segment(series[indice], janela, start, end, resultados[indice], indice)
+
+
+def _executar_volatilidade(
+    series: List[np.ndarray],
+    janela: int,
+    num_partes: int,
+    backend: str,
+    executor: Optional[Executor]
+) -> List[np.ndarray]:
+    """
+    Núcleo comum de `calcular_volatilidade` e `calcular_volatilidade_lote`:
+    divide cada série em até `num_partes` segmentos de saída e submete todos
+    os segmentos de todas as séries de uma só vez ao executor.
+    """
+    series = [np.ascontiguousarray(retornos, dtype=np.float64) for retornos in series]
+    tamanhos_saida = [max(len(retornos) - janela + 1, 0) for retornos in series]
+
+    if backend == "serial-vectorized":
+        resultados = []
+        for retornos, num_output_elements in zip(series, tamanhos_saida):
+            result_array = np.empty(num_output_elements, dtype=float)
+            if num_output_elements > 0:
+                _volatility_kernel(retornos, janela, result_array)
+            resultados.append(result_array)
+        return resultados
+
+    if backend == "threads" and isinstance(executor, ProcessPoolExecutor):
+        # Processos receberiam cópias do array de saída: os resultados se perderiam
+        raise ValueError("O backend 'threads' requer um executor de threads; use backend='processes'.")
+
+    reserva = _executor_reservado(backend, num_partes) if executor is None else contextlib.nullcontext(executor)
+    with reserva as pool:
+        if backend == "processes":
+            return _executar_volatilidade_processos(series, tamanhos_saida, janela, num_partes, pool)
+
+        resultados = [np.zeros(num_output_elements, dtype=float) for num_output_elements in tamanhos_saida]
+        futures: List[Future] = [
+            pool.submit(_calculate_volatility_task, tarefa, series, resultados, janela)
+            for tarefa in _tarefas_volatilidade(tamanhos_saida, num_partes)
+        ]
+    for future in futures:
+        future.result()  # Propaga eventuais exceções dos workers
+    return resultados
+
+
+def _executar_volatilidade_processos(
+    series: List[np.ndarray],
+    tamanhos_saida: List[int],
+    janela: int,
+    num_partes: int,
+    executor: Executor
+) -> List[np.ndarray]:
+    """
+    Backend "processes": copia todas as séries uma única vez para um bloco de
+    memória compartilhada, distribui os segmentos entre os processos e copia
+    as saídas da memória compartilhada para arrays comuns.
+    """
+    input_size = sum(len(retornos) for retornos in series)
+    output_size = sum(tamanhos_saida)
+    if output_size == 0:
+        return [np.array([], dtype=float) for _ in series]
+
+    itemsize = np.dtype(np.float64).itemsize
+    shm_in = shared_memory.SharedMemory(create=True, size=max(input_size, 1) * itemsize)
+    shm_out = shared_memory.SharedMemory(create=True, size=output_size * itemsize)
+    try:
+        entrada = np.ndarray((input_size,), dtype=np.float64, buffer=shm_in.buf)
+        saida = np.ndarray((output_size,), dtype=np.float64, buffer=shm_out.buf)
+
+        # Posição de cada série nos blocos de entrada e de saída
+        layouts: List[Tuple[int, int, int]] = []
+        input_offset = output_offset = 0
+        for retornos, num_output_elements in zip(series, tamanhos_saida):
+            entrada[input_offset : input_offset + len(retornos)] = retornos
+            layouts.append((input_offset, len(retornos), output_offset))
+            input_offset += len(retornos)
+            output_offset += num_output_elements
+
+        futures: List[Future] = [
+            executor.submit(
+                _calculate_volatility_segments_process,
+                shm_in.name, shm_out.name, input_size, output_size,
+                [layouts[indice] + (start, end) for indice, start, end in tarefa], janela
+            )
+            for tarefa in _tarefas_volatilidade(tamanhos_saida, num_partes)
+        ]
+
+        for future in futures:
+            future.result()  # Propaga eventuais exceções dos processos
+
+        resultados = [
+            saida[output_offset : output_offset + num_output_elements].copy()
+            for (_, _, output_offset), num_output_elements in zip(layouts, tamanhos_saida)
+        ]
+        del entrada, saida
+    finally:
+        shm_in.close()
+        shm_in.unlink()
+        shm_out.close()
+        shm_out.unlink()
+    return resultados
+
+
+def calcular_volatilidade(
+    retornos: np.ndarray,
+    janela: int,
+    num_threads: int,
+    backend: str = "threads",
+    executor: Optional[Executor] = None
+) -> np.ndarray:
     """
     Calcula a volatilidade (desvio padrão) sobre janelas móveis de `janela` dias
     para um array de retornos, utilizando processamento paralelo com `num_threads` threads.
 
-    O array de `retornos` é dividido em `num_threads` partes, e uma thread é
-    usada para calcular a volatilidade para cada parte dos resultados.
-    Os resultados parciais são combinados em um único array NumPy.
+    O array de `retornos` é dividido em `num_threads` partes, e cada parte dos
+    resultados é calculada por um worker de um executor persistente. Os resultados
+    parciais são escritos diretamente em um único array NumPy, que é retornado.
+
+    O backend de execução é configurável:
+
+    - ``"threads"``: cada parte é calculada por uma thread (comportamento padrão).
+    - ``"processes"``: cada parte é calculada por um processo; os retornos e o array
+      de saída ficam em `multiprocessing.shared_memory`, sem cópia por processo, e o
+      cálculo escala com o número de núcleos, sem disputar o GIL.
+    - ``"serial-vectorized"``: cálculo vetorizado em uma única parte, na thread atual.
+
+    Por padrão é usado o executor compartilhado do módulo (`obter_executor`), cujos
+    workers são reutilizados entre chamadas; um executor próprio pode ser passado
+    em `executor`. As partes se sobrepõem em `janela - 1` retornos e todos os backends
+    usam o mesmo kernel vetorizado O(n), calculado em blocos alinhados na série completa,
+    de modo que os resultados são idênticos entre backends.
 
     :param retornos: Array NumPy de retornos diários.
                      Deve ser 1-dimensional e ter pelo menos `janela` elementos.
@@ -178,13 +637,19 @@ def calcular_volatilidade(retornos: np.ndarray, janela: int, num_threads: int) -
     :param janela: Tamanho da janela para o cálculo da volatilidade.
                    Deve ser um inteiro positivo e menor ou igual ao comprimento de `retornos`.
     :type janela: int
-    :param num_threads: Número de threads a serem usadas.
+    :param num_threads: Número de partes (e de workers do executor padrão) a serem usadas.
                         Deve ser um inteiro positivo.
     :type num_threads: int
+    :param backend: Backend de execução: "threads", "processes" ou "serial-vectorized".
+    :type backend: str
+    :param executor: Executor a ser usado no lugar do executor compartilhado do módulo.
+                     Com backend "threads" deve ser um executor de threads.
+    :type executor: Optional[concurrent.futures.Executor]
     :raises TypeError: Se `retornos` não for um np.ndarray, ou `janela`/`num_threads` não forem inteiros.
     :raises ValueError: Se `retornos` não for 1-dimensional, `janela` ou `num_threads` não forem positivos,
-                        ou o comprimento de `retornos` for insuficiente para a `janela`.
-    :return: Um array NumPy com as volatilidades calculadas para cada janela.
+                        ou `backend` for desconhecido ou incompatível com `executor`.
+    :return: Um array NumPy com as volatilidades calculadas para cada janela
+             (vazio se houver menos retornos que `janela`).
     :rtype: np.ndarray
     
     :Example:
@@ -192,18 +657,17 @@ def calcular_volatilidade(retornos: np.ndarray, janela: int, num_threads: int) -
     >>> # daily_returns = np.array([0.01, 0.02, -0.01, 0.03, 0.005, -0.02, 0.015, 0.00, 0.008, -0.005])
     >>> # window_size = 3
     >>> # num_processors = 2
-    >>> # volatilities = calcular_volatilidade(daily_returns, window_size, num_processors)
+    >>> # volatilities = calcular_volatilidade(daily_returns, window_size, num_processors, backend="processes")
     >>> # print("\\nVolatilidades Calculadas:", volatilities)
     """
     # --- Validações de Parâmetros ---
-    if not isinstance(retornos, np.ndarray):
-        raise TypeError("O parâmetro 'retornos' deve ser um np.ndarray.")
-    if retornos.ndim != 1:
-        raise ValueError("O array 'retornos' deve ser 1-dimensional.")
+    _validar_retornos(retornos)
     if not isinstance(janela, int) or janela <= 0:
         raise ValueError("O parâmetro 'janela' deve ser um inteiro positivo.")
     if not isinstance(num_threads, int) or num_threads <= 0:
         raise ValueError("O parâmetro 'num_threads' deve ser um inteiro positivo.")    
+    if backend not in _BACKENDS_VOLATILIDADE:
+        raise ValueError(f"O parâmetro 'backend' deve ser um de {_BACKENDS_VOLATILIDADE}.")
 
     # Calcula o número total de elementos no array de saída
     num_output_elements = len(retornos) - janela + 1
@@ -212,36 +676,66 @@ def calcular_volatilidade(retornos: np.ndarray, janela: int, num_threads: int) -
     if num_output_elements <= 0:
         return np.array([])
 
-    # Array pré-alocado para armazenar os resultados
-    final_volatilities = np.zeros(num_output_elements, dtype=float)
-    
-    threads: List[threading.Thread] = []
+    print(f"\nIniciando cálculo de volatilidade paralelo para {num_output_elements} elementos com {num_threads} {backend}.")
 
-    # Divide o trabalho (os índices do array de saída) entre as threads
-    # Calcula o tamanho de cada "chunk" de saída que uma thread será responsável
-    chunk_size = (num_output_elements + num_threads - 1) // num_threads
+    final_volatilities = _executar_volatilidade([retornos], janela, num_threads, backend, executor)[0]
 
-    print(f"\nIniciando cálculo de volatilidade paralelo para {num_output_elements} elementos com {num_threads} threads.")
+    print("\nCálculo de volatilidade concluído.")
 
-    for i in range(num_threads):
-        start_output_idx = i * chunk_size
-        end_output_idx = min((i + 1) * chunk_size, num_output_elements) # Garante que não exceda o limite
+    return final_volatilities
 
-        # Se o segmento estiver vazio, a thread não precisa ser criada
-        if start_output_idx >= end_output_idx:
-            continue
 
-        thread = threading.Thread(
-            target=_calculate_volatility_segment,
-            args=(retornos, janela, start_output_idx, end_output_idx, final_volatilities, i + 1)
-        )
-        threads.append(thread)
-        thread.start()
-
-    # Espera que todas as threads terminem
-    for thread in threads:
-        thread.join()
-
-    print("\nCálculo de volatilidade concluído por todas as threads.")
-
-    return final_volatilities
\ No newline at end of file
+def calcular_volatilidade_lote(
+    series: Union[Dict[str, np.ndarray], List[np.ndarray]],
+    janela: int,
+    num_threads: int,
+    backend: str = "threads",
+    executor: Optional[Executor] = None
+) -> Union[Dict[str, np.ndarray], List[np.ndarray]]:
+    """
+    Calcula a volatilidade móvel de várias séries de retornos em uma única
+    submissão ao executor.
+
+    Os segmentos de todas as séries são enviados juntos ao executor persistente,
+    de modo que os workers ficam ocupados durante todo o lote em vez de serem
+    sincronizados a cada série. No backend "processes" todas as séries
+    compartilham um único bloco de memória compartilhada. Cada resultado é
+    idêntico ao de `calcular_volatilidade` para a mesma série.
+
+    :param series: Dicionário {nome: retornos} ou lista de arrays NumPy 1-dimensionais de retornos.
+    :type series: Union[Dict[str, np.ndarray], List[np.ndarray]]
+    :param janela: Tamanho da janela para o cálculo da volatilidade. Deve ser um inteiro positivo.
+    :type janela: int
+    :param num_threads: Número máximo de partes por série (e de workers do executor padrão).
+    :type num_threads: int
+    :param backend: Backend de execução: "threads", "processes" ou "serial-vectorized".
+    :type backend: str
+    :param executor: Executor a ser usado no lugar do executor compartilhado do módulo.
+    :type executor: Optional[concurrent.futures.Executor]
+    :raises TypeError: Se `series` não for um dicionário ou lista de np.ndarray.
+    :raises ValueError: Se alguma série não for 1-dimensional, ou `janela`, `num_threads` ou `backend` forem inválidos.
+    :return: As volatilidades de cada série, no mesmo formato de `series` (dicionário ou lista).
+             Séries com menos retornos que `janela` resultam em arrays vazios.
+    :rtype: Union[Dict[str, np.ndarray], List[np.ndarray]]
+    """
+    if isinstance(series, dict):
+        nomes = list(series.keys())
+        arrays = list(series.values())
+    elif isinstance(series, list):
+        nomes = None
+        arrays = series
+    else:
+        raise TypeError("O parâmetro 'series' deve ser um dicionário ou uma lista de np.ndarray.")
+    for i, retornos in enumerate(arrays):
+        _validar_retornos(retornos, nome=str(nomes[i]) if nomes is not None else f"series[{i}]")
+    if not isinstance(janela, int) or janela <= 0:
+        raise ValueError("O parâmetro 'janela' deve ser um inteiro positivo.")
+    if not isinstance(num_threads, int) or num_threads <= 0:
+        raise ValueError("O parâmetro 'num_threads' deve ser um inteiro positivo.")
+    if backend not in _BACKENDS_VOLATILIDADE:
+        raise ValueError(f"O parâmetro 'backend' deve ser um de {_BACKENDS_VOLATILIDADE}.")
+
+    resultados = _executar_volatilidade(arrays, janela, num_threads, backend, executor)
+    if nomes is not None:
+        return dict(zip(nomes, resultados))
+    return resultados
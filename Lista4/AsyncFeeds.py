@@ -0,0 +1,207 @@
+import asyncio
+import random
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+# Número de tasks criadas (ou canceladas) por iteração do event loop. Com
+# dezenas de milhares de ações, criar ou cancelar todas as tasks de uma vez
+# bloquearia o loop por segundos; em lotes, os consumidores continuam sendo
+# atendidos entre um lote e outro.
+_TASKS_POR_LOTE = 1024
+
+
+class AsyncPriceFeed:
+    """
+    Simulador de feeds de dados de preços baseado em asyncio.
+
+    Equivalente assíncrono de `simular_feeds_de_dados`: cada ação é atualizada
+    por uma task própria (e não por uma thread do sistema operacional), e todas
+    as tasks compartilham um único event loop. Como apenas uma task executa por
+    vez no loop, o dicionário de preços é atualizado sem locks, e o custo por
+    ação se limita a uma task suspensa em `asyncio.sleep` entre atualizações.
+
+    A simulação é encerrada pelo evento `stop_event` (via `stop()` ou ao fim de
+    `tempo_total` em `run`), que cancela todas as tasks de feed.
+
+    :param acoes: Lista de nomes de ações (e.g., ["AAPL", "GOOG", "TSLA"]).
+                  Deve conter pelo menos um nome de ação.
+    :type acoes: List[str]
+    :param preco_inicial: Preço inicial de todas as ações.
+    :type preco_inicial: float
+    :param intervalo: Tupla (mínimo, máximo) em segundos do intervalo aleatório entre atualizações.
+    :type intervalo: Tuple[float, float]
+    :param seed: Semente do gerador aleatório, para simulações reprodutíveis.
+    :type seed: Optional[int]
+    :raises TypeError: Se `acoes` não for uma lista de strings.
+    :raises ValueError: Se `acoes` estiver vazia, `preco_inicial` não for positivo ou `intervalo` for inválido.
+
+    :Example:
+    >>> # async def main():
+    >>> #     feed = AsyncPriceFeed(["MSFT", "AMZN"])
+    >>> #     run_task = asyncio.create_task(feed.run(tempo_total=10))
+    >>> #     async for snapshot in feed.snapshots(intervalo=5.0):
+    >>> #         print(snapshot)
+    >>> #     return await run_task
+    >>> # final_prices = asyncio.run(main())
+    """
+
+    def __init__(
+        self,
+        acoes: List[str],
+        preco_inicial: float = 100.0,
+        intervalo: Tuple[float, float] = (1.0, 3.0),
+        seed: Optional[int] = None
+    ) -> None:
+        if not isinstance(acoes, list) or not all(isinstance(a, str) for a in acoes):
+            raise TypeError("acoes deve ser uma lista de strings (nomes de ações).")
+        if not acoes:
+            raise ValueError("A lista de ações não pode estar vazia.")
+        if preco_inicial <= 0:
+            raise ValueError("preco_inicial deve ser positivo.")
+        if len(intervalo) != 2 or not 0 <= intervalo[0] <= intervalo[1]:
+            raise ValueError("intervalo deve ser uma tupla (mínimo, máximo) com 0 <= mínimo <= máximo.")
+
+        self.acoes = list(acoes)
+        self.prices: Dict[str, float] = dict.fromkeys(self.acoes, float(preco_inicial))
+        self.intervalo = intervalo
+        self.atualizacoes = 0  # Número total de atualizações de preço realizadas
+        self.stop_event = asyncio.Event()
+        self._rng = random.Random(seed)
+
+    async def _stock_feed_task(self, stock_name: str) -> None:
+        """
+        Task de feed de uma ação: atualiza seu preço a cada 1-3 segundos
+        (por padrão) até que `stop_event` seja setado.
+
+        :param stock_name: O nome da ação (ticker).
+        :type stock_name: str
+        """
+        prices = self.prices
+        uniform = self._rng.uniform
+        minimo, maximo = self.intervalo
+        # Fase inicial aleatória: evita que todas as ações atualizem no mesmo instante
+        await asyncio.sleep(uniform(0, maximo))
+        while not self.stop_event.is_set():
+            # Variação de preço aleatória de -1% a +1%, com piso de 0.01
+            prices[stock_name] = max(prices[stock_name] * (1 + uniform(-0.01, 0.01)), 0.01)
+            self.atualizacoes += 1
+            await asyncio.sleep(uniform(minimo, maximo))
+
+    async def run(self, tempo_total: Optional[float] = None) -> Dict[str, float]:
+        """
+        Executa a simulação: cria uma task por ação e aguarda até que
+        `stop_event` seja setado ou `tempo_total` segundos se passem.
+
+        As tasks são criadas e, ao final, canceladas em lotes de `_TASKS_POR_LOTE`,
+        de modo que a latência do event loop não cresce com o número de ações.
+
+        :param tempo_total: Tempo máximo de simulação em segundos (None: até `stop()`).
+        :type tempo_total: Optional[float]
+        :return: O dicionário final de preços após a simulação.
+        :rtype: Dict[str, float]
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if tempo_total is None else loop.time() + tempo_total
+        tasks: List[asyncio.Task] = []
+        try:
+            for inicio in range(0, len(self.acoes), _TASKS_POR_LOTE):
+                if self.stop_event.is_set():
+                    break
+                for stock in self.acoes[inicio : inicio + _TASKS_POR_LOTE]:
+                    tasks.append(asyncio.create_task(self._stock_feed_task(stock)))
+                await asyncio.sleep(0)  # Devolve o controle ao loop entre lotes
+            restante = None if deadline is None else max(deadline - loop.time(), 0)
+            await asyncio.wait_for(self.stop_event.wait(), restante)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            # Sinaliza os consumidores e interrompe as tasks suspensas em sleep
+            self.stop_event.set()
+            for inicio in range(0, len(tasks), _TASKS_POR_LOTE):
+                for task in tasks[inicio : inicio + _TASKS_POR_LOTE]:
+                    task.cancel()
+                await asyncio.sleep(0)
+            if tasks:
+                await asyncio.wait(tasks)
+        return dict(self.prices)
+
+    def stop(self) -> None:
+        """Sinaliza o fim da simulação."""
+        self.stop_event.set()
+
+    async def snapshots(self, intervalo: float = 5.0) -> AsyncIterator[Dict[str, float]]:
+        """
+        Iterador assíncrono de cópias do dicionário de preços, uma a cada
+        `intervalo` segundos, até que a simulação seja encerrada.
+
+        Como a cópia é feita dentro do event loop, nenhuma task de feed a
+        interrompe: cada snapshot é consistente, sem necessidade de lock.
+
+        :param intervalo: Tempo em segundos entre snapshots.
+        :type intervalo: float
+        :return: Iterador assíncrono de dicionários {ação: preço}.
+        :rtype: AsyncIterator[Dict[str, float]]
+        """
+        while not self.stop_event.is_set():
+            yield dict(self.prices)
+            try:
+                await asyncio.wait_for(self.stop_event.wait(), intervalo)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def _printer_task(feed: AsyncPriceFeed, intervalo: float) -> None:
+    """
+    Imprime os preços atuais de todas as ações a cada `intervalo` segundos,
+    consumindo o iterador de snapshots do feed.
+    """
+    print("Task de impressão iniciada.")
+    async for current_prices in feed.snapshots(intervalo):
+        print("\n--- Preços Atuais ---")
+        for stock, price in sorted(current_prices.items()):
+            print(f"{stock}: {price:.2f}")
+        print("---------------------\n")
+    print("Task de impressão finalizada.")
+
+
+async def simular_feeds_de_dados_async(
+    acoes: List[str],
+    tempo_total: float,
+    intervalo_impressao: Optional[float] = 5.0,
+    seed: Optional[int] = None
+) -> Dict[str, float]:
+    """
+    Versão assíncrona de `simular_feeds_de_dados`: simula feeds de preços de
+    várias ações com uma task por ação em um único event loop, imprimindo os
+    preços a cada `intervalo_impressao` segundos, por `tempo_total` segundos.
+
+    :param acoes: Lista de nomes de ações. Deve conter pelo menos um nome de ação.
+    :type acoes: List[str]
+    :param tempo_total: Tempo total de simulação em segundos. Deve ser positivo.
+    :type tempo_total: float
+    :param intervalo_impressao: Intervalo em segundos entre impressões (None desativa a impressão).
+    :type intervalo_impressao: Optional[float]
+    :param seed: Semente do gerador aleatório.
+    :type seed: Optional[int]
+    :raises TypeError: Se `acoes` não for uma lista de strings.
+    :raises ValueError: Se `acoes` estiver vazia, ou `tempo_total` não for positivo.
+    :return: O dicionário final de preços após a simulação.
+    :rtype: Dict[str, float]
+
+    :Example:
+    >>> # final_prices = asyncio.run(simular_feeds_de_dados_async(["MSFT", "AMZN"], tempo_total=10))
+    """
+    if not isinstance(tempo_total, (int, float)) or tempo_total <= 0:
+        raise ValueError("tempo_total deve ser um número positivo.")
+
+    feed = AsyncPriceFeed(acoes, seed=seed)
+    printer = None
+    if intervalo_impressao is not None:
+        printer = asyncio.create_task(_printer_task(feed, intervalo_impressao))
+
+    print(f"\nSimulação assíncrona iniciada por {tempo_total} segundos com {len(acoes)} tasks de feed...")
+    final_prices = await feed.run(tempo_total)
+    if printer is not None:
+        await printer
+
+    print(f"\nTodas as tasks foram finalizadas. Atualizações de preço: {feed.atualizacoes}")
+    return final_prices
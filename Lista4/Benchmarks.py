@@ -0,0 +1,341 @@
+import contextlib
+import io
+import random
+import sys
+import threading
+import time
+from typing import Callable, List, Tuple
+
+from OrderBook import OrderBook
+from ThreadingBasics import RiskBudget, ShardedPriceTable, simular_traders, simular_traders_processos
+
+
+def _medir_atualizacoes(
+    table: ShardedPriceTable,
+    num_threads: int,
+    num_acoes: int,
+    atualizacoes_por_thread: int
+) -> Tuple[float, int]:
+    """
+    Executa `num_threads` threads escritoras sobre `table`, cada uma atualizando
+    as suas próprias ações, e uma thread leitora fazendo snapshots contínuos.
+
+    :return: Tupla (atualizações por segundo, número de snapshots lidos).
+    :rtype: Tuple[float, int]
+    """
+    tickers = [f"ACAO{i}" for i in range(num_acoes)]
+    for ticker in tickers:
+        table.set(ticker, 100.0)
+
+    barreira = threading.Barrier(num_threads + 1)
+    fim_escritas = threading.Event()
+    snapshots = 0
+
+    def escritor(thread_id: int) -> None:
+        # Cada thread atualiza um subconjunto disjunto das ações
+        meus_tickers = tickers[thread_id::num_threads] or tickers[:1]
+        barreira.wait()
+        for k in range(atualizacoes_por_thread):
+            table.update(meus_tickers[k % len(meus_tickers)], lambda price: price * 1.0001)
+
+    def leitor() -> None:
+        nonlocal snapshots
+        while not fim_escritas.is_set():
+            table.snapshot()
+            snapshots += 1
+
+    threads = [threading.Thread(target=escritor, args=(i,)) for i in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    thread_leitora = threading.Thread(target=leitor)
+    thread_leitora.start()
+
+    barreira.wait()
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+    fim_escritas.set()
+    thread_leitora.join()
+
+    return num_threads * atualizacoes_por_thread / duracao, snapshots
+
+
+def benchmark_price_table(
+    num_threads_lista: Tuple[int, ...] = (1, 2, 4, 8, 16),
+    num_acoes: int = 256,
+    atualizacoes_por_thread: int = 50_000,
+    num_shards: int = 16
+) -> None:
+    """
+    Benchmark de contenção: compara a vazão de atualizações de preço com um
+    único lock (ShardedPriceTable com 1 shard, equivalente ao antigo
+    `prices_lock`) e com `num_shards` shards, para cada número de threads
+    escritoras, com uma thread leitora fazendo snapshots em paralelo.
+
+    :param num_threads_lista: Números de threads escritoras testados.
+    :type num_threads_lista: Tuple[int, ...]
+    :param num_acoes: Número de ações na tabela.
+    :type num_acoes: int
+    :param atualizacoes_por_thread: Atualizações feitas por cada thread escritora.
+    :type atualizacoes_por_thread: int
+    :param num_shards: Número de shards da tabela particionada.
+    :type num_shards: int
+    """
+    print(f"--- Tabela de preços: 1 lock vs {num_shards} shards ({num_acoes} ações) ---")
+    print(f"{'threads':>8} {'1 lock (atual./s)':>18} {'shards (atual./s)':>18} {'razão':>7} {'snapshots 1 lock':>17} {'snapshots shards':>17}")
+    for num_threads in num_threads_lista:
+        vazao_unico, snaps_unico = _medir_atualizacoes(
+            ShardedPriceTable(num_shards=1), num_threads, num_acoes, atualizacoes_por_thread
+        )
+        vazao_shards, snaps_shards = _medir_atualizacoes(
+            ShardedPriceTable(num_shards=num_shards), num_threads, num_acoes, atualizacoes_por_thread
+        )
+        print(f"{num_threads:>8} {vazao_unico:>18,.0f} {vazao_shards:>18,.0f} {vazao_shards / vazao_unico:>7.2f} "
+              f"{snaps_unico:>17} {snaps_shards:>17}")
+
+
+def benchmark_order_book(
+    num_traders_lista: Tuple[int, ...] = (1, 4, 16),
+    num_orders: int = 20_000,
+    num_ordens_livro: int = 200_000,
+    fracao_cancelamentos: float = 0.2
+) -> None:
+    """
+    Mede a vazão (ordens por segundo) do livro de ofertas.
+
+    Primeiro executa `simular_traders` com e sem casamento de ordens para cada
+    número de traders; depois mede o OrderBook isoladamente, com uma sequência
+    aleatória de inserções e uma fração de cancelamentos.
+
+    :param num_traders_lista: Números de traders (threads) testados em `simular_traders`.
+    :type num_traders_lista: Tuple[int, ...]
+    :param num_orders: Ordens por trader em `simular_traders`.
+    :type num_orders: int
+    :param num_ordens_livro: Número de ordens inseridas no teste isolado do OrderBook.
+    :type num_ordens_livro: int
+    :param fracao_cancelamentos: Fração de operações de cancelamento no teste isolado.
+    :type fracao_cancelamentos: float
+    """
+    print("--- simular_traders: ordens/s sem e com casamento ---")
+    print(f"{'traders':>8} {'listas (ordens/s)':>18} {'casamento (ordens/s)':>21} {'negócios':>10}")
+    for num_traders in num_traders_lista:
+        total = num_traders * num_orders
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            simular_traders(num_traders, num_orders)
+            t_listas = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            resultado = simular_traders(num_traders, num_orders, casar_ordens=True)
+            t_casamento = time.perf_counter() - inicio
+        print(f"{num_traders:>8} {total / t_listas:>18,.0f} {total / t_casamento:>21,.0f} {len(resultado['trades']):>10}")
+
+    rng = random.Random(0)
+    operacoes = []
+    ids_inseridos = []
+    for order_id in range(1, num_ordens_livro + 1):
+        if ids_inseridos and rng.random() < fracao_cancelamentos:
+            operacoes.append(("cancel", rng.choice(ids_inseridos)))
+        ids_inseridos.append(order_id)
+        operacoes.append((order_id, rng.choice(("buy", "sell")), round(rng.uniform(90.0, 110.0), 2), rng.randint(1, 100)))
+
+    book = OrderBook()
+    inicio = time.perf_counter()
+    for operacao in operacoes:
+        if operacao[0] == "cancel":
+            book.cancel(operacao[1])
+        else:
+            book.add(*operacao)
+    duracao = time.perf_counter() - inicio
+    print(f"--- OrderBook isolado: {len(operacoes)} operações ({fracao_cancelamentos:.0%} cancelamentos) ---")
+    print(f"{len(operacoes) / duracao:,.0f} operações/s, {len(book.trades)} negócios, {len(book)} ordens em repouso")
+
+
+def benchmark_lotes_traders(
+    num_traders_lista: Tuple[int, ...] = (1, 2, 4, 8, 16, 32, 64),
+    total_ordens: int = 256_000,
+    tamanhos_lote: Tuple[int, ...] = (1, 64)
+) -> None:
+    """
+    Compara a vazão (ordens por segundo) de `simular_traders` publicando ordem
+    a ordem (`tamanho_lote=1`, duas aquisições de lock por ordem) e em lotes,
+    mantendo fixo o total de ordens e variando o número de traders.
+
+    Verifica também que o livro final tem o mesmo número de ordens e IDs únicos
+    em todos os casos.
+
+    :param num_traders_lista: Números de traders (threads) testados.
+    :type num_traders_lista: Tuple[int, ...]
+    :param total_ordens: Total de ordens da simulação, dividido entre os traders.
+    :type total_ordens: int
+    :param tamanhos_lote: Tamanhos de lote comparados.
+    :type tamanhos_lote: Tuple[int, ...]
+    """
+    print(f"--- simular_traders: ordens/s por tamanho de lote ({total_ordens} ordens) ---")
+    print(f"{'traders':>8}" + "".join(f"{f'lote={lote}':>14}" for lote in tamanhos_lote))
+    for num_traders in num_traders_lista:
+        num_orders = total_ordens // num_traders
+        linha = f"{num_traders:>8}"
+        for tamanho_lote in tamanhos_lote:
+            with contextlib.redirect_stdout(io.StringIO()):
+                inicio = time.perf_counter()
+                book = simular_traders(num_traders, num_orders, tamanho_lote=tamanho_lote)
+                duracao = time.perf_counter() - inicio
+            ids = [order['id'] for side in ('buy', 'sell') for order in book[side]]
+            assert len(ids) == num_traders * num_orders and len(set(ids)) == len(ids)
+            linha += f"{len(ids) / duracao:>14,.0f}"
+        print(linha)
+
+
+def benchmark_traders_processos(
+    total_ordens: int = 10_000_000,
+    num_traders: int = 64,
+    num_processos_lista: Tuple[int, ...] = (1, 2, 4, 8)
+) -> None:
+    """
+    Mede a vazão (ordens por segundo) de `simular_traders_processos` para cada
+    número de processos, comparando com `simular_traders` no formato colunar
+    (threads) para uma fração das ordens.
+
+    :param total_ordens: Total de ordens geradas por `simular_traders_processos`.
+    :type total_ordens: int
+    :param num_traders: Número de traders.
+    :type num_traders: int
+    :param num_processos_lista: Números de processos testados.
+    :type num_processos_lista: Tuple[int, ...]
+    """
+    num_orders = total_ordens // num_traders
+    print(f"--- Geração de ordens: threads vs processos ({num_traders} traders) ---")
+    amostra = max(1, num_orders // 100)  # Threads: 1% das ordens, para limitar a duração
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        simular_traders(num_traders, amostra, formato='colunar')
+        duracao = time.perf_counter() - inicio
+    print(f"{'threads':>12}: {num_traders * amostra / duracao:>14,.0f} ordens/s")
+    for num_processos in num_processos_lista:
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            store = simular_traders_processos(num_traders, num_orders, num_processos=num_processos, seed=0)
+            duracao = time.perf_counter() - inicio
+        print(f"{f'{num_processos} processos':>12}: {len(store) / duracao:>14,.0f} ordens/s ({len(store)} ordens em {duracao:.2f} s)")
+
+
+class _PollingRiskBudget:
+    """
+    Alocação de risco por polling, como no antigo `_strategy_task`: verifica o
+    risco total sob um lock e, se o pedido não couber, dorme um intervalo
+    aleatório antes de tentar de novo. Usada apenas como referência.
+    """
+
+    def __init__(self, limite: float, espera: Tuple[float, float]) -> None:
+        self.limite = limite
+        self.espera = espera
+        self._em_uso = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float) -> bool:
+        while True:
+            with self._lock:
+                if self._em_uso + amount <= self.limite:
+                    self._em_uso += amount
+                    return True
+            time.sleep(random.uniform(*self.espera))
+
+    def release(self, amount: float) -> None:
+        with self._lock:
+            self._em_uso -= amount
+
+
+def _medir_latencias_risco(
+    budget: object,
+    num_threads: int,
+    operacoes_por_thread: int,
+    limite: float,
+    tempo_posse: float
+) -> List[float]:
+    """
+    Executa `num_threads` threads que repetidamente alocam um risco aleatório
+    em `budget`, mantêm a alocação por `tempo_posse` segundos e a devolvem.
+
+    :return: Lista ordenada das latências (em segundos) de cada `acquire`.
+    :rtype: List[float]
+    """
+    latencias: List[float] = []
+    latencias_lock = threading.Lock()
+    barreira = threading.Barrier(num_threads)
+
+    def estrategia(thread_id: int) -> None:
+        rng = random.Random(thread_id)
+        minhas: List[float] = []
+        barreira.wait()
+        for _ in range(operacoes_por_thread):
+            amount = rng.uniform(0.1, 0.5) * limite
+            inicio = time.perf_counter()
+            budget.acquire(amount)
+            minhas.append(time.perf_counter() - inicio)
+            time.sleep(tempo_posse)
+            budget.release(amount)
+        with latencias_lock:
+            latencias.extend(minhas)
+
+    threads = [threading.Thread(target=estrategia, args=(i,)) for i in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencias)
+
+
+def benchmark_risk_budget(
+    num_threads: int = 8,
+    operacoes_por_thread: int = 25,
+    limite: float = 100.0,
+    tempo_posse: float = 0.01,
+    espera_polling: Tuple[float, float] = (0.1, 0.5)
+) -> None:
+    """
+    Compara a latência de alocação de risco (do pedido até a concessão) do
+    `RiskBudget`, baseado em `threading.Condition`, com a do antigo polling
+    com espera aleatória de `espera_polling` segundos, reportando os
+    percentis p50, p90 e p99 e o tempo total. O `RiskBudget` é medido com a
+    fila estritamente FIFO (`max_ultrapassagens=0`, em que um pedido grande
+    bloqueia os menores que chegaram depois) e com ultrapassagens limitadas (padrão).
+
+    :param num_threads: Número de estratégias (threads) concorrentes.
+    :type num_threads: int
+    :param operacoes_por_thread: Ciclos de alocação e devolução por estratégia.
+    :type operacoes_por_thread: int
+    :param limite: Risco total do orçamento. Cada pedido usa de 10% a 50% dele.
+    :type limite: float
+    :param tempo_posse: Tempo em segundos que cada alocação é mantida.
+    :type tempo_posse: float
+    :param espera_polling: Intervalo (mínimo, máximo) de espera do polling entre tentativas.
+    :type espera_polling: Tuple[float, float]
+    """
+    def percentil(valores: List[float], p: float) -> float:
+        return valores[min(int(p * len(valores)), len(valores) - 1)]
+
+    print(f"--- Alocação de risco: polling vs Condition ({num_threads} threads, "
+          f"{num_threads * operacoes_por_thread} alocações) ---")
+    print(f"{'método':>10} {'p50 (ms)':>10} {'p90 (ms)':>10} {'p99 (ms)':>10} {'total (s)':>10}")
+    fabricas: List[Tuple[str, Callable[[], object]]] = [
+        ("polling", lambda: _PollingRiskBudget(limite, espera_polling)),
+        ("FIFO", lambda: RiskBudget(limite, max_ultrapassagens=0)),
+        ("Condition", lambda: RiskBudget(limite)),
+    ]
+    for nome, fabrica in fabricas:
+        inicio = time.perf_counter()
+        latencias = _medir_latencias_risco(fabrica(), num_threads, operacoes_por_thread, limite, tempo_posse)
+        duracao = time.perf_counter() - inicio
+        print(f"{nome:>10} {percentil(latencias, 0.5) * 1e3:>10.2f} {percentil(latencias, 0.9) * 1e3:>10.2f} "
+              f"{percentil(latencias, 0.99) * 1e3:>10.2f} {duracao:>10.2f}")
+
+
+if __name__ == '__main__':
+    # Uso: python Benchmarks.py [threads1 threads2 ...]
+    num_threads_cli = tuple(int(arg) for arg in sys.argv[1:]) or (1, 2, 4, 8, 16)
+    benchmark_price_table(num_threads_cli)
+    benchmark_order_book()
+    benchmark_lotes_traders()
+    benchmark_traders_processos()
+    benchmark_risk_budget()
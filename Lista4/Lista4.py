@@ -1,8 +1,19 @@
+import asyncio
+import os
 import random
-from ThreadingBasics import simular_traders, simular_feeds_de_dados, gerenciar_risco, monitorar_acoes
-from AdvancedConcurrency import calcular_medias_moveis, calcular_volatilidade
+import sys
+import threading
+import time
+from ThreadingBasics import simular_traders, simular_feeds_de_dados, gerenciar_risco, monitorar_acoes, RiskBudget
+from ThreadingBasics import simular_traders_processos
+from AdvancedConcurrency import calcular_medias_moveis, calcular_volatilidade, calcular_volatilidade_lote
+from AsyncFeeds import simular_feeds_de_dados_async
 import numpy as np  
 
+# Estatísticas móveis incrementais da Lista 3
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lista3'))
+from Simulations import RollingMean, RollingStd, sma, rolling_std
+
 if __name__ == '__main__':
     # Exemplo de uso da função:
     print("Iniciando simulação com 5 traders e 100 ordens por trader...")
@@ -59,18 +70,69 @@ if __name__ == '__main__':
     assert len(small_order_book['buy']) + len(small_order_book['sell']) == 10
     print("Verificação do número total de ordens para caso pequeno: OK")
 
+    # Livro com prioridade preço-tempo: ordens que cruzam o spread são executadas
+    matched_book = simular_traders(num_traders=5, num_orders=100, casar_ordens=True)
+    if matched_book['buy'] and matched_book['sell']:
+        assert matched_book['buy'][0]['price'] < matched_book['sell'][0]['price'], "O livro ficou cruzado após o casamento!"
+    print(f"Negócios gerados: {len(matched_book['trades'])}, melhor compra/venda em repouso: "
+          f"{matched_book['buy'][0]['price'] if matched_book['buy'] else None} / "
+          f"{matched_book['sell'][0]['price'] if matched_book['sell'] else None}")
+
+    # Formato colunar: as ordens ficam em um array estruturado NumPy, sem dicionários
+    order_store = simular_traders(num_traders=5, num_orders=100, formato='colunar')
+    assert len(order_store) == 5 * 100 and len(set(order_store.dados['id'].tolist())) == 5 * 100
+    trader_ids, order_counts, trader_volumes = order_store.totais_por_trader()
+    print(f"Ordens por trader: {dict(zip(trader_ids.tolist(), order_counts.tolist()))}")
+    print(f"Volume por trader: {dict(zip(trader_ids.tolist(), trader_volumes.tolist()))}")
+    print(f"Bytes por ordem no formato colunar: {order_store.dados.itemsize}")
+
+    # Geração em processos: mesma seed, mesmo resultado para qualquer número de processos
+    process_store = simular_traders_processos(num_traders=8, num_orders=10_000, num_processos=2, seed=42)
+    same_store = simular_traders_processos(num_traders=8, num_orders=10_000, num_processos=4, seed=42)
+    assert np.array_equal(process_store.dados, same_store.dados), "O resultado depende do número de processos!"
+    assert np.array_equal(process_store.dados['id'], np.arange(1, 8 * 10_000 + 1))
+    print("Verificação de determinismo e IDs únicos (multiprocesso): OK")
+
     # Exemplo de uso
     acoes_para_simular = ["AAPL", "GOOG", "TSLA", "MSFT"]
     tempo_sim = 15 # segundos
 
     print(f"Iniciando simulação de feeds de dados para {acoes_para_simular} por {tempo_sim} segundos.")
-    final_prices_result = simular_feeds_de_dados(acoes=acoes_para_simular, tempo_total=tempo_sim)
+    # Cada thread de feed alimenta a média e o desvio padrão móveis da sua ação
+    janela_feed = 3
+    medias_feed = {stock: RollingMean(janela_feed) for stock in acoes_para_simular}
+    desvios_feed = {stock: RollingStd(janela_feed) for stock in acoes_para_simular}
+    historico_feed = {stock: [] for stock in acoes_para_simular}
+
+    def atualizar_estatisticas(stock: str, price: float) -> None:
+        historico_feed[stock].append(price)
+        medias_feed[stock].update(price)
+        desvios_feed[stock].update(price)
+
+    final_prices_result = simular_feeds_de_dados(
+        acoes=acoes_para_simular, tempo_total=tempo_sim, ao_atualizar=atualizar_estatisticas
+    )
 
     print("\n--- Dicionário Final de Preços ---")
     for stock, price in sorted(final_prices_result.items()):
         print(f"{stock}: {price:.2f}")
     print("---------------------------------\n")
 
+    print(f"--- Média e desvio padrão móveis dos feeds (janela {janela_feed}) ---")
+    for stock in sorted(acoes_para_simular):
+        historico = np.array(historico_feed[stock])
+        print(f"{stock}: média {medias_feed[stock].value:.2f}, desvio {desvios_feed[stock].value:.4f} "
+              f"({len(historico)} atualizações)")
+        if len(historico) >= janela_feed:
+            # Os objetos incrementais coincidem com as funções em lote sobre o histórico
+            assert np.isclose(medias_feed[stock].value, sma(historico, janela_feed)[-1])
+            assert np.isclose(desvios_feed[stock].value, rolling_std(historico, janela_feed)[-1])
+
+    # Mesma simulação com asyncio: uma task por ação em um único event loop
+    async_prices_result = asyncio.run(simular_feeds_de_dados_async(acoes_para_simular, tempo_total=6, seed=7))
+    assert sorted(async_prices_result) == sorted(acoes_para_simular)
+    print(f"Preços finais (asyncio): { {stock: round(price, 2) for stock, price in sorted(async_prices_result.items())} }")
+
     
     print("--- Teste de Gerenciamento de Risco Concorrente ---")
 
@@ -158,6 +220,32 @@ if __name__ == '__main__':
     print(f"Risco Total Alocado Final (Exemplo 3): {sum(final_allocation_3.values()):.2f}")
     assert sum(final_allocation_3.values()) == 7.5
 
+    # Orçamento de risco com devolução: o pedido em espera é atendido assim que há espaço
+    budget = RiskBudget(50.0)
+    assert budget.acquire(40.0)
+    assert not budget.acquire(20.0, timeout=0.1) # Não cabe: expira sem alocar
+    liberador = threading.Timer(0.2, budget.release, args=(40.0,))
+    liberador.start()
+    assert budget.acquire(20.0, timeout=5.0) # Acordado pela devolução, sem polling
+    liberador.join()
+    print(f"\nRiskBudget: risco em uso {budget.em_uso:.2f}, disponível {budget.disponivel:.2f}")
+    assert budget.em_uso == 20.0
+
+    # Bloqueio no início da fila: um pedido grande (40) espera com 20 em uso.
+    # Na fila estritamente FIFO, um pedido pequeno que caberia espera atrás dele;
+    # com ultrapassagens (padrão), o pequeno é atendido e o grande continua à frente.
+    for max_ultrapassagens in (0, 4):
+        fila = RiskBudget(50.0, max_ultrapassagens=max_ultrapassagens)
+        assert fila.acquire(20.0)
+        grande = threading.Thread(target=fila.acquire, args=(40.0, 1.0))
+        grande.start()
+        time.sleep(0.1)
+        pequeno = fila.acquire(10.0, timeout=0.2)
+        print(f"max_ultrapassagens={max_ultrapassagens}: pedido pequeno atendido atrás do grande? {pequeno}")
+        assert pequeno == (max_ultrapassagens > 0)
+        fila.close()
+        grande.join()
+
 
     # --- Exemplos de Uso ---
     print("--- Exemplo 1: Alvo alcançável ---")
@@ -260,6 +348,18 @@ if __name__ == '__main__':
     assert np.allclose(volatilities_2, serial_volatilities_2), "O resultado paralelo não corresponde ao serial para Exemplo 2!"
     print("Verificação de correspondência com cálculo serial (Exemplo 2): OK.")
 
+    # Os backends usam o mesmo kernel: os resultados devem ser idênticos
+    for backend in ("processes", "serial-vectorized"):
+        volatilities_backend = calcular_volatilidade(daily_returns_2, window_2, num_threads_2, backend=backend)
+        assert np.array_equal(volatilities_backend, volatilities_2), f"O backend '{backend}' diverge do backend 'threads'!"
+    print("Verificação de igualdade entre backends (Exemplo 2): OK.")
+
+    # Várias séries em uma única submissão ao executor persistente do módulo
+    batch_returns = {f"ATIVO{i}": np.random.normal(0.0005, 0.01, size=252) for i in range(50)}
+    batch_volatilities = calcular_volatilidade_lote(batch_returns, window_2, num_threads_2)
+    assert np.array_equal(batch_volatilities["ATIVO0"], calcular_volatilidade(batch_returns["ATIVO0"], window_2, num_threads_2))
+    print(f"Volatilidades em lote calculadas para {len(batch_volatilities)} séries: OK.")
+
 
     print("\n--- Exemplo 3: Janela maior que os retornos ---")
     returns_short = np.array([0.01, 0.02])
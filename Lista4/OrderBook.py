@@ -0,0 +1,246 @@
+import heapq
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+
+class _Order:
+    """Ordem em repouso no livro. Preço em ticks inteiros."""
+
+    __slots__ = ("id", "side", "price_ticks", "quantity", "trader_id", "active")
+
+    def __init__(self, order_id: int, side: str, price_ticks: int, quantity: int, trader_id: Any) -> None:
+        self.id = order_id
+        self.side = side
+        self.price_ticks = price_ticks
+        self.quantity = quantity
+        self.trader_id = trader_id
+        self.active = True
+
+
+class _Level:
+    """Nível de preço: fila FIFO de ordens e número de ordens ainda ativas."""
+
+    __slots__ = ("orders", "live")
+
+    def __init__(self) -> None:
+        self.orders: Deque[_Order] = deque()
+        self.live = 0
+
+
+class OrderBook:
+    """
+    Livro de ofertas com prioridade preço-tempo e casamento imediato de ordens.
+
+    Cada lado do livro mantém um dicionário {preço em ticks: nível} e um heap
+    com os preços dos níveis (preços negados no lado de compra, para que o topo
+    do heap seja sempre o melhor preço). Cada nível guarda as ordens em uma fila
+    FIFO, o que garante a prioridade por ordem de chegada dentro do mesmo preço.
+
+    Os preços são convertidos em ticks inteiros (`tick_size`), evitando erros
+    de comparação de ponto flutuante entre preços iguais.
+
+    Complexidade:
+
+    - `add`: O(log n) para inserir uma ordem em repouso (n = número de níveis),
+      mais O(log n) por nível consumido ao casar com o lado oposto.
+    - `cancel`: O(1); a ordem é apenas marcada como inativa (remoção preguiçosa)
+      e descartada quando chega ao início da fila do nível. Um nível sem ordens
+      ativas é removido do dicionário, e a entrada correspondente do heap é
+      descartada quando chega ao topo. Quando as entradas obsoletas passam a
+      superar os níveis ativos, o heap é reconstruído a partir dos níveis
+      (O(n), amortizado nas inserções), de modo que o heap não cresce sem
+      limite quando os mesmos preços são esvaziados e recriados repetidamente.
+      Da mesma forma, a fila de um nível é compactada quando as ordens
+      canceladas passam a superar as ativas (O(k), amortizado nos
+      cancelamentos), de modo que ordens canceladas atrás de uma ordem antiga
+      no início da fila não se acumulam.
+    - `best_bid` / `best_ask`: O(1) amortizado.
+
+    A classe não é thread-safe: o acesso concorrente deve ser protegido por um
+    lock externo (como `order_book_lock` em `simular_traders`).
+
+    :param tick_size: Variação mínima de preço. Deve ser positiva.
+    :type tick_size: float
+    :raises ValueError: Se `tick_size` não for positivo.
+    """
+
+    def __init__(self, tick_size: float = 0.01) -> None:
+        if tick_size <= 0:
+            raise ValueError("tick_size deve ser positivo.")
+        self.tick_size = tick_size
+        self._levels: Dict[str, Dict[int, _Level]] = {'buy': {}, 'sell': {}}
+        self._heaps: Dict[str, List[int]] = {'buy': [], 'sell': []}
+        self._orders: Dict[int, _Order] = {}  # Ordens em repouso, por ID
+        self.trades: List[Dict[str, Any]] = []
+
+    def _best_ticks(self, side: str) -> Optional[int]:
+        """Melhor preço (em ticks) do lado `side`, descartando entradas obsoletas do heap."""
+        heap = self._heaps[side]
+        levels = self._levels[side]
+        while heap:
+            ticks = -heap[0] if side == 'buy' else heap[0]
+            if ticks in levels:
+                return ticks
+            heapq.heappop(heap)
+        return None
+
+    def _rebuild_heap(self, side: str) -> None:
+        """Reconstrói o heap de `side` apenas com os níveis ativos, descartando entradas obsoletas."""
+        heap = [-ticks if side == 'buy' else ticks for ticks in self._levels[side]]
+        heapq.heapify(heap)
+        self._heaps[side] = heap
+
+    def _to_price(self, ticks: int) -> float:
+        """Converte um preço em ticks para float, sem resíduos de arredondamento."""
+        return round(ticks * self.tick_size, 10)
+
+    def best_bid(self) -> Optional[float]:
+        """Maior preço de compra em repouso (ou None se o lado estiver vazio)."""
+        ticks = self._best_ticks('buy')
+        return None if ticks is None else self._to_price(ticks)
+
+    def best_ask(self) -> Optional[float]:
+        """Menor preço de venda em repouso (ou None se o lado estiver vazio)."""
+        ticks = self._best_ticks('sell')
+        return None if ticks is None else self._to_price(ticks)
+
+    def _remove_from_level(self, order: _Order) -> None:
+        """
+        Marca `order` como inativa e remove o nível se ele ficar sem ordens ativas.
+        Se as ordens inativas passarem a superar as ativas na fila do nível, a
+        fila é compactada.
+        """
+        order.active = False
+        del self._orders[order.id]
+        levels = self._levels[order.side]
+        level = levels[order.price_ticks]
+        level.live -= 1
+        if level.live == 0:
+            del levels[order.price_ticks]
+        elif len(level.orders) > 2 * level.live:
+            level.orders = deque(o for o in level.orders if o.active)
+
+    def add(self, order_id: int, side: str, price: float, quantity: int, trader_id: Any = None) -> List[Dict[str, Any]]:
+        """
+        Insere uma ordem limitada, casando-a primeiro com as ordens do lado
+        oposto cujo preço cruza o seu. O saldo não executado fica em repouso.
+
+        Cada execução ocorre ao preço da ordem em repouso e gera um registro
+        de negócio (dicionário com 'buy_id', 'sell_id', 'price', 'quantity',
+        'buy_trader_id' e 'sell_trader_id'), acumulado também em `trades`.
+
+        :param order_id: ID único da ordem.
+        :type order_id: int
+        :param side: 'buy' ou 'sell'.
+        :type side: str
+        :param price: Preço limite da ordem.
+        :type price: float
+        :param quantity: Quantidade. Deve ser um inteiro positivo.
+        :type quantity: int
+        :param trader_id: Identificador do trader (opcional).
+        :type trader_id: Any
+        :raises ValueError: Se `side` for inválido, `quantity` não for positiva ou `order_id` já estiver no livro.
+        :return: Lista dos negócios gerados pela ordem (vazia se não houve casamento).
+        :rtype: List[Dict[str, Any]]
+        """
+        if side not in ('buy', 'sell'):
+            raise ValueError("side deve ser 'buy' ou 'sell'.")
+        if not isinstance(quantity, int) or quantity <= 0:
+            raise ValueError("quantity deve ser um inteiro positivo.")
+        if order_id in self._orders:
+            raise ValueError(f"Já existe uma ordem em repouso com ID {order_id}.")
+
+        price_ticks = round(price / self.tick_size)
+        opposite = 'sell' if side == 'buy' else 'buy'
+        opposite_levels = self._levels[opposite]
+        trades: List[Dict[str, Any]] = []
+
+        # --- Casamento com o lado oposto enquanto os preços cruzarem ---
+        while quantity > 0:
+            best = self._best_ticks(opposite)
+            if best is None or (best > price_ticks if side == 'buy' else best < price_ticks):
+                break
+            level = opposite_levels[best]
+            resting = level.orders[0]
+            if not resting.active:
+                level.orders.popleft()  # Ordem cancelada: remoção preguiçosa
+                continue
+
+            executed = min(quantity, resting.quantity)
+            quantity -= executed
+            resting.quantity -= executed
+            buy, sell = (order_id, resting.id) if side == 'buy' else (resting.id, order_id)
+            buy_trader, sell_trader = (trader_id, resting.trader_id) if side == 'buy' else (resting.trader_id, trader_id)
+            trades.append({
+                'buy_id': buy,
+                'sell_id': sell,
+                'price': self._to_price(best),
+                'quantity': executed,
+                'buy_trader_id': buy_trader,
+                'sell_trader_id': sell_trader,
+            })
+            if resting.quantity == 0:
+                level.orders.popleft()
+                self._remove_from_level(resting)
+
+        # --- Saldo remanescente entra em repouso no seu nível de preço ---
+        if quantity > 0:
+            levels = self._levels[side]
+            level = levels.get(price_ticks)
+            if level is None:
+                level = levels[price_ticks] = _Level()
+                heap = self._heaps[side]
+                heapq.heappush(heap, -price_ticks if side == 'buy' else price_ticks)
+                if len(heap) > 2 * len(levels):
+                    self._rebuild_heap(side)
+            order = _Order(order_id, side, price_ticks, quantity, trader_id)
+            level.orders.append(order)
+            level.live += 1
+            self._orders[order_id] = order
+
+        self.trades.extend(trades)
+        return trades
+
+    def cancel(self, order_id: int) -> bool:
+        """
+        Cancela uma ordem em repouso.
+
+        :param order_id: ID da ordem.
+        :type order_id: int
+        :return: True se a ordem estava em repouso e foi cancelada; False caso contrário.
+        :rtype: bool
+        """
+        order = self._orders.get(order_id)
+        if order is None:
+            return False
+        self._remove_from_level(order)
+        return True
+
+    def __len__(self) -> int:
+        """Número de ordens em repouso."""
+        return len(self._orders)
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self._orders
+
+    def to_dict(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Ordens em repouso no formato de `simular_traders`: dicionário com chaves
+        'buy' e 'sell', cada uma com a lista de ordens em prioridade preço-tempo.
+        """
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        for side in ('buy', 'sell'):
+            levels = self._levels[side]
+            result[side] = [
+                {
+                    'id': order.id,
+                    'price': self._to_price(ticks),
+                    'quantity': order.quantity,
+                    'trader_id': order.trader_id,
+                    'type': side,
+                }
+                for ticks in sorted(levels, reverse=(side == 'buy'))
+                for order in levels[ticks].orders
+                if order.active
+            ]
+        return result
@@ -0,0 +1,243 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Códigos do lado da ordem na coluna 'side'
+_LADOS = ('buy', 'sell')
+_CODIGO_LADO = {lado: codigo for codigo, lado in enumerate(_LADOS)}
+
+# Layout de uma ordem: 25 bytes por ordem, contra mais de 400 bytes de um dicionário
+ORDER_DTYPE = np.dtype([
+    ('id', np.int64),
+    ('price_ticks', np.int64),  # Preço em ticks inteiros (ponto fixo)
+    ('quantity', np.int32),
+    ('trader_id', np.int32),
+    ('side', np.int8),          # 0 = 'buy', 1 = 'sell'
+])
+
+
+def _somar_por_chave(chaves: np.ndarray, valores: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Agrupa `valores` por `chaves` com uma ordenação e uma redução segmentada.
+
+    :return: Tupla (chaves distintas em ordem crescente, número de elementos, soma inteira dos valores).
+    """
+    if len(chaves) == 0:
+        return chaves[:0].copy(), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    ordem = np.argsort(chaves, kind='stable')
+    chaves_ordenadas = chaves[ordem]
+    inicios = np.flatnonzero(np.r_[True, chaves_ordenadas[1:] != chaves_ordenadas[:-1]])
+    somas = np.add.reduceat(valores[ordem].astype(np.int64), inicios)
+    contagens = np.diff(np.r_[inicios, len(chaves)])
+    return chaves_ordenadas[inicios], contagens, somas
+
+
+class OrderStore:
+    """
+    Armazenamento colunar de ordens em um array estruturado NumPy.
+
+    Cada ordem ocupa uma linha de `ORDER_DTYPE` (id, preço em ticks, quantidade,
+    trader e lado), em vez de um dicionário por ordem. A capacidade dobra quando
+    o array fica cheio, de modo que a inserção tem custo O(1) amortizado, e as
+    consultas agregadas (volume por preço, totais por trader) são vetorizadas.
+
+    A classe não é thread-safe: o acesso concorrente deve ser protegido por um
+    lock externo (como `order_book_lock` em `simular_traders`).
+
+    :param tick_size: Variação mínima de preço usada na conversão para ticks. Deve ser positiva.
+    :type tick_size: float
+    :param capacidade_inicial: Número de ordens reservadas inicialmente. Deve ser positivo.
+    :type capacidade_inicial: int
+    :raises ValueError: Se `tick_size` ou `capacidade_inicial` não forem positivos.
+    """
+
+    def __init__(self, tick_size: float = 0.01, capacidade_inicial: int = 1024) -> None:
+        if tick_size <= 0:
+            raise ValueError("tick_size deve ser positivo.")
+        if not isinstance(capacidade_inicial, int) or capacidade_inicial <= 0:
+            raise ValueError("capacidade_inicial deve ser um inteiro positivo.")
+        self.tick_size = tick_size
+        self._data = np.empty(capacidade_inicial, dtype=ORDER_DTYPE)
+        self._size = 0
+
+    @classmethod
+    def de_array(cls, dados: np.ndarray, tick_size: float = 0.01) -> "OrderStore":
+        """
+        Cria um store com uma cópia de um array estruturado de `ORDER_DTYPE`.
+
+        :param dados: Array 1-dimensional com dtype `ORDER_DTYPE`.
+        :type dados: np.ndarray
+        :param tick_size: Variação mínima de preço dos ticks em `dados`.
+        :type tick_size: float
+        :raises ValueError: Se `dados` não for 1-dimensional com dtype `ORDER_DTYPE`.
+        :return: O novo OrderStore.
+        :rtype: OrderStore
+        """
+        if not isinstance(dados, np.ndarray) or dados.ndim != 1 or dados.dtype != ORDER_DTYPE:
+            raise ValueError("dados deve ser um array 1-dimensional com dtype ORDER_DTYPE.")
+        store = cls(tick_size=tick_size, capacidade_inicial=max(len(dados), 1))
+        store._data[:len(dados)] = dados
+        store._size = len(dados)
+        return store
+
+    def _reservar(self, extra: int) -> None:
+        """Garante espaço para mais `extra` ordens, dobrando a capacidade se preciso."""
+        necessario = self._size + extra
+        if necessario <= len(self._data):
+            return
+        capacidade = len(self._data)
+        while capacidade < necessario:
+            capacidade *= 2
+        novo = np.empty(capacidade, dtype=ORDER_DTYPE)
+        novo[:self._size] = self._data[:self._size]
+        self._data = novo
+
+    def append(self, order_id: int, side: str, price: float, quantity: int, trader_id: int) -> None:
+        """
+        Adiciona uma ordem.
+
+        :param order_id: ID da ordem.
+        :type order_id: int
+        :param side: 'buy' ou 'sell'.
+        :type side: str
+        :param price: Preço da ordem (convertido para ticks).
+        :type price: float
+        :param quantity: Quantidade.
+        :type quantity: int
+        :param trader_id: ID do trader.
+        :type trader_id: int
+        :raises ValueError: Se `side` não for 'buy' ou 'sell'.
+        """
+        if side not in _CODIGO_LADO:
+            raise ValueError("side deve ser 'buy' ou 'sell'.")
+        self._reservar(1)
+        self._data[self._size] = (order_id, round(price / self.tick_size), quantity, trader_id, _CODIGO_LADO[side])
+        self._size += 1
+
+    def extend(
+        self,
+        ids: np.ndarray,
+        sides: np.ndarray,
+        price_ticks: np.ndarray,
+        quantities: np.ndarray,
+        trader_ids: np.ndarray
+    ) -> None:
+        """
+        Adiciona um lote de ordens a partir de colunas (arrays de mesmo comprimento).
+
+        :param ids: IDs das ordens.
+        :type ids: np.ndarray
+        :param sides: Códigos dos lados (0 = 'buy', 1 = 'sell').
+        :type sides: np.ndarray
+        :param price_ticks: Preços em ticks inteiros.
+        :type price_ticks: np.ndarray
+        :param quantities: Quantidades.
+        :type quantities: np.ndarray
+        :param trader_ids: IDs dos traders.
+        :type trader_ids: np.ndarray
+        :raises ValueError: Se as colunas tiverem comprimentos diferentes.
+        """
+        n = len(ids)
+        if not all(len(coluna) == n for coluna in (sides, price_ticks, quantities, trader_ids)):
+            raise ValueError("Todas as colunas do lote devem ter o mesmo comprimento.")
+        self._reservar(n)
+        lote = self._data[self._size : self._size + n]
+        lote['id'] = ids
+        lote['side'] = sides
+        lote['price_ticks'] = price_ticks
+        lote['quantity'] = quantities
+        lote['trader_id'] = trader_ids
+        self._size += n
+
+    def preparar_lote(
+        self,
+        orders: List[Tuple[int, str, float, int]],
+        trader_id: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Converte um lote de ordens de um mesmo trader, no formato de tuplas
+        (id, lado, preço, quantidade), para as colunas aceitas por `extend`.
+
+        Não altera o store: a conversão pode ser feita fora do lock que protege
+        o `extend` correspondente.
+
+        :param orders: Lista de tuplas (id, 'buy'/'sell', preço, quantidade).
+        :type orders: List[Tuple[int, str, float, int]]
+        :param trader_id: ID do trader de todas as ordens do lote.
+        :type trader_id: int
+        :return: Tupla (ids, lados, preços em ticks, quantidades, traders).
+        :rtype: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+        """
+        ids, sides, prices, quantities = zip(*orders) if orders else ((), (), (), ())
+        return (
+            np.array(ids, dtype=np.int64),
+            np.array([_CODIGO_LADO[side] for side in sides], dtype=np.int8),
+            np.rint(np.array(prices, dtype=np.float64) / self.tick_size).astype(np.int64),
+            np.array(quantities, dtype=np.int32),
+            np.full(len(orders), trader_id, dtype=np.int32),
+        )
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def dados(self) -> np.ndarray:
+        """View (sem cópia) do array estruturado com as ordens armazenadas."""
+        return self._data[:self._size]
+
+    @property
+    def precos(self) -> np.ndarray:
+        """Preços das ordens em ponto flutuante."""
+        return np.round(self.dados['price_ticks'] * self.tick_size, 10)
+
+    def _mascara_lado(self, side: Optional[str]) -> Any:
+        if side is None:
+            return slice(None)
+        if side not in _CODIGO_LADO:
+            raise ValueError("side deve ser 'buy', 'sell' ou None.")
+        return self.dados['side'] == _CODIGO_LADO[side]
+
+    def contagem(self, side: Optional[str] = None) -> int:
+        """Número de ordens do lado `side` (ou de todas, se None)."""
+        if side is None:
+            return self._size
+        return int(np.count_nonzero(self._mascara_lado(side)))
+
+    def volume_por_preco(self, side: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Volume total (soma das quantidades) por nível de preço.
+
+        :param side: 'buy', 'sell' ou None (ambos os lados).
+        :type side: Optional[str]
+        :return: Tupla (preços em ordem crescente, volume em cada preço).
+        :rtype: Tuple[np.ndarray, np.ndarray]
+        """
+        dados = self.dados[self._mascara_lado(side)]
+        ticks, _, volumes = _somar_por_chave(dados['price_ticks'], dados['quantity'])
+        return np.round(ticks * self.tick_size, 10), volumes
+
+    def totais_por_trader(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Número de ordens e volume total de cada trader.
+
+        :return: Tupla (IDs dos traders em ordem crescente, número de ordens, volume total).
+        :rtype: Tuple[np.ndarray, np.ndarray, np.ndarray]
+        """
+        return _somar_por_chave(self.dados['trader_id'], self.dados['quantity'])
+
+    def to_dict(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Converte as ordens para o formato de dicionários de `simular_traders`
+        (chaves 'buy' e 'sell'). Destinado a volumes pequenos, para inspeção.
+        """
+        result: Dict[str, List[Dict[str, Any]]] = {lado: [] for lado in _LADOS}
+        for order_id, ticks, quantity, trader_id, side in self.dados.tolist():
+            lado = _LADOS[side]
+            result[lado].append({
+                'id': order_id,
+                'price': round(ticks * self.tick_size, 10),
+                'quantity': quantity,
+                'trader_id': trader_id,
+                'type': lado,
+            })
+        return result
@@ -1,12 +1,292 @@
+import os
 import threading
 import time
 import random
-from typing import Dict, List, Any, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, Deque, Dict, List, Any, Optional, Tuple, Union
 
-# Dicionário compartilhado para armazenar os preços das ações
-prices: Dict[str, float] = {}
-# Lock para sincronizar o acesso ao dicionário 'prices'
-prices_lock = threading.Lock()
+import numpy as np
+
+from OrderBook import OrderBook
+from OrderStore import ORDER_DTYPE, OrderStore
+
+
+class ShardedPriceTable:
+    """
+    Tabela de preços particionada em `num_shards` shards, cada um com o seu
+    próprio lock (lock striping).
+
+    Cada ticker pertence a um único shard, escolhido pelo hash do nome, de modo
+    que feeds de ações em shards diferentes atualizam preços sem disputar o
+    mesmo lock. As escritas incrementam um contador de versão do shard antes e
+    depois da alteração (seqlock): o contador é ímpar enquanto uma escrita está
+    em andamento. As leituras (`get`, `snapshot_shard`, `snapshot`) não adquirem
+    locks: copiam o shard e repetem a cópia se o contador mudou ou era ímpar,
+    garantindo um snapshot consistente de cada shard sem bloquear os escritores.
+
+    :param num_shards: Número de shards (e de locks). Deve ser um inteiro positivo.
+    :type num_shards: int
+    :raises ValueError: Se `num_shards` não for um inteiro positivo.
+    """
+
+    # Tentativas de leitura otimista antes de recorrer ao lock do shard,
+    # evitando que um leitor seja adiado indefinidamente por escritas contínuas
+    _MAX_TENTATIVAS = 64
+
+    def __init__(self, num_shards: int = 16) -> None:
+        if not isinstance(num_shards, int) or num_shards <= 0:
+            raise ValueError("num_shards deve ser um inteiro positivo.")
+        self.num_shards = num_shards
+        self._shards: List[Dict[str, float]] = [{} for _ in range(num_shards)]
+        self._locks = [threading.Lock() for _ in range(num_shards)]
+        self._versions = [0] * num_shards
+
+    def _shard_index(self, ticker: str) -> int:
+        return hash(ticker) % self.num_shards
+
+    def set(self, ticker: str, price: float) -> None:
+        """Define o preço de `ticker`."""
+        i = self._shard_index(ticker)
+        with self._locks[i]:
+            self._versions[i] += 1  # Ímpar: escrita em andamento
+            self._shards[i][ticker] = price
+            self._versions[i] += 1
+
+    def update(self, ticker: str, func: Callable[[float], float]) -> float:
+        """
+        Atualiza atomicamente o preço de `ticker` para func(preço atual).
+
+        Apenas o lock do shard de `ticker` é adquirido.
+
+        :param ticker: Nome da ação. Deve estar presente na tabela.
+        :type ticker: str
+        :param func: Função que recebe o preço atual e retorna o novo preço.
+        :type func: Callable[[float], float]
+        :raises KeyError: Se `ticker` não estiver na tabela.
+        :return: O novo preço.
+        :rtype: float
+        """
+        i = self._shard_index(ticker)
+        with self._locks[i]:
+            new_price = func(self._shards[i][ticker])
+            self._versions[i] += 1
+            self._shards[i][ticker] = new_price
+            self._versions[i] += 1
+        return new_price
+
+    def get(self, ticker: str, default: Any = None) -> Any:
+        """Lê o preço de `ticker` sem adquirir lock (ou `default` se ausente)."""
+        return self._shards[self._shard_index(ticker)].get(ticker, default)
+
+    def snapshot_shard(self, i: int) -> Dict[str, float]:
+        """
+        Cópia consistente do shard `i`, obtida pelo caminho de leitura do seqlock.
+
+        :param i: Índice do shard, de 0 a num_shards - 1.
+        :type i: int
+        :return: Dicionário {ticker: preço} do shard.
+        :rtype: Dict[str, float]
+        """
+        for _ in range(self._MAX_TENTATIVAS):
+            version = self._versions[i]
+            if version % 2 == 0:
+                copia = dict(self._shards[i])
+                if self._versions[i] == version:
+                    return copia
+        with self._locks[i]:
+            return dict(self._shards[i])
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        Cópia de todos os preços, montada a partir de snapshots por shard.
+
+        Cada shard é copiado de forma consistente; shards diferentes podem
+        refletir instantes ligeiramente diferentes.
+        """
+        snapshot: Dict[str, float] = {}
+        for i in range(self.num_shards):
+            snapshot.update(self.snapshot_shard(i))
+        return snapshot
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._shards[self._shard_index(ticker)]
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+
+class _RiskRequest:
+    """Pedido de risco em espera no RiskBudget."""
+
+    __slots__ = ("amount", "condition", "ultrapassagens")
+
+    def __init__(self, amount: float, condition: threading.Condition) -> None:
+        self.amount = amount
+        self.condition = condition
+        self.ultrapassagens = 0  # Quantas vezes pedidos posteriores foram atendidos antes deste
+
+
+class RiskBudget:
+    """
+    Orçamento de risco compartilhado, com alocação bloqueante e fila justa.
+
+    Estratégias chamam `acquire(amount)` para alocar risco e `release(amount)`
+    para devolvê-lo. Um pedido que não cabe no orçamento bloqueia a thread em
+    uma `threading.Condition` (sem polling) e é atendido assim que houver
+    capacidade.
+
+    Os pedidos em espera formam uma fila por ordem de chegada. Um pedido que
+    cabe no risco disponível pode ultrapassar pedidos maiores que estão à sua
+    frente e ainda não cabem, mas cada pedido só pode ser ultrapassado
+    `max_ultrapassagens` vezes: a partir daí, nenhum pedido posterior é
+    atendido antes dele (FIFO estrito atrás dele), de modo que pedidos grandes
+    não sofrem inanição. Com `max_ultrapassagens=0`, a fila é estritamente FIFO
+    e um pedido que não cabe bloqueia todos os que chegaram depois dele.
+
+    Cada pedido em espera tem a sua própria condição, associada ao lock do
+    orçamento, e apenas os pedidos que podem ser atendidos são acordados quando
+    o estado muda, evitando acordar todas as threads a cada liberação.
+
+    `close()` encerra o orçamento: os pedidos em espera (e os futuros) retornam
+    False imediatamente.
+
+    :param limite: Risco total disponível. Deve ser um número positivo.
+    :type limite: float
+    :param max_ultrapassagens: Número máximo de vezes que um pedido em espera pode ser
+                               ultrapassado por pedidos posteriores. Deve ser um inteiro não negativo.
+    :type max_ultrapassagens: int
+    :raises ValueError: Se `limite` não for positivo ou `max_ultrapassagens` for negativo.
+    """
+
+    def __init__(self, limite: float, max_ultrapassagens: int = 4) -> None:
+        if not isinstance(limite, (int, float)) or limite <= 0:
+            raise ValueError("limite deve ser um número positivo.")
+        if not isinstance(max_ultrapassagens, int) or max_ultrapassagens < 0:
+            raise ValueError("max_ultrapassagens deve ser um inteiro não negativo.")
+        self.limite = float(limite)
+        self.max_ultrapassagens = max_ultrapassagens
+        self._lock = threading.Lock()
+        self._waiters: Deque[_RiskRequest] = deque()
+        self._em_uso = 0.0
+        self._fechado = False
+
+    @property
+    def em_uso(self) -> float:
+        """Risco atualmente alocado."""
+        return self._em_uso
+
+    @property
+    def disponivel(self) -> float:
+        """Risco ainda disponível para alocação."""
+        return self.limite - self._em_uso
+
+    def _pode_alocar(self, amount: float, request: Optional[_RiskRequest] = None) -> bool:
+        """
+        Indica se `amount` pode ser alocado agora pelo pedido `request` (ou por
+        um pedido novo, se None): ele deve caber no orçamento e nenhum pedido à
+        sua frente na fila pode ter esgotado as ultrapassagens (o lock deve estar adquirido).
+        """
+        if self._em_uso + amount > self.limite:
+            return False
+        for waiter in self._waiters:
+            if waiter is request:
+                return True
+            if waiter.ultrapassagens >= self.max_ultrapassagens:
+                return False
+        return request is None
+
+    def _alocar(self, amount: float, request: Optional[_RiskRequest] = None) -> None:
+        """Aloca `amount` e conta uma ultrapassagem para cada pedido à frente (o lock deve estar adquirido)."""
+        self._em_uso += amount
+        for waiter in self._waiters:
+            if waiter is request:
+                break
+            waiter.ultrapassagens += 1
+
+    def _notify_eligible(self) -> None:
+        """
+        Acorda, na ordem da fila, os pedidos que cabem no risco disponível,
+        parando no primeiro pedido que não cabe e não pode mais ser
+        ultrapassado (o lock deve estar adquirido).
+        """
+        livre = self.limite - self._em_uso
+        for waiter in self._waiters:
+            if waiter.amount <= livre:
+                waiter.condition.notify()
+                livre -= waiter.amount
+            elif waiter.ultrapassagens >= self.max_ultrapassagens:
+                break
+
+    def acquire(self, amount: float, timeout: Optional[float] = None) -> bool:
+        """
+        Aloca `amount` de risco, bloqueando até que haja capacidade, o tempo
+        limite expire ou o orçamento seja fechado.
+
+        :param amount: Risco solicitado. Deve ser positivo e no máximo `limite`.
+        :type amount: float
+        :param timeout: Tempo máximo de espera em segundos (None: sem limite).
+        :type timeout: Optional[float]
+        :raises ValueError: Se `amount` não for positivo ou exceder `limite`.
+        :return: True se o risco foi alocado; False se o tempo expirou ou o orçamento foi fechado.
+        :rtype: bool
+        """
+        if not isinstance(amount, (int, float)) or amount <= 0:
+            raise ValueError("amount deve ser um número positivo.")
+        if amount > self.limite:
+            raise ValueError(f"amount ({amount:.2f}) excede o limite do orçamento ({self.limite:.2f}).")
+
+        with self._lock:
+            if self._fechado:
+                return False
+            # Caminho rápido: o pedido cabe e pode passar à frente de toda a fila
+            if self._pode_alocar(amount):
+                self._alocar(amount)
+                return True
+
+            request = _RiskRequest(amount, threading.Condition(self._lock))
+            self._waiters.append(request)
+            try:
+                granted = request.condition.wait_for(
+                    lambda: self._fechado or self._pode_alocar(amount, request), timeout
+                )
+                if granted and not self._fechado:
+                    self._alocar(amount, request)
+                    return True
+                return False
+            finally:
+                self._waiters.remove(request)
+                # A saída deste pedido (atendido ou não) pode liberar os seguintes
+                self._notify_eligible()
+
+    def release(self, amount: float) -> None:
+        """
+        Devolve `amount` de risco ao orçamento e acorda os pedidos da fila que passam a caber.
+
+        :param amount: Risco devolvido. Deve ser positivo e no máximo o risco em uso.
+        :type amount: float
+        :raises ValueError: Se `amount` não for positivo ou exceder o risco em uso.
+        """
+        if not isinstance(amount, (int, float)) or amount <= 0:
+            raise ValueError("amount deve ser um número positivo.")
+        with self._lock:
+            # Tolerância para o erro de arredondamento acumulado nas somas de floats
+            if amount > self._em_uso + 1e-9 * self.limite:
+                raise ValueError(f"amount ({amount:.2f}) excede o risco em uso ({self._em_uso:.2f}).")
+            self._em_uso = max(self._em_uso - amount, 0.0)
+            self._notify_eligible()
+
+    def close(self) -> None:
+        """Fecha o orçamento, cancelando todos os pedidos em espera."""
+        with self._lock:
+            self._fechado = True
+            for waiter in self._waiters:
+                waiter.condition.notify()
+
+
+# Tabela compartilhada (particionada em shards) com os preços das ações
+price_table = ShardedPriceTable()
 # Evento para sinalizar às threads quando devem parar
 stop_simulation_event = threading.Event()
 
@@ -16,13 +296,16 @@ order_book: Dict[str, List[Dict[str, Any]]] = {
     'sell': []   # Lista de ordens de venda
 }
 order_book_lock = threading.Lock()
+# Livro com casamento de ordens, usado por simular_traders(casar_ordens=True)
+matching_book: Optional[OrderBook] = None
+# Armazenamento colunar, usado por simular_traders(formato='colunar')
+order_store: Optional[OrderStore] = None
 order_id_counter = 0  # Contador global para IDs de ordem únicos
 order_id_counter_lock = threading.Lock() # Lock para o contador de IDs
 
 # Variáveis globais para o gerenciamento de risco
-current_total_risk: float = 0.0
 allocated_risk_per_strategy: Dict[str, float] = {}
-risk_lock = threading.Lock()
+risk_lock = threading.Lock() # Protege 'allocated_risk_per_strategy'
 stop_simulation_event = threading.Event() # Evento para sinalizar o fim da simulação
 
 # Lista compartilhada para armazenar as ações que atingiram o valor_alvo
@@ -30,50 +313,103 @@ reached_target_stocks: List[str] = []
 # Lock para sincronizar o acesso à lista compartilhada
 reached_lock = threading.Lock()
 
-def _generate_unique_order_id() -> int:
+def _reserve_order_ids(quantidade: int = 1) -> int:
     """
-    Gera um ID de ordem único e thread-safe.
+    Reserva, de forma thread-safe, um bloco de `quantidade` IDs de ordem
+    consecutivos e retorna o primeiro deles.
+
+    Reservar IDs em blocos reduz as aquisições de `order_id_counter_lock` de
+    uma por ordem para uma por lote.
     """
     global order_id_counter
     with order_id_counter_lock:
-        order_id_counter += 1
-        return order_id_counter
+        first_id = order_id_counter + 1
+        order_id_counter += quantidade
+        return first_id
 
-def _trader_task(trader_id: int, num_orders_per_trader: int) -> None:
+def _publish_orders(trader_id: int, staged: List[Tuple[int, str, float, int]]) -> None:
+    """
+    Publica um lote de ordens preparadas localmente por um trader, com uma
+    única aquisição de `order_book_lock`.
+
+    As estruturas de cada formato (dicionários ou colunas) são montadas antes
+    da aquisição do lock, que fica retido apenas para a inserção propriamente dita.
+
+    :param trader_id: ID do trader que gerou as ordens.
+    :type trader_id: int
+    :param staged: Lista de tuplas (id, tipo, preço, quantidade), na ordem de geração.
+    :type staged: List[Tuple[int, str, float, int]]
+    """
+    if matching_book is not None:
+        with order_book_lock:
+            for order_id, order_type, price, quantity in staged:
+                matching_book.add(order_id, order_type, price, quantity, trader_id)
+    elif order_store is not None:
+        # Formato colunar: nenhuma estrutura por ordem é criada
+        columns = order_store.preparar_lote(staged, trader_id)
+        with order_book_lock:
+            order_store.extend(*columns)
+    else:
+        new_orders: Dict[str, List[Dict[str, Any]]] = {'buy': [], 'sell': []}
+        for order_id, order_type, price, quantity in staged:
+            new_orders[order_type].append({
+                'id': order_id,
+                'price': price,
+                'quantity': quantity,
+                'trader_id': trader_id, # Adiciona trader_id para melhor rastreamento
+                'type': order_type # Adiciona tipo para consistência
+            })
+        with order_book_lock:
+            order_book['buy'].extend(new_orders['buy'])
+            order_book['sell'].extend(new_orders['sell'])
+            # print(f"Trader {trader_id}: Publicou {len(staged)} ordens")
+
+def _trader_task(trader_id: int, num_orders_per_trader: int, tamanho_lote: int = 1) -> None:
     """
     Função que simula o comportamento de um trader colocando ordens.
 
-    Cada trader_task coloca 'num_orders_per_trader' ordens no order_book.
-    Usa um threading.Lock para garantir acesso seguro ao order_book.
+    Cada trader_task coloca 'num_orders_per_trader' ordens no order_book
+    (ou no livro com casamento `matching_book`, ou no armazenamento colunar
+    `order_store`, se um deles estiver ativo).
+
+    As ordens são geradas em lotes de até `tamanho_lote`: o trader reserva um
+    bloco de IDs, prepara as ordens em um buffer local e as publica com uma
+    única aquisição de lock por lote, evitando que as threads formem fila
+    (lock convoy) a cada ordem. Com `tamanho_lote=1`, cada ordem é publicada
+    individualmente, como na versão original.
 
     :param trader_id: ID único do trader (para identificação nos logs).
     :type trader_id: int
     :param num_orders_per_trader: Número de ordens que este trader deve colocar.
     :type num_orders_per_trader: int
+    :param tamanho_lote: Número máximo de ordens publicadas por aquisição de lock.
+    :type tamanho_lote: int
     """
-    for _ in range(num_orders_per_trader):
-        order_type = random.choice(['buy', 'sell'])
-        price = round(random.uniform(90.0, 110.0), 2)  # Preço aleatório
-        quantity = random.randint(1, 100)  # Quantidade aleatória
-        order_id = _generate_unique_order_id()
-
-        order = {
-            'id': order_id,
-            'price': price,
-            'quantity': quantity,
-            'trader_id': trader_id, # Adiciona trader_id para melhor rastreamento
-            'type': order_type # Adiciona tipo para consistência
-        }
-
-        # Adquire o lock antes de modificar o order_book
-        with order_book_lock:
-            order_book[order_type].append(order)
-            # print(f"Trader {trader_id}: Colocou ordem {order_type} com ID {order_id}")
-        
-        # Simula algum tempo de processamento/atividade antes de colocar a próxima ordem
+    remaining = num_orders_per_trader
+    while remaining > 0:
+        batch_size = min(tamanho_lote, remaining)
+        first_id = _reserve_order_ids(batch_size)
+
+        staged: List[Tuple[int, str, float, int]] = []
+        for order_id in range(first_id, first_id + batch_size):
+            order_type = random.choice(['buy', 'sell'])
+            price = round(random.uniform(90.0, 110.0), 2)  # Preço aleatório
+            quantity = random.randint(1, 100)  # Quantidade aleatória
+            staged.append((order_id, order_type, price, quantity))
+
+        _publish_orders(trader_id, staged)
+        remaining -= batch_size
+
+        # Simula algum tempo de processamento/atividade antes de colocar o próximo lote
         # time.sleep(0.001) # Pequeno sleep para simular trabalho, pode ser removido para performance
 
-def simular_traders(num_traders: int, num_orders: int) -> Dict[str, List[Dict[str, Any]]]:
+def simular_traders(
+    num_traders: int,
+    num_orders: int,
+    casar_ordens: bool = False,
+    formato: str = 'dicts',
+    tamanho_lote: int = 64
+) -> Union[Dict[str, List[Dict[str, Any]]], OrderStore]:
     """
     Implementa uma simulação onde múltiplas threads (traders) inserem
     ordens de compra ou venda em uma estrutura compartilhada chamada `order_book`.
@@ -81,37 +417,66 @@ def simular_traders(num_traders: int, num_orders: int) -> Dict[str, List[Dict[st
     Utiliza `threading.Lock` para garantir que o acesso ao `order_book` seja seguro e atômico.
     Após todas as threads finalizarem, retorna o estado final da estrutura `order_book`.
 
+    Com `casar_ordens=True`, as ordens são inseridas em um `OrderBook` com
+    prioridade preço-tempo: ordens que cruzam o melhor preço do lado oposto são
+    executadas imediatamente, e apenas o saldo não executado fica no livro.
+
+    Com `formato='colunar'`, as ordens são gravadas em um `OrderStore` (um array
+    estruturado NumPy, sem um dicionário por ordem), que é retornado diretamente.
+
+    Cada trader reserva IDs e publica ordens em lotes de até `tamanho_lote`,
+    com uma aquisição de lock por lote. O número de ordens e a unicidade dos
+    IDs não dependem do tamanho do lote; `tamanho_lote=1` reproduz a
+    publicação ordem a ordem.
+
     :param num_traders: Número de threads (traders) a serem criadas.
                         Deve ser um inteiro positivo.
     :type num_traders: int
     :param num_orders: Número de ordens que cada trader deve colocar.
                        Deve ser um inteiro positivo.
     :type num_orders: int
+    :param casar_ordens: Se True, casa as ordens em um `OrderBook` em vez de apenas acumulá-las.
+    :type casar_ordens: bool
+    :param formato: 'dicts' (listas de dicionários, padrão) ou 'colunar' (OrderStore).
+    :type formato: str
+    :param tamanho_lote: Número máximo de ordens publicadas por aquisição de lock. Deve ser um inteiro positivo.
+    :type tamanho_lote: int
     :raises TypeError: Se `num_traders` ou `num_orders` não forem inteiros.
-    :raises ValueError: Se `num_traders` ou `num_orders` não forem positivos.
+    :raises ValueError: Se `num_traders`, `num_orders` ou `tamanho_lote` não forem positivos, `formato` for
+                        inválido, ou `formato='colunar'` for combinado com `casar_ordens=True`.
     :return: O estado final da estrutura `order_book`, que é um dicionário com chaves
              'buy' e 'sell', cada uma contendo uma lista de ordens (cada ordem é um
-             dicionário com 'id', 'price' e 'quantity').
-    :rtype: Dict[str, List[Dict[str, Any]]]
+             dicionário com 'id', 'price' e 'quantity'). Com `casar_ordens=True`, as listas
+             contêm as ordens em repouso em prioridade preço-tempo, e a chave 'trades'
+             contém os negócios gerados. Com `formato='colunar'`, retorna o `OrderStore`.
+    :rtype: Union[Dict[str, List[Dict[str, Any]]], OrderStore]
     """
-    global order_book, order_id_counter # Resetar para cada nova simulação
+    global order_book, order_id_counter, matching_book, order_store # Resetar para cada nova simulação
     
     # Validações dos parâmetros
     if not isinstance(num_traders, int) or num_traders <= 0:
         raise ValueError("num_traders deve ser um inteiro positivo.")
     if not isinstance(num_orders, int) or num_orders <= 0:
         raise ValueError("num_orders deve ser um inteiro positivo.")
+    if not isinstance(tamanho_lote, int) or tamanho_lote <= 0:
+        raise ValueError("tamanho_lote deve ser um inteiro positivo.")
+    if formato not in ('dicts', 'colunar'):
+        raise ValueError("formato deve ser 'dicts' ou 'colunar'.")
+    if formato == 'colunar' and casar_ordens:
+        raise ValueError("formato='colunar' não pode ser combinado com casar_ordens=True.")
 
     # Reinicia o order_book e o contador de IDs para garantir uma simulação limpa
     # Isso é importante se a função for chamada múltiplas vezes.
     order_book = {'buy': [], 'sell': []}
     order_id_counter = 0
+    matching_book = OrderBook() if casar_ordens else None
+    order_store = OrderStore(capacidade_inicial=num_traders * num_orders) if formato == 'colunar' else None
 
     threads: List[threading.Thread] = []
 
     # Cria e inicia as threads dos traders
     for i in range(num_traders):
-        thread = threading.Thread(target=_trader_task, args=(i + 1, num_orders))
+        thread = threading.Thread(target=_trader_task, args=(i + 1, num_orders, tamanho_lote))
         threads.append(thread)
         thread.start()
 
@@ -119,6 +484,22 @@ def simular_traders(num_traders: int, num_orders: int) -> Dict[str, List[Dict[st
     for thread in threads:
         thread.join()
 
+    if matching_book is not None:
+        # Ordens em repouso após o casamento, mais os negócios gerados
+        order_book = matching_book.to_dict()
+        order_book['trades'] = matching_book.trades
+        matching_book = None
+        print(f"Total de negócios gerados: {len(order_book['trades'])}")
+
+    if order_store is not None:
+        store, order_store = order_store, None
+        print(f"\nSimulação concluída!")
+        print(f"Total de ordens de compra: {store.contagem('buy')}")
+        print(f"Total de ordens de venda: {store.contagem('sell')}")
+        print(f"Total geral de ordens: {len(store)}")
+        print(f"Número total de IDs únicos gerados: {order_id_counter}")
+        return store
+
     print(f"\nSimulação concluída!")
     print(f"Total de ordens de compra: {len(order_book['buy'])}")
     print(f"Total de ordens de venda: {len(order_book['sell'])}")
@@ -127,32 +508,162 @@ def simular_traders(num_traders: int, num_orders: int) -> Dict[str, List[Dict[st
 
     return order_book
 
-def _stock_feed_task(stock_name: str) -> None:
+# Ordens geradas por vez por trader em simular_traders_processos; limita a
+# memória temporária de cada processo independentemente de num_orders.
+_ORDENS_POR_BLOCO = 1 << 20
+
+def _trader_shard_process(
+    shm_name: str,
+    total_orders: int,
+    traders: List[int],
+    num_orders: int,
+    seeds: List[np.random.SeedSequence],
+    tick_size: float
+) -> None:
+    """
+    Função alvo de cada processo de `simular_traders_processos`: gera, de forma
+    vetorizada, as ordens de um shard de traders e as escreve diretamente nas
+    suas posições do array de saída em memória compartilhada.
+
+    O trader `t` (índice a partir de 0) ocupa as linhas [t*num_orders, (t+1)*num_orders)
+    do array, com IDs t*num_orders + k + 1 (k = 0, ..., num_orders - 1).
+
+    :param shm_name: Nome do bloco de memória compartilhada com o array de saída (ORDER_DTYPE).
+    :type shm_name: str
+    :param total_orders: Número total de ordens (linhas) do array de saída.
+    :type total_orders: int
+    :param traders: Índices (a partir de 0) dos traders deste shard.
+    :type traders: List[int]
+    :param num_orders: Número de ordens por trader.
+    :type num_orders: int
+    :param seeds: SeedSequence de cada trader do shard, na mesma ordem de `traders`.
+    :type seeds: List[np.random.SeedSequence]
+    :param tick_size: Variação mínima de preço.
+    :type tick_size: float
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        orders = np.ndarray((total_orders,), dtype=ORDER_DTYPE, buffer=shm.buf)
+        tick_min = round(90.0 / tick_size)
+        tick_max = round(110.0 / tick_size)
+        for trader, seed in zip(traders, seeds):
+            rng = np.random.default_rng(seed)
+            offset = trader * num_orders
+            for start in range(0, num_orders, _ORDENS_POR_BLOCO):
+                n = min(_ORDENS_POR_BLOCO, num_orders - start)
+                block = orders[offset + start : offset + start + n]
+                block['id'] = np.arange(offset + start + 1, offset + start + n + 1)
+                block['side'] = rng.integers(0, 2, size=n)
+                block['price_ticks'] = rng.integers(tick_min, tick_max + 1, size=n)  # Preço aleatório
+                block['quantity'] = rng.integers(1, 101, size=n)  # Quantidade aleatória
+                block['trader_id'] = trader + 1
+        del orders, block
+    finally:
+        shm.close()
+
+def simular_traders_processos(
+    num_traders: int,
+    num_orders: int,
+    num_processos: Optional[int] = None,
+    seed: Optional[int] = None
+) -> OrderStore:
+    """
+    Versão multiprocesso de `simular_traders`: os traders são divididos em
+    shards executados em um pool de processos, sem disputar o GIL.
+
+    Cada trader usa um gerador aleatório próprio, derivado de
+    `np.random.SeedSequence(seed)` (um filho por trader), e gera suas ordens de
+    forma vetorizada com NumPy. Os IDs são globalmente únicos e determinísticos:
+    a k-ésima ordem do trader t (a partir de 0) tem ID t*num_orders + k + 1.
+    As ordens de cada trader são escritas em posições fixas de um array em
+    memória compartilhada, de modo que o resultado é concatenado em ordem de
+    trader, e é idêntico para a mesma `seed` qualquer que seja `num_processos`.
+
+    :param num_traders: Número de traders. Deve ser um inteiro positivo.
+    :type num_traders: int
+    :param num_orders: Número de ordens que cada trader deve colocar. Deve ser um inteiro positivo.
+    :type num_orders: int
+    :param num_processos: Número de processos do pool (padrão: número de CPUs).
+    :type num_processos: Optional[int]
+    :param seed: Semente da SeedSequence raiz (None: entropia do sistema operacional).
+    :type seed: Optional[int]
+    :raises ValueError: Se `num_traders`, `num_orders` ou `num_processos` não forem inteiros positivos.
+    :return: Um `OrderStore` com todas as ordens, em ordem de trader e de geração.
+    :rtype: OrderStore
+
+    :Example:
+    >>> # store = simular_traders_processos(num_traders=64, num_orders=1_000_000, seed=42)
+    >>> # precos, volumes = store.volume_por_preco('buy')
+    """
+    if not isinstance(num_traders, int) or num_traders <= 0:
+        raise ValueError("num_traders deve ser um inteiro positivo.")
+    if not isinstance(num_orders, int) or num_orders <= 0:
+        raise ValueError("num_orders deve ser um inteiro positivo.")
+    if num_processos is None:
+        num_processos = os.cpu_count() or 1
+    if not isinstance(num_processos, int) or num_processos <= 0:
+        raise ValueError("num_processos deve ser um inteiro positivo.")
+
+    tick_size = 0.01
+    total_orders = num_traders * num_orders
+    seeds = np.random.SeedSequence(seed).spawn(num_traders)
+
+    # Traders distribuídos entre os shards em rodízio; mais shards que processos equilibram a carga
+    num_shards = min(num_traders, num_processos * 4)
+    shards = [list(range(num_traders))[i::num_shards] for i in range(num_shards)]
+
+    shm = shared_memory.SharedMemory(create=True, size=total_orders * ORDER_DTYPE.itemsize)
+    try:
+        with ProcessPoolExecutor(max_workers=num_processos) as executor:
+            futures = [
+                executor.submit(
+                    _trader_shard_process, shm.name, total_orders, shard,
+                    num_orders, [seeds[t] for t in shard], tick_size
+                )
+                for shard in shards
+            ]
+            for future in futures:
+                future.result()  # Propaga eventuais exceções dos processos
+        orders = np.ndarray((total_orders,), dtype=ORDER_DTYPE, buffer=shm.buf)
+        store = OrderStore.de_array(orders, tick_size=tick_size)
+        del orders
+    finally:
+        shm.close()
+        shm.unlink()
+
+    print(f"\nSimulação multiprocesso concluída!")
+    print(f"Total de ordens de compra: {store.contagem('buy')}")
+    print(f"Total de ordens de venda: {store.contagem('sell')}")
+    print(f"Total geral de ordens: {len(store)}")
+
+    return store
+
+def _stock_feed_task(stock_name: str, ao_atualizar: Optional[Callable[[str, float], None]] = None) -> None:
     """
     Simula um feed de dados para uma ação específica, atualizando seu preço
-    periodicamente no dicionário global 'prices'.
+    periodicamente na tabela global 'price_table'.
+
+    Cada atualização adquire apenas o lock do shard da ação.
 
     :param stock_name: O nome da ação (ticker).
     :type stock_name: str
+    :param ao_atualizar: Função chamada na thread do feed com (ação, novo preço) a cada atualização.
+    :type ao_atualizar: Optional[Callable[[str, float], None]]
     """
-    # Inicializa o preço da ação no dicionário compartilhado
-    with prices_lock:
-        prices[stock_name] = 100.0  # Preço inicial arbitrário
+    # Inicializa o preço da ação na tabela compartilhada
+    price_table.set(stock_name, 100.0)  # Preço inicial arbitrário
 
-    print(f"Feed para {stock_name} iniciado com preço inicial {prices[stock_name]:.2f}")
+    print(f"Feed para {stock_name} iniciado com preço inicial {price_table.get(stock_name):.2f}")
 
     while not stop_simulation_event.is_set():
         # Gera uma variação de preço aleatória (e.g., -1% a +1%)
         price_change_factor = 1 + random.uniform(-0.01, 0.01)
 
-        with prices_lock:
-            current_price = prices[stock_name]
-            new_price = current_price * price_change_factor
-            # Garante que o preço não caia para zero ou negativo
-            if new_price < 0.01:
-                new_price = 0.01
-            prices[stock_name] = new_price
-            # print(f"[{time.time():.2f}] {stock_name}: Preço atualizado para {new_price:.2f}")
+        # Garante que o preço não caia para zero ou negativo
+        new_price = price_table.update(stock_name, lambda current_price: max(current_price * price_change_factor, 0.01))
+        if ao_atualizar is not None:
+            ao_atualizar(stock_name, new_price)
+        # print(f"[{time.time():.2f}] {stock_name}: Preço atualizado")
 
         # Tempo de espera aleatório (1 a 3 segundos) antes da próxima atualização
         wait_time = random.uniform(1, 3)
@@ -164,13 +675,13 @@ def _stock_feed_task(stock_name: str) -> None:
 
 def _printer_task() -> None:
     """
-    Imprime os preços atuais de todas as ações no dicionário 'prices' a cada 5 segundos.
+    Imprime os preços atuais de todas as ações na tabela 'price_table' a cada 5 segundos.
+
+    A leitura usa os snapshots por shard (seqlock), sem adquirir os locks dos feeds.
     """
     print("Thread de impressão iniciada.")
     while not stop_simulation_event.is_set():
-        with prices_lock:
-            # Cria uma cópia para imprimir e evitar manter o lock por muito tempo
-            current_prices = prices.copy()
+        current_prices = price_table.snapshot()
         
         print("\n--- Preços Atuais ---")
         for stock, price in sorted(current_prices.items()):
@@ -182,16 +693,23 @@ def _printer_task() -> None:
             break # Se o evento foi setado, sai do loop
     print("Thread de impressão finalizada.")
 
-def simular_feeds_de_dados(acoes: List[str], tempo_total: int) -> Dict[str, float]:
+def simular_feeds_de_dados(
+    acoes: List[str],
+    tempo_total: int,
+    num_shards: int = 16,
+    ao_atualizar: Optional[Callable[[str, float], None]] = None
+) -> Dict[str, float]:
     """
     Simula a atualização de feeds de dados de preços de ações concorrentemente.
 
-    Cria um dicionário compartilhado `prices` que armazena os preços atuais
+    Cria uma tabela compartilhada `price_table` que armazena os preços atuais
     de várias ações. Uma thread é criada para cada ação em `acoes`,
     representando um feed de dados que atualiza periodicamente (a cada 1-3 segundos)
-    o preço da sua ação no dicionário. Um `threading.Lock` é usado para
-    sincronizar o acesso ao dicionário. Uma thread adicional imprime os preços
-    atuais a cada 5 segundos. A simulação roda por `tempo_total` segundos.
+    o preço da sua ação na tabela. A tabela é dividida em `num_shards` shards,
+    cada um com o seu `threading.Lock`, de modo que feeds de shards diferentes
+    não disputam o mesmo lock. Uma thread adicional imprime os preços atuais a
+    cada 5 segundos, lendo snapshots dos shards sem adquirir locks.
+    A simulação roda por `tempo_total` segundos.
 
     :param acoes: Lista de nomes de ações (e.g., ["AAPL", "GOOG", "TSLA"]).
                   Deve conter pelo menos um nome de ação.
@@ -199,8 +717,13 @@ def simular_feeds_de_dados(acoes: List[str], tempo_total: int) -> Dict[str, floa
     :param tempo_total: Tempo total de simulação em segundos.
                         Deve ser um inteiro positivo.
     :type tempo_total: int
+    :param num_shards: Número de shards (e de locks) da tabela de preços.
+    :type num_shards: int
+    :param ao_atualizar: Função opcional chamada pela thread de feed com (ação, novo preço)
+                         a cada atualização (e.g., para alimentar estatísticas móveis).
+    :type ao_atualizar: Optional[Callable[[str, float], None]]
     :raises TypeError: Se `acoes` não for uma lista de strings, ou `tempo_total` não for um inteiro.
-    :raises ValueError: Se `acoes` estiver vazia, ou `tempo_total` não for positivo.
+    :raises ValueError: Se `acoes` estiver vazia, ou `tempo_total` ou `num_shards` não forem positivos.
     :return: O dicionário final de preços após a simulação.
     :rtype: Dict[str, float]
 
@@ -210,7 +733,7 @@ def simular_feeds_de_dados(acoes: List[str], tempo_total: int) -> Dict[str, floa
     >>> # final_prices = simular_feeds_de_dados(acoes=["MSFT", "AMZN"], tempo_total=10)
     >>> # print("\\nFinal Prices:", final_prices)
     """
-    global prices, stop_simulation_event # Acessa e reseta as variáveis globais
+    global price_table, stop_simulation_event # Acessa e reseta as variáveis globais
 
     # Validações dos parâmetros
     if not isinstance(acoes, list) or not all(isinstance(a, str) for a in acoes):
@@ -220,15 +743,15 @@ def simular_feeds_de_dados(acoes: List[str], tempo_total: int) -> Dict[str, floa
     if not isinstance(tempo_total, int) or tempo_total <= 0:
         raise ValueError("tempo_total deve ser um inteiro positivo.")
 
-    # Reinicia o dicionário de preços e o evento para uma nova simulação limpa
-    prices = {}
+    # Reinicia a tabela de preços e o evento para uma nova simulação limpa
+    price_table = ShardedPriceTable(num_shards)
     stop_simulation_event.clear() # Garante que o evento não esteja setado de uma execução anterior
 
     threads: List[threading.Thread] = []
 
     # Cria e inicia as threads para cada feed de dados de ações
     for stock in acoes:
-        thread = threading.Thread(target=_stock_feed_task, args=(stock,))
+        thread = threading.Thread(target=_stock_feed_task, args=(stock, ao_atualizar))
         threads.append(thread)
         thread.start()
 
@@ -250,51 +773,39 @@ def simular_feeds_de_dados(acoes: List[str], tempo_total: int) -> Dict[str, floa
         thread.join()
 
     print("\nTodas as threads foram finalizadas.")
-    # Retorna o estado final do dicionário de preços
-    with prices_lock:
-        final_prices = prices.copy()
+    # Retorna o estado final dos preços
+    final_prices = price_table.snapshot()
     return final_prices    
 
-def _strategy_task(strategy_name: str, requested_risk: float, total_risk_limit: float) -> None:
+def _strategy_task(strategy_name: str, requested_risk: float, budget: RiskBudget) -> None:
     """
     Função que simula uma estratégia tentando alocar risco em um portfólio.
     Esta função é executada por cada thread de estratégia.
 
-    A estratégia verifica o risco total atual e, se houver espaço (ou seja,
-    não excederá o limite `total_risk_limit` ao alocar `requested_risk`),
-    ela aloca seu risco. Se o risco total exceder o limite, a thread espera.
+    A estratégia solicita `requested_risk` ao orçamento compartilhado. Se não
+    houver espaço (ou seja, a alocação excederia o limite do orçamento), a
+    thread fica bloqueada, sem consumir CPU, até que haja capacidade ou o
+    orçamento seja fechado ao fim da simulação.
 
     :param strategy_name: O nome da estratégia.
     :type strategy_name: str
     :param requested_risk: A quantidade de risco que esta estratégia deseja alocar.
     :type requested_risk: float
-    :param total_risk_limit: O limite máximo de risco disponível para o portfólio.
-    :type total_risk_limit: float
+    :param budget: O orçamento de risco compartilhado do portfólio.
+    :type budget: RiskBudget
     """
-    global current_total_risk, allocated_risk_per_strategy
-
     print(f"Estratégia {strategy_name}: Iniciada, solicitando {requested_risk:.2f} de risco.")
 
-    # Loop para tentar alocar risco enquanto a simulação não for parada
-    while not stop_simulation_event.is_set():
+    if requested_risk > budget.limite:
+        print(f"Estratégia {strategy_name}: Risco solicitado excede o limite total ({budget.limite:.2f}).")
+    elif budget.acquire(requested_risk):
         with risk_lock:
-            if current_total_risk + requested_risk <= total_risk_limit:
-                # Há espaço: aloca o risco
-                current_total_risk += requested_risk
-                allocated_risk_per_strategy[strategy_name] = (
-                    allocated_risk_per_strategy.get(strategy_name, 0.0) + requested_risk
-                )
-                print(f"Estratégia {strategy_name}: ALOCADO {requested_risk:.2f}. Risco total atual: {current_total_risk:.2f}")
-                break  # Risco alocado, a thread pode terminar sua tarefa de alocação
-            else:
-                # Não há espaço: espera e tenta novamente
-                print(f"Estratégia {strategy_name}: Risco insuficiente ({current_total_risk:.2f}/{total_risk_limit:.2f}). Esperando...")
-
-        # Espera por um tempo antes de tentar novamente se não conseguiu alocar
-        # random.uniform para simular variabilidade no tempo de espera
-        wait_time = random.uniform(0.1, 0.5) # Espera entre 100ms e 500ms
-        if stop_simulation_event.wait(wait_time):
-            break # Se o evento de parada for setado durante a espera, sai do loop
+            allocated_risk_per_strategy[strategy_name] = (
+                allocated_risk_per_strategy.get(strategy_name, 0.0) + requested_risk
+            )
+        print(f"Estratégia {strategy_name}: ALOCADO {requested_risk:.2f}. Risco total atual: {budget.em_uso:.2f}")
+    else:
+        print(f"Estratégia {strategy_name}: Risco insuficiente ({budget.em_uso:.2f}/{budget.limite:.2f}) até o fim da simulação.")
 
     print(f"Estratégia {strategy_name}: Finalizada. Risco alocado final: {allocated_risk_per_strategy.get(strategy_name, 0.0):.2f}")
 
@@ -304,8 +815,14 @@ def gerenciar_risco(total_risco: float, estrategias: List[Tuple[str, float]], te
     Gerencia a alocação de risco em um portfólio por múltiplas estratégias concorrentemente.
 
     Cada estratégia tenta alocar uma quantidade de risco em um limite total.
-    Usa `threading.Lock` para proteger a variável de risco total compartilhada.
-    Se o risco exceder o limite, a thread de estratégia espera.
+    Usa um `RiskBudget` (baseado em `threading.Condition`) para proteger o risco
+    total compartilhado. Se o risco exceder o limite, a thread de estratégia fica
+    bloqueada em uma fila até que haja capacidade. As estratégias não devolvem o
+    risco alocado; uma estratégia menor que ainda cabe no limite é atendida
+    mesmo que uma maior, que não cabe, tenha chegado antes (até o limite de
+    ultrapassagens do `RiskBudget`). A simulação termina quando todas as
+    estratégias concluem ou após `tempo_total` segundos, quando o orçamento é
+    fechado e os pedidos pendentes são cancelados.
 
     :param total_risco: Limite total de risco disponível para o portfólio.
                         Deve ser um float positivo.
@@ -314,7 +831,7 @@ def gerenciar_risco(total_risco: float, estrategias: List[Tuple[str, float]], te
                          e o risco que ela deseja alocar (float).
                          Ex: [("EstrategiaA", 10.5), ("EstrategiaB", 5.0)].
     :type estrategias: List[Tuple[str, float]]
-    :param tempo_total: Tempo total de simulação em segundos.
+    :param tempo_total: Tempo máximo de simulação em segundos.
                         Deve ser um inteiro positivo.
     :type tempo_total: int
     :raises TypeError: Se os tipos dos parâmetros não corresponderem ao esperado.
@@ -332,7 +849,7 @@ def gerenciar_risco(total_risco: float, estrategias: List[Tuple[str, float]], te
     >>> # final_allocation = gerenciar_risco(limit, strategies_list, 5)
     >>> # print("\\nAlocação Final de Risco:", final_allocation)
     """
-    global current_total_risk, allocated_risk_per_strategy, stop_simulation_event
+    global allocated_risk_per_strategy
 
     # --- Validação de Parâmetros ---
     if not isinstance(total_risco, (int, float)) or total_risco <= 0:
@@ -345,34 +862,35 @@ def gerenciar_risco(total_risco: float, estrategias: List[Tuple[str, float]], te
         raise ValueError("tempo_total deve ser um inteiro positivo.")
 
     # --- Inicialização Global para a Simulação ---
-    current_total_risk = 0.0
     allocated_risk_per_strategy = {strat[0]: 0.0 for strat in estrategias} # Inicializa com 0 para todas as estratégias
-    stop_simulation_event.clear() # Garante que o evento não esteja setado de uma execução anterior
+    budget = RiskBudget(total_risco)
 
     threads: List[threading.Thread] = []
 
     # Cria e inicia as threads para cada estratégia
     for name, risk_value in estrategias:
-        thread = threading.Thread(target=_strategy_task, args=(name, risk_value, total_risco))
+        thread = threading.Thread(target=_strategy_task, args=(name, risk_value, budget))
         threads.append(thread)
         thread.start()
 
-    print(f"\nSimulação de gerenciamento de risco iniciada por {tempo_total} segundos.")
+    print(f"\nSimulação de gerenciamento de risco iniciada por até {tempo_total} segundos.")
     print(f"Limite total de risco: {total_risco:.2f}")
 
-    # Aguarda o tempo total da simulação
-    time.sleep(tempo_total)
+    # Aguarda as estratégias por no máximo tempo_total segundos
+    deadline = time.monotonic() + tempo_total
+    for thread in threads:
+        thread.join(max(deadline - time.monotonic(), 0))
 
-    print("\nTempo de simulação esgotado. Sinalizando threads para pararem...")
-    # Sinaliza para todas as threads que elas devem parar
-    stop_simulation_event.set()
+    print("\nSimulação encerrada. Cancelando os pedidos de risco pendentes...")
+    # Fecha o orçamento: estratégias ainda em espera são liberadas sem alocar
+    budget.close()
 
     # Espera que todas as threads terminem a execução
     for thread in threads:
         thread.join()
 
     print("\nTodas as threads de estratégia foram finalizadas.")
-    print(f"Risco total final alocado: {current_total_risk:.2f}")
+    print(f"Risco total final alocado: {budget.em_uso:.2f}")
 
     # Retorna o estado final da alocação de risco
     return allocated_risk_per_strategy